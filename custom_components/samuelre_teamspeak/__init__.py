@@ -2,61 +2,355 @@
 
 from __future__ import annotations
 
+from dataclasses import dataclass
+import logging
+import time
+from typing import Any
+
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_HOST, CONF_PORT, CONF_SCAN_INTERVAL, Platform
+from homeassistant.const import (
+    CONF_HOST,
+    CONF_PORT,
+    CONF_SCAN_INTERVAL,
+    CONF_SSL,
+    Platform,
+)
 from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.exceptions import ConfigEntryError, ConfigEntryNotReady
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 
-from .api import CannotConnect, TeamSpeakWebQueryClient
-from .const import CONF_API_KEY, CONF_SERVER_ID
+from .api import CannotConnect, TeamSpeakRequestQueue, TeamSpeakWebQueryClient
+from .const import (
+    CONF_ADAPTIVE_POLLING,
+    CONF_API_KEY,
+    CONF_CHANNEL_ATTRIBUTES,
+    CONF_CHANNEL_LIST_INTERVAL,
+    CONF_CLIENT_ATTRIBUTES,
+    CONF_CLIENT_LIST_INTERVAL,
+    CONF_ENTRY_TYPE,
+    CONF_MAX_INTERVAL,
+    CONF_MAX_LIST_LENGTH,
+    CONF_MIN_INTERVAL,
+    CONF_QUALITY_SAMPLES,
+    CONF_QUERY_PASSWORD,
+    CONF_QUERY_PORT,
+    CONF_QUERY_USERNAME,
+    CONF_REQUEST_TIMEOUT,
+    CONF_SERVER_ID,
+    CONF_SERVER_IDS,
+    DATA_REQUEST_QUEUES,
+    DATA_SNAPSHOTS,
+    DEFAULT_QUERY_PORT,
+    DOMAIN,
+    ENTRY_TYPE_FLEET,
+)
+from .connection import InvalidCertificateConfig, async_create_session
 from .coordinator import TeamSpeakDataUpdateCoordinator
+from .events import TeamSpeakEventDispatcher
+from .fleet import async_get_fleet
+from .models import TeamSpeakSnapshot
+from .quality import TeamSpeakQualitySampler
+from .query import TeamSpeakNotificationListener, TeamSpeakServerQueryClient
+from .services import async_setup_services
+from .sessions import TeamSpeakSessionTracker, async_remove_sessions
+from .snapshots import TeamSpeakSnapshotStore, async_remove_snapshots
+from .statistics import TeamSpeakStatistics
+from .tracker import TeamSpeakPresenceTracker
+
+_LOGGER = logging.getLogger(__name__)
+
+PLATFORMS: list[Platform] = [Platform.BINARY_SENSOR, Platform.SENSOR]
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+# Settings the running coordinators apply in place; any other change reloads
+LIVE_CONFIG_KEYS = {
+    CONF_API_KEY,
+    CONF_SCAN_INTERVAL,
+    CONF_REQUEST_TIMEOUT,
+    CONF_CLIENT_ATTRIBUTES,
+    CONF_CHANNEL_ATTRIBUTES,
+    CONF_MAX_LIST_LENGTH,
+    CONF_ADAPTIVE_POLLING,
+    CONF_MIN_INTERVAL,
+    CONF_MAX_INTERVAL,
+    CONF_CLIENT_LIST_INTERVAL,
+    CONF_CHANNEL_LIST_INTERVAL,
+}
+
 
-PLATFORMS: list[Platform] = [Platform.SENSOR]
+@dataclass
+class TeamSpeakRuntimeData:
+    """Runtime data of a TeamSpeak host."""
 
-type TeamSpeakConfigEntry = ConfigEntry[TeamSpeakDataUpdateCoordinator]
+    coordinators: dict[int, TeamSpeakDataUpdateCoordinator]
+    trackers: dict[int, TeamSpeakPresenceTracker]
+    sessions: dict[int, TeamSpeakSessionTracker]
+    # Only set up when client connection sampling is enabled
+    quality: dict[int, TeamSpeakQualitySampler]
+    # Entry data and options the coordinators were configured with
+    config: dict[str, Any]
+
+
+type TeamSpeakConfigEntry = ConfigEntry[TeamSpeakRuntimeData]
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the TeamSpeak Server Info integration."""
+    async_setup_services(hass)
+    return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: TeamSpeakConfigEntry) -> bool:
     """Set up TeamSpeak Server Info from a config entry."""
-    # Create API client
-    session = async_get_clientsession(hass)
-    client = TeamSpeakWebQueryClient(
-        host=entry.data[CONF_HOST],
-        port=entry.data[CONF_PORT],
-        server_id=entry.data[CONF_SERVER_ID],
+    if entry.data.get(CONF_ENTRY_TYPE) == ENTRY_TYPE_FLEET:
+        # The fleet entry only holds the fleet sensors
+        entry.runtime_data = TeamSpeakRuntimeData(
+            coordinators={}, trackers={}, sessions={}, quality={}, config={}
+        )
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+        return True
+
+    host = entry.data[CONF_HOST]
+    port = entry.data[CONF_PORT]
+    server_ids: list[int] = entry.data[CONF_SERVER_IDS]
+    update_interval: int = entry.data[CONF_SCAN_INTERVAL]
+
+    # All requests to one WebQuery endpoint go through a single shared queue
+    queues = hass.data.setdefault(DATA_REQUEST_QUEUES, {})
+    queue = queues.setdefault((host, port), TeamSpeakRequestQueue())
+
+    # Create API client on a session of its own, kept alive between polls
+    try:
+        session = await async_create_session(hass, entry.data)
+    except InvalidCertificateConfig as err:
+        raise ConfigEntryError(str(err)) from err
+    # Closed after everything else on unload, and when the setup fails
+    entry.async_on_unload(session.close)
+    host_client = TeamSpeakWebQueryClient(
+        host=host,
+        port=port,
+        server_id=None,
         api_key=entry.data[CONF_API_KEY],
         session=session,
+        queue=queue,
+        ssl=entry.data.get(CONF_SSL, False),
+        timeout=entry.options.get(CONF_REQUEST_TIMEOUT) or None,
     )
 
-    # Test connection before setting up
-    try:
-        await client.test_connection()
-    except CannotConnect as err:
-        raise ConfigEntryNotReady(
-            f"Unable to connect to TeamSpeak server: {err}"
-        ) from err
-
-    # Create coordinator
-    coordinator = TeamSpeakDataUpdateCoordinator(
-        hass=hass,
-        client=client,
-        config_entry=entry,
-        update_interval=entry.data[CONF_SCAN_INTERVAL],
-    )
+    # A reload starts from the snapshots the previous setup left behind
+    snapshots = _async_pop_snapshots(hass, entry, update_interval)
+    # After a restart the stored snapshots are restored, so the entities are
+    # set up right away and the server is contacted in the background
+    snapshot_store = TeamSpeakSnapshotStore(hass, entry)
+    stored: dict[int, dict[str, Any]] = {}
+    if not snapshots:
+        stored = await snapshot_store.async_load()
+        if set(stored) != set(server_ids):
+            stored = {}
+
+    # Test connection before setting up; the result seeds the first refresh
+    server_info: dict[str, Any] | None = None
+    if not snapshots and not stored:
+        try:
+            server_info = await host_client.for_server(server_ids[0]).test_connection()
+        except CannotConnect as err:
+            raise ConfigEntryNotReady(
+                f"Unable to connect to TeamSpeak server: {err}"
+            ) from err
+
+    # Refreshes of different hosts run concurrently, each host at its own offset
+    fleet = async_get_fleet(hass)
+    host_phase = fleet.async_add_host(entry) * update_interval
+
+    # One coordinator per virtual server
+    coordinators: dict[int, TeamSpeakDataUpdateCoordinator] = {}
+    for index, server_id in enumerate(server_ids):
+        coordinator = TeamSpeakDataUpdateCoordinator(
+            hass=hass,
+            client=host_client.for_server(server_id),
+            config_entry=entry,
+            update_interval=update_interval,
+            server_info=server_info if index == 0 else None,
+        )
+
+        # Fetch initial data, unless a snapshot was left or stored
+        if snapshots:
+            coordinator.async_seed(snapshots[server_id])
+        elif stored:
+            coordinator.async_restore(stored[server_id])
+        else:
+            await coordinator.async_config_entry_first_refresh()
+
+        # Restored data is replaced by a refresh that does not block setup
+        if (restored_at := coordinator.data.restored_at) is not None:
+            _LOGGER.debug(
+                "Restored server %s from the snapshot of %s", server_id, restored_at
+            )
+            entry.async_create_background_task(
+                hass,
+                coordinator.async_refresh(),
+                f"samuelre_teamspeak_refresh_{server_id}",
+            )
+
+        # Spread the refreshes of the virtual servers over the interval
+        phase = host_phase + index * update_interval / len(server_ids)
+        if phase := phase % update_interval:
+            coordinator.async_set_phase(phase)
+
+        coordinators[server_id] = coordinator
 
-    # Fetch initial data
-    await coordinator.async_config_entry_first_refresh()
+    # Presence trackers feeding the per-client and per-channel entities
+    trackers: dict[int, TeamSpeakPresenceTracker] = {}
+    for server_id, coordinator in coordinators.items():
+        trackers[server_id] = TeamSpeakPresenceTracker(hass, entry, coordinator)
+        trackers[server_id].async_start()
 
-    # Store coordinator in runtime data
-    entry.runtime_data = coordinator
+    # Per-user online time and daily peaks, persisted across restarts
+    sessions: dict[int, TeamSpeakSessionTracker] = {}
+    for server_id, coordinator in coordinators.items():
+        sessions[server_id] = TeamSpeakSessionTracker(
+            hass, entry, coordinator, server_id
+        )
+        await sessions[server_id].async_start()
+
+    # Connection quality of a few clients per refresh, within the budget
+    quality: dict[int, TeamSpeakQualitySampler] = {}
+    if budget := entry.options.get(CONF_QUALITY_SAMPLES, 0):
+        for server_id, coordinator in coordinators.items():
+            quality[server_id] = TeamSpeakQualitySampler(
+                hass, entry, coordinator, budget
+            )
+            quality[server_id].async_start()
+
+    # The last snapshots are stored for the next startup
+    snapshot_store.async_start(coordinators)
+
+    # Fleet totals across all hosts
+    fleet.async_add_servers(entry, coordinators)
+
+    # Bus events and device triggers for clients joining, leaving and moving
+    for server_id, coordinator in coordinators.items():
+        TeamSpeakEventDispatcher(hass, entry, coordinator, server_id).async_start()
+
+    # Hourly long-term statistics imported into the recorder
+    for server_id, coordinator in coordinators.items():
+        TeamSpeakStatistics(hass, entry, coordinator, server_id).async_start()
+
+    # Store coordinators in runtime data
+    entry.runtime_data = TeamSpeakRuntimeData(
+        coordinators=coordinators,
+        trackers=trackers,
+        sessions=sessions,
+        quality=quality,
+        config={**entry.data, **entry.options},
+    )
+
+    # Optional push mode: apply ServerQuery notifications as they arrive
+    if entry.data.get(CONF_QUERY_USERNAME):
+        for server_id, coordinator in coordinators.items():
+            listener = TeamSpeakNotificationListener(
+                TeamSpeakServerQueryClient(
+                    host=host,
+                    port=entry.data.get(CONF_QUERY_PORT, DEFAULT_QUERY_PORT),
+                    server_id=server_id,
+                    username=entry.data[CONF_QUERY_USERNAME],
+                    password=entry.data.get(CONF_QUERY_PASSWORD, ""),
+                ),
+                coordinator.async_handle_notification,
+                coordinator.async_set_push_connected,
+            )
+            entry.async_create_background_task(
+                hass,
+                listener.async_run(),
+                f"samuelre_teamspeak_notifications_{server_id}",
+            )
 
     # Setup platforms
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
     return True
 
 
+async def _async_update_listener(
+    hass: HomeAssistant, entry: TeamSpeakConfigEntry
+) -> None:
+    """Apply changed settings in place, reloading only when required."""
+    runtime_data = entry.runtime_data
+    config = {**entry.data, **entry.options}
+    changed = {
+        key
+        for key in config.keys() | runtime_data.config.keys()
+        if config.get(key) != runtime_data.config.get(key)
+    }
+    if not changed:
+        return
+    if changed - LIVE_CONFIG_KEYS:
+        _LOGGER.debug("Reloading %s for changed %s", entry.entry_id, changed)
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    runtime_data.config = config
+    for coordinator in runtime_data.coordinators.values():
+        coordinator.async_apply_config(entry.data, entry.options)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: TeamSpeakConfigEntry) -> bool:
     """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+
+    # Hand the latest snapshots to the next setup, if there is one soon
+    coordinators = entry.runtime_data.coordinators
+    if coordinators and all(
+        coordinator.last_update_success for coordinator in coordinators.values()
+    ):
+        hass.data.setdefault(DATA_SNAPSHOTS, {})[entry.entry_id] = (
+            time.monotonic(),
+            {
+                server_id: coordinator.data
+                for server_id, coordinator in coordinators.items()
+            },
+        )
+    return True
+
+
+def _async_pop_snapshots(
+    hass: HomeAssistant, entry: TeamSpeakConfigEntry, max_age: float
+) -> dict[int, TeamSpeakSnapshot]:
+    """Return the snapshots of the previous setup if fresh and complete."""
+    stashed = hass.data.get(DATA_SNAPSHOTS, {}).pop(entry.entry_id, None)
+    if stashed is None:
+        return {}
+    stashed_at, snapshots = stashed
+    if time.monotonic() - stashed_at > max_age or set(snapshots) != set(
+        entry.data[CONF_SERVER_IDS]
+    ):
+        return {}
+    return snapshots
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: TeamSpeakConfigEntry) -> None:
+    """Remove the stored data of a deleted config entry."""
+    hass.data.get(DATA_SNAPSHOTS, {}).pop(entry.entry_id, None)
+    await async_remove_snapshots(hass, entry.entry_id)
+    for server_id in entry.data.get(CONF_SERVER_IDS, []):
+        await async_remove_sessions(hass, entry.entry_id, server_id)
+
+
+async def async_migrate_entry(hass: HomeAssistant, entry: TeamSpeakConfigEntry) -> bool:
+    """Migrate old config entries."""
+    if entry.version > 2:
+        return False
+
+    if entry.version == 1:
+        # Version 1 entries monitored a single virtual server
+        data = {**entry.data}
+        data[CONF_SERVER_IDS] = [data.pop(CONF_SERVER_ID)]
+        hass.config_entries.async_update_entry(entry, data=data, version=2)
+        _LOGGER.debug("Migrated config entry %s to version 2", entry.entry_id)
+
+    return True
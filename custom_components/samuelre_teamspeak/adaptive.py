@@ -0,0 +1,88 @@
+"""Adaptive polling interval controller for the TeamSpeak integration."""
+
+from __future__ import annotations
+
+# Reasons reported alongside the current interval
+REASON_FIXED = "fixed"
+REASON_PUSH = "push"
+REASON_STARTUP = "startup"
+REASON_ACTIVITY = "activity"
+REASON_STABLE = "stable"
+REASON_ERROR = "error"
+
+# Factor the interval shrinks by on activity and grows by when stable
+ACTIVITY_FACTOR = 0.5
+STABLE_FACTOR = 1.5
+ERROR_FACTOR = 2.0
+
+# Client changes per refresh that count as a burst and jump to the minimum
+BURST_CHURN = 5
+
+# Relative and absolute bandwidth change (bytes/s) that count as activity
+BANDWIDTH_RELATIVE_CHANGE = 0.5
+BANDWIDTH_MIN_CHANGE = 1024
+
+
+class AdaptiveIntervalController:
+    """Derive the next polling interval from server activity and errors.
+
+    The controller does not keep time itself; it is fed one observation per
+    refresh and returns the interval until the next one.
+    """
+
+    def __init__(
+        self, min_interval: float, max_interval: float, initial: float
+    ) -> None:
+        """Initialize the controller."""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = self._clamp(initial)
+        self.reason = REASON_STARTUP
+        self._last_bandwidth: int | None = None
+
+    def record_success(self, client_churn: int, bandwidth: int) -> float:
+        """Record a successful refresh and return the next interval.
+
+        client_churn is the number of clients that joined, left or changed
+        since the previous refresh, bandwidth the current total data rate.
+        """
+        last_bandwidth, self._last_bandwidth = self._last_bandwidth, bandwidth
+
+        if client_churn >= BURST_CHURN:
+            self._set(self.min_interval, REASON_ACTIVITY)
+        elif client_churn or self._bandwidth_changed(last_bandwidth, bandwidth):
+            self._set(self.interval * ACTIVITY_FACTOR, REASON_ACTIVITY)
+        else:
+            self._set(self.interval * STABLE_FACTOR, REASON_STABLE)
+        return self.interval
+
+    def record_failure(self) -> float:
+        """Record a failed or timed out refresh and return the next interval."""
+        self._set(self.interval * ERROR_FACTOR, REASON_ERROR)
+        return self.interval
+
+    def set_bounds(self, min_interval: float, max_interval: float) -> None:
+        """Change the interval bounds, clamping the current interval."""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = self._clamp(self.interval)
+
+    @staticmethod
+    def _bandwidth_changed(previous: int | None, current: int) -> bool:
+        """Return True if the data rate moved significantly."""
+        if previous is None:
+            return False
+        change = abs(current - previous)
+        return (
+            change >= BANDWIDTH_MIN_CHANGE
+            and change >= BANDWIDTH_RELATIVE_CHANGE * max(previous, 1)
+        )
+
+    def _set(self, interval: float, reason: str) -> None:
+        """Store a new clamped interval and the reason for it."""
+        self.interval = self._clamp(interval)
+        self.reason = reason
+
+    def _clamp(self, interval: float) -> float:
+        """Clamp an interval to the configured bounds."""
+        return min(max(interval, self.min_interval), self.max_interval)
@@ -3,11 +3,216 @@
 from __future__ import annotations
 
 import asyncio
+from collections.abc import AsyncIterator
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from contextvars import ContextVar
+import logging
+import random
+import time
 from typing import Any
+from urllib.parse import quote
 
-from aiohttp import ClientError, ClientSession
+from aiohttp import (
+    ClientConnectionError,
+    ClientConnectorCertificateError,
+    ClientError,
+    ClientResponseError,
+    ClientSession,
+    ServerFingerprintMismatch,
+)
+from yarl import URL
 
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util.json import json_loads_object
+
+from .instrumentation import EndpointStats
+
+_LOGGER = logging.getLogger(__name__)
+
+# Minimum spacing between two requests to the same WebQuery endpoint
+DEFAULT_REQUEST_SPACING = 0.1
+
+# Per-request timeouts; the lists can take noticeably longer on big servers
+DEFAULT_TIMEOUT = 10.0
+ENDPOINT_TIMEOUTS = {
+    "serverinfo": 5.0,
+    "serverlist": 5.0,
+    "clientlist": 10.0,
+    "channellist": 10.0,
+    "servergrouplist": 5.0,
+    "clientinfo": 5.0,
+}
+
+# Transient failures are retried with jittered backoff while the whole
+# request, including waiting for retries, stays within the budget
+MAX_RETRIES = 2
+RETRY_BASE_DELAY = 0.5
+RETRY_BUDGET = 15.0
+
+# Consecutive transient failures that open the circuit, and how long it
+# stays open before a single probe request is let through
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RESET_TIMEOUT = 30.0
+BREAKER_MAX_RESET_TIMEOUT = 300.0
+
+
+# Batch of requests the current task is sending, if any
+_BATCH: ContextVar[_Batch | None] = ContextVar("teamspeak_batch", default=None)
+
+
+class _Batch:
+    """A batch holding the slot of a request queue."""
+
+    def __init__(self, queue: TeamSpeakRequestQueue) -> None:
+        """Initialize the batch."""
+        self.queue = queue
+        # False while the slot is given up for a retry backoff
+        self.held = True
+
+
+class TeamSpeakCircuitBreaker:
+    """Short-circuit requests while a WebQuery endpoint is known to be down.
+
+    After a number of consecutive transient failures the circuit opens and
+    requests fail immediately. Once the reset timeout has passed one request
+    is let through; success closes the circuit, failure opens it again for
+    twice as long.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+    ) -> None:
+        """Initialize the circuit breaker."""
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        """Return True while requests are being short-circuited."""
+        return self.opened_at is not None
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent now."""
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self.opened_at < self.reset_timeout:
+            return False
+        # Half open: let a single probe through per reset timeout
+        self.opened_at = now
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        """Close the circuit after the endpoint answered."""
+        if self.opened_at is not None:
+            _LOGGER.info("TeamSpeak WebQuery endpoint is reachable again")
+        self.failures = 0
+        self.opened_at = None
+        self.reset_timeout = self.base_reset_timeout
+        self._probing = False
+
+    def record_failure(self) -> None:
+        """Count a transient failure and open the circuit if needed."""
+        self.failures += 1
+        if self._probing:
+            self._probing = False
+            self.opened_at = time.monotonic()
+            self.reset_timeout = min(self.reset_timeout * 2, BREAKER_MAX_RESET_TIMEOUT)
+        elif self.opened_at is None and self.failures >= self.failure_threshold:
+            _LOGGER.warning(
+                "TeamSpeak WebQuery endpoint failed %s times in a row, pausing "
+                "requests for %s seconds",
+                self.failures,
+                self.reset_timeout,
+            )
+            self.opened_at = time.monotonic()
+
+
+class TeamSpeakRequestQueue:
+    """Serialize requests to one WebQuery endpoint within a rate budget.
+
+    All clients talking to the same host and port share one queue, so only a
+    single request is in flight at any time regardless of how many virtual
+    servers are monitored.
+    """
+
+    def __init__(self, spacing: float = DEFAULT_REQUEST_SPACING) -> None:
+        """Initialize the request queue."""
+        self.spacing = spacing
+        self.breaker = TeamSpeakCircuitBreaker()
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait for exclusive access to the endpoint."""
+        if (batch := _BATCH.get()) is not None and batch.queue is self:
+            # Already held for a batch, requests go out back to back
+            yield
+            return
+        await self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[None]:
+        """Hold the endpoint for several requests sent without spacing.
+
+        The requests still go out one at a time over the kept-alive connection,
+        but other clients cannot slip in between and no spacing is added.
+        """
+        if (batch := _BATCH.get()) is not None and batch.queue is self:
+            yield
+            return
+        await self._acquire()
+        batch = _Batch(self)
+        token = _BATCH.set(batch)
+        try:
+            yield
+        finally:
+            _BATCH.reset(token)
+            if batch.held:
+                self._release()
+
+    async def backoff(self, delay: float) -> None:
+        """Wait before retrying a request without blocking other clients.
+
+        A batch gives up its slot while waiting and queues up for it again
+        afterwards, so other virtual servers are not stalled by the retries.
+        """
+        if (batch := _BATCH.get()) is None or batch.queue is not self:
+            await asyncio.sleep(delay)
+            return
+        self._release()
+        batch.held = False
+        await asyncio.sleep(delay)
+        await self._acquire()
+        batch.held = True
+
+    async def _acquire(self) -> None:
+        """Take the endpoint once the spacing after the last request passed."""
+        await self._lock.acquire()
+        try:
+            delay = self._next_slot - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        except BaseException:
+            self._lock.release()
+            raise
+
+    def _release(self) -> None:
+        """Give up the endpoint and start the spacing to the next request."""
+        self._next_slot = time.monotonic() + self.spacing
+        self._lock.release()
 
 
 class TeamSpeakWebQueryClient:
@@ -17,36 +222,102 @@ class TeamSpeakWebQueryClient:
         self,
         host: str,
         port: int,
-        server_id: int,
+        server_id: int | None,
         api_key: str,
         session: ClientSession,
+        queue: TeamSpeakRequestQueue | None = None,
+        ssl: bool = False,
+        timeout: float | None = None,
     ) -> None:
-        """Initialize the TeamSpeak WebQuery client."""
+        """Initialize the TeamSpeak WebQuery client.
+
+        Without a server ID only instance-wide commands like serverlist work.
+        A timeout overrides the per-endpoint defaults.
+        """
         self.host = host
         self.port = port
         self.server_id = server_id
         self.api_key = api_key
         self.session = session
-        self.base_url = f"http://{host}:{port}/{server_id}"
+        self.queue = queue or TeamSpeakRequestQueue()
+        self.ssl = ssl
+        self.timeout = timeout
+        self.base_url = f"{'https' if ssl else 'http'}://{host}:{port}"
+        # Requests, errors, sizes and latencies per endpoint
+        self.stats: dict[str, EndpointStats] = {}
 
-    async def _request(self, endpoint: str) -> dict[str, Any]:
-        """Make a request to the TeamSpeak WebQuery API."""
-        url = f"{self.base_url}/{endpoint}"
-        params = {"api-key": self.api_key}
+    def for_server(self, server_id: int) -> TeamSpeakWebQueryClient:
+        """Return a client for a virtual server sharing session and queue."""
+        return TeamSpeakWebQueryClient(
+            host=self.host,
+            port=self.port,
+            server_id=server_id,
+            api_key=self.api_key,
+            session=self.session,
+            queue=self.queue,
+            ssl=self.ssl,
+            timeout=self.timeout,
+        )
 
-        try:
-            async with asyncio.timeout(10):
-                # TeamSpeak WebQuery requires using the same session for all requests
-                # Creating new sessions or closing connections crashes the server
-                response = await self.session.post(url, params=params)
-                response.raise_for_status()
-                data = await response.json()
-        except TimeoutError as err:
-            raise CannotConnect("Timeout connecting to TeamSpeak server") from err
-        except ClientError as err:
-            raise CannotConnect(f"Error connecting to TeamSpeak server: {err}") from err
-        except Exception as err:
-            raise CannotConnect(f"Unexpected error: {err}") from err
+    @property
+    def request_counts(self) -> dict[str, int]:
+        """Return the number of requests issued per endpoint."""
+        return {endpoint: stats.requests for endpoint, stats in self.stats.items()}
+
+    def batch(self) -> AbstractAsyncContextManager[None]:
+        """Send the requests made within the context as one batch."""
+        return self.queue.batch()
+
+    async def _request(
+        self,
+        endpoint: str,
+        *options: str,
+        server_scoped: bool = True,
+    ) -> dict[str, Any]:
+        """Make a request to the TeamSpeak WebQuery API.
+
+        Options are passed as bare query flags, e.g. "-uid" for clientlist.
+        """
+        if server_scoped:
+            path = f"{self.base_url}/{self.server_id}/{endpoint}"
+        else:
+            path = f"{self.base_url}/{endpoint}"
+        # Built by hand since WebQuery expects valueless flags like "?-uid"
+        query = "&".join([f"api-key={quote(self.api_key, safe='')}", *options])
+        url = URL(f"{path}?{query}", encoded=True)
+        timeout = self.timeout or ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+        breaker = self.queue.breaker
+        deadline = time.monotonic() + RETRY_BUDGET
+        if (stats := self.stats.get(endpoint)) is None:
+            stats = self.stats[endpoint] = EndpointStats()
+
+        attempt = 0
+        while True:
+            if not breaker.allow_request():
+                stats.record_error("circuit_open")
+                raise CannotConnect("TeamSpeak server is unreachable, retrying later")
+            stats.requests += 1
+            try:
+                data = await self._post(url, timeout, stats)
+            except _RejectedError as err:
+                # The endpoint answered, so it is up even if the request failed
+                breaker.record_success()
+                raise CannotConnect(str(err)) from err.__cause__
+            except _TransientError as err:
+                breaker.record_failure()
+                delay = RETRY_BASE_DELAY * 2**attempt * random.uniform(0.5, 1.5)
+                attempt += 1
+                if (
+                    attempt > MAX_RETRIES
+                    or breaker.is_open
+                    or time.monotonic() + delay + timeout > deadline
+                ):
+                    raise CannotConnect(str(err)) from err.__cause__
+                _LOGGER.debug("Retrying %s in %.1f seconds: %s", endpoint, delay, err)
+                await self.queue.backoff(delay)
+                continue
+            breaker.record_success()
+            break
 
         # Check API response status
         status = data.get("status", {})
@@ -54,11 +325,65 @@ class TeamSpeakWebQueryClient:
             error_msg = status.get("message", "Unknown error")
             # Common error codes
             if status.get("code") == 3329:  # Invalid API key
+                stats.record_error("invalid_auth")
                 raise InvalidAuth(f"Invalid API key: {error_msg}")
+            stats.record_error("api_error")
             raise CannotConnect(f"API error: {error_msg}")
 
         return data
 
+    async def _post(
+        self, url: URL, timeout: float, stats: EndpointStats
+    ) -> dict[str, Any]:
+        """Send one request and return the decoded response."""
+        try:
+            async with self.queue.slot(), asyncio.timeout(timeout):
+                started = time.monotonic()
+                # TeamSpeak WebQuery requires using the same session for all requests
+                # Creating new sessions or closing connections crashes the server
+                response = await self.session.post(url)
+                response.raise_for_status()
+                body = await response.read()
+                stats.record_response(time.monotonic() - started, len(body))
+        except TimeoutError as err:
+            stats.record_error("timeout")
+            raise _TransientError("Timeout connecting to TeamSpeak server") from err
+        except ClientResponseError as err:
+            if err.status >= 500:
+                stats.record_error("server_error")
+                raise _TransientError(f"Server error: {err.status}") from err
+            stats.record_error("client_error")
+            raise _RejectedError(
+                f"Error connecting to TeamSpeak server: {err}"
+            ) from err
+        except (ClientConnectorCertificateError, ServerFingerprintMismatch) as err:
+            # Retrying cannot fix a certificate that does not match
+            stats.record_error("certificate")
+            raise CannotConnect(
+                f"Certificate of TeamSpeak server rejected: {err}"
+            ) from err
+        except ClientConnectionError as err:
+            stats.record_error("connection")
+            raise _TransientError(
+                f"Error connecting to TeamSpeak server: {err}"
+            ) from err
+        except ClientError as err:
+            stats.record_error("connection")
+            raise CannotConnect(f"Error connecting to TeamSpeak server: {err}") from err
+        except Exception as err:
+            stats.record_error("unexpected")
+            raise CannotConnect(f"Unexpected error: {err}") from err
+
+        # Decoded once with orjson after releasing the request slot. An executor
+        # does not help here: orjson holds the GIL, so the loop stalls anyway.
+        try:
+            return json_loads_object(body)
+        except ValueError as err:
+            stats.record_error("invalid_response")
+            raise _RejectedError(
+                f"Invalid response from TeamSpeak server: {err}"
+            ) from err
+
     async def test_connection(self) -> dict[str, Any]:
         """Test the connection and return server info."""
         data = await self._request("serverinfo")
@@ -67,6 +392,11 @@ class TeamSpeakWebQueryClient:
             raise CannotConnect("Empty response from server")
         return body[0]
 
+    async def get_server_list(self) -> list[dict[str, Any]]:
+        """Get the virtual servers running on this instance."""
+        data = await self._request("serverlist", server_scoped=False)
+        return data.get("body", [])
+
     async def get_server_info(self) -> dict[str, Any]:
         """Get server information."""
         data = await self._request("serverinfo")
@@ -77,7 +407,14 @@ class TeamSpeakWebQueryClient:
 
     async def get_client_list(self) -> list[dict[str, Any]]:
         """Get list of connected clients."""
-        data = await self._request("clientlist")
+        data = await self._request(
+            "clientlist", "-uid", "-away", "-voice", "-times", "-groups", "-country"
+        )
+        return data.get("body", [])
+
+    async def get_server_group_list(self) -> list[dict[str, Any]]:
+        """Get list of server groups."""
+        data = await self._request("servergrouplist")
         return data.get("body", [])
 
     async def get_channel_list(self) -> list[dict[str, Any]]:
@@ -85,6 +422,14 @@ class TeamSpeakWebQueryClient:
         data = await self._request("channellist")
         return data.get("body", [])
 
+    async def get_client_info(self, clid: int) -> dict[str, Any]:
+        """Get the details and connection info of one client."""
+        data = await self._request("clientinfo", f"clid={clid}")
+        body = data.get("body", [])
+        if not body:
+            raise CannotConnect("Empty client info response")
+        return body[0]
+
 
 class CannotConnect(HomeAssistantError):
     """Error to indicate we cannot connect."""
@@ -92,3 +437,11 @@ class CannotConnect(HomeAssistantError):
 
 class InvalidAuth(HomeAssistantError):
     """Error to indicate there is invalid auth."""
+
+
+class _TransientError(Exception):
+    """Failure that may succeed when retried."""
+
+
+class _RejectedError(Exception):
+    """Failure of a request the endpoint answered."""
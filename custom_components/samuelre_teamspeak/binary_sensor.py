@@ -0,0 +1,77 @@
+"""Binary sensor platform for TeamSpeak Server Info integration."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import Any
+
+from homeassistant.components.binary_sensor import (
+    BinarySensorDeviceClass,
+    BinarySensorEntity,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
+
+from . import TeamSpeakConfigEntry
+from .tracker import TeamSpeakPresenceTracker
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: TeamSpeakConfigEntry,
+    async_add_entities: AddConfigEntryEntitiesCallback,
+) -> None:
+    """Set up TeamSpeak binary sensor platform."""
+    for tracker in entry.runtime_data.trackers.values():
+
+        @callback
+        def _async_add_clients(
+            uids: Iterable[str], tracker: TeamSpeakPresenceTracker = tracker
+        ) -> None:
+            """Create presence sensors for newly tracked clients."""
+            async_add_entities(
+                [TeamSpeakClientPresenceSensor(tracker, uid) for uid in uids]
+            )
+
+        tracker.async_set_client_adder(_async_add_clients)
+
+
+class TeamSpeakClientPresenceSensor(BinarySensorEntity):
+    """Binary sensor showing whether a client is connected."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    _attr_device_class = BinarySensorDeviceClass.PRESENCE
+
+    def __init__(self, tracker: TeamSpeakPresenceTracker, uid: str) -> None:
+        """Initialize the sensor."""
+        self._tracker = tracker
+        self._uid = uid
+        self._attr_unique_id = f"{tracker.client_prefix}{uid}"
+        self._attr_name = tracker.client_nickname(uid) or uid
+        self._attr_device_info = tracker.device_info
+
+    async def async_added_to_hass(self) -> None:
+        """Register with the tracker, which writes the state on changes."""
+        await super().async_added_to_hass()
+        self._tracker.client_entities[self._uid] = self
+        self.async_on_remove(lambda: self._tracker.client_entities.pop(self._uid, None))
+
+    @property
+    def available(self) -> bool:
+        """Return if the server data is available."""
+        return self._tracker.coordinator.data_available
+
+    @property
+    def is_on(self) -> bool:
+        """Return True if the client is connected."""
+        return self._tracker.is_online(self._uid)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        return {
+            "unique_identifier": self._uid,
+            "nickname": self._tracker.client_nickname(self._uid),
+            "channels": self._tracker.client_channels(self._uid),
+        }
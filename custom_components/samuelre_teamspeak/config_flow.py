@@ -7,19 +7,75 @@ from typing import Any
 
 import voluptuous as vol
 
-from homeassistant.config_entries import ConfigFlow, ConfigFlowResult
-from homeassistant.const import CONF_HOST, CONF_PORT, CONF_SCAN_INTERVAL
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.config_entries import (
+    ConfigEntry,
+    ConfigEntryState,
+    ConfigFlow,
+    ConfigFlowResult,
+    OptionsFlow,
+)
+from homeassistant.const import (
+    CONF_HOST,
+    CONF_PORT,
+    CONF_SCAN_INTERVAL,
+    CONF_SSL,
+    CONF_VERIFY_SSL,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.selector import (
+    SelectOptionDict,
+    SelectSelector,
+    SelectSelectorConfig,
+    SelectSelectorMode,
+)
 
 from .api import CannotConnect, InvalidAuth, TeamSpeakWebQueryClient
+from .connection import (
+    InvalidCertificateConfig,
+    async_create_session,
+    parse_fingerprint,
+)
+from .query import TeamSpeakServerQueryClient
 from .const import (
+    CONF_ABSENCE_TIMEOUT,
+    CONF_ADAPTIVE_POLLING,
     CONF_API_KEY,
-    CONF_SERVER_ID,
+    CONF_CA_CERT,
+    CONF_CERT_FINGERPRINT,
+    CONF_CHANNEL_ATTRIBUTES,
+    CONF_CHANNEL_LIST_INTERVAL,
+    CONF_CLIENT_ATTRIBUTES,
+    CONF_CLIENT_LIST_INTERVAL,
+    CONF_ENTRY_TYPE,
+    CONF_MAX_INTERVAL,
+    CONF_MAX_LIST_LENGTH,
+    CONF_MAX_TRACKED_CHANNELS,
+    CONF_MAX_TRACKED_CLIENTS,
+    CONF_MIN_INTERVAL,
+    CONF_QUALITY_SAMPLES,
+    CONF_QUERY_PASSWORD,
+    CONF_QUERY_PORT,
+    CONF_QUERY_USERNAME,
+    CONF_REQUEST_TIMEOUT,
+    CONF_SERVER_IDS,
+    CONF_SUBTREE_CHANNELS,
+    CONF_TRACKED_CHANNELS,
+    CONF_TRACKED_CLIENTS,
+    DEFAULT_ABSENCE_TIMEOUT,
+    DEFAULT_CHANNEL_ATTRIBUTES,
+    DEFAULT_CHANNEL_LIST_INTERVAL,
+    DEFAULT_CLIENT_ATTRIBUTES,
+    DEFAULT_CLIENT_LIST_INTERVAL,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MAX_LIST_LENGTH,
     DEFAULT_PORT,
+    DEFAULT_QUERY_PORT,
     DEFAULT_SCAN_INTERVAL,
-    DEFAULT_SERVER_ID,
     DOMAIN,
+    ENTRY_TYPE_FLEET,
+    FLEET_UNIQUE_ID,
+    MAX_QUALITY_SAMPLES,
+    MAX_REQUEST_TIMEOUT,
     MIN_SCAN_INTERVAL,
 )
 
@@ -29,65 +85,454 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_HOST): str,
         vol.Required(CONF_PORT, default=DEFAULT_PORT): int,
-        vol.Required(CONF_SERVER_ID, default=DEFAULT_SERVER_ID): int,
         vol.Required(CONF_API_KEY): str,
         vol.Required(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): vol.All(
             int, vol.Range(min=MIN_SCAN_INTERVAL)
         ),
+        vol.Optional(CONF_SSL, default=False): bool,
+        vol.Optional(CONF_VERIFY_SSL, default=True): bool,
+        vol.Optional(CONF_CA_CERT): str,
+        vol.Optional(CONF_CERT_FINGERPRINT): str,
+        vol.Optional(CONF_QUERY_PORT, default=DEFAULT_QUERY_PORT): int,
+        vol.Optional(CONF_QUERY_USERNAME): str,
+        vol.Optional(CONF_QUERY_PASSWORD): str,
+    }
+)
+
+# The endpoint identifies the entry and cannot be changed by reconfiguring
+STEP_RECONFIGURE_DATA_SCHEMA = vol.Schema(
+    {
+        key: value
+        for key, value in STEP_USER_DATA_SCHEMA.schema.items()
+        if key not in (CONF_HOST, CONF_PORT)
     }
 )
+# Settings that change the TLS setup of the session
+CONNECTION_KEYS = (CONF_SSL, CONF_VERIFY_SSL, CONF_CA_CERT, CONF_CERT_FINGERPRINT)
 
+# Fields returned by clientlist and channellist; other names can be typed in
+CLIENT_FIELDS = [
+    "clid",
+    "cid",
+    "client_database_id",
+    "client_nickname",
+    "client_type",
+    "client_unique_identifier",
+    "client_away",
+    "client_away_message",
+    "client_flag_talking",
+    "client_input_muted",
+    "client_output_muted",
+    "client_idle_time",
+    "client_servergroups",
+    "client_channel_group_id",
+    "client_country",
+]
+CHANNEL_FIELDS = [
+    "cid",
+    "pid",
+    "channel_order",
+    "channel_name",
+    "total_clients",
+    "channel_needed_subscribe_power",
+]
 
-async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
+
+def _fields_selector(fields: list[str]) -> SelectSelector:
+    """Return a multi-select selector for record fields."""
+    return SelectSelector(
+        SelectSelectorConfig(
+            options=fields,
+            multiple=True,
+            custom_value=True,
+            mode=SelectSelectorMode.DROPDOWN,
+        )
+    )
+
+
+class CannotConnectQuery(Exception):
+    """Error to indicate the ServerQuery login failed."""
+
+
+class NoServers(Exception):
+    """Error to indicate no virtual servers were found."""
+
+
+async def validate_input(
+    hass: HomeAssistant,
+    data: dict[str, Any],
+    running: TeamSpeakWebQueryClient | None = None,
+) -> dict[int, str]:
     """Validate the user input allows us to connect.
 
     Data has the keys from STEP_USER_DATA_SCHEMA with values provided by the user.
+    The session and queue of a running client are used when given.
+    Returns the discovered virtual servers mapped to their names.
     """
-    session = async_get_clientsession(hass)
+    if running is not None:
+        session = running.session
+    else:
+        if fingerprint := data.get(CONF_CERT_FINGERPRINT):
+            parse_fingerprint(fingerprint)
+        session = await async_create_session(hass, data)
     client = TeamSpeakWebQueryClient(
         host=data[CONF_HOST],
         port=data[CONF_PORT],
-        server_id=data[CONF_SERVER_ID],
+        server_id=None,
         api_key=data[CONF_API_KEY],
         session=session,
+        queue=running.queue if running is not None else None,
+        ssl=data.get(CONF_SSL, False),
     )
 
-    server_info = await client.test_connection()
+    try:
+        server_list = await client.get_server_list()
+    finally:
+        if running is None:
+            await session.close()
+    if not server_list:
+        raise NoServers
+
+    # Push mode is optional, but validate the credentials if they were given
+    if data.get(CONF_QUERY_USERNAME):
+        query_client = TeamSpeakServerQueryClient(
+            host=data[CONF_HOST],
+            port=data[CONF_QUERY_PORT],
+            server_id=None,
+            username=data[CONF_QUERY_USERNAME],
+            password=data.get(CONF_QUERY_PASSWORD, ""),
+        )
+        try:
+            await query_client.connect()
+        except (CannotConnect, InvalidAuth) as err:
+            raise CannotConnectQuery from err
+        finally:
+            await query_client.close()
 
-    # Return info that you want to store in the config entry.
     return {
-        "title": server_info.get("virtualserver_name", "TeamSpeak Server"),
-        "unique_id": server_info.get("virtualserver_unique_identifier"),
+        int(server["virtualserver_id"]): server.get(
+            "virtualserver_name", "TeamSpeak Server"
+        )
+        for server in server_list
     }
 
 
 class TeamSpeakConfigFlow(ConfigFlow, domain=DOMAIN):
     """Handle a config flow for TeamSpeak Server Info."""
 
-    VERSION = 1
+    VERSION = 2
+
+    def __init__(self) -> None:
+        """Initialize the config flow."""
+        self._user_input: dict[str, Any] = {}
+        self._servers: dict[int, str] = {}
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> TeamSpeakOptionsFlow:
+        """Get the options flow for this handler."""
+        return TeamSpeakOptionsFlow()
+
+    @classmethod
+    @callback
+    def async_supports_options_flow(cls, config_entry: ConfigEntry) -> bool:
+        """Return True for host entries; the fleet entry has no options."""
+        return config_entry.data.get(CONF_ENTRY_TYPE) != ENTRY_TYPE_FLEET
 
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
-        """Handle the initial step."""
+        """Choose between adding a host and adding the fleet totals."""
+        return self.async_show_menu(step_id="user", menu_options=["host", "fleet"])
+
+    async def async_step_host(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Connect to a TeamSpeak host."""
         errors: dict[str, str] = {}
         if user_input is not None:
+            # One entry per WebQuery endpoint
+            self._async_abort_entries_match(
+                {CONF_HOST: user_input[CONF_HOST], CONF_PORT: user_input[CONF_PORT]}
+            )
             try:
-                info = await validate_input(self.hass, user_input)
+                self._servers = await validate_input(self.hass, user_input)
             except CannotConnect:
                 errors["base"] = "cannot_connect"
             except InvalidAuth:
                 errors["base"] = "invalid_auth"
+            except InvalidCertificateConfig:
+                errors["base"] = "invalid_certificate"
+            except CannotConnectQuery:
+                errors["base"] = "cannot_connect_query"
+            except NoServers:
+                errors["base"] = "no_servers"
             except Exception:
                 _LOGGER.exception("Unexpected exception")
                 errors["base"] = "unknown"
             else:
                 # Set unique ID to prevent duplicate setups
-                await self.async_set_unique_id(info["unique_id"])
+                await self.async_set_unique_id(
+                    f"{user_input[CONF_HOST]}:{user_input[CONF_PORT]}"
+                )
                 self._abort_if_unique_id_configured()
 
-                return self.async_create_entry(title=info["title"], data=user_input)
+                self._user_input = user_input
+                return await self.async_step_servers()
 
         return self.async_show_form(
-            step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
+            step_id="host", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
+        )
+
+    async def async_step_fleet(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Add the sensors totalling the servers of all hosts."""
+        await self.async_set_unique_id(FLEET_UNIQUE_ID)
+        self._abort_if_unique_id_configured()
+        if user_input is not None:
+            return self.async_create_entry(
+                title="TeamSpeak fleet", data={CONF_ENTRY_TYPE: ENTRY_TYPE_FLEET}
+            )
+        return self.async_show_form(step_id="fleet")
+
+    async def async_step_servers(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Select the virtual servers to monitor."""
+        if user_input is not None:
+            server_ids = sorted(
+                int(server_id) for server_id in user_input[CONF_SERVER_IDS]
+            )
+            if len(server_ids) == 1:
+                title = self._servers[server_ids[0]]
+            else:
+                title = self._user_input[CONF_HOST]
+            return self.async_create_entry(
+                title=title,
+                data={**self._user_input, CONF_SERVER_IDS: server_ids},
+            )
+
+        options = [
+            SelectOptionDict(value=str(server_id), label=f"{name} ({server_id})")
+            for server_id, name in self._servers.items()
+        ]
+        schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_SERVER_IDS, default=[option["value"] for option in options]
+                ): SelectSelector(
+                    SelectSelectorConfig(
+                        options=options,
+                        multiple=True,
+                        mode=SelectSelectorMode.LIST,
+                    )
+                ),
+            }
+        )
+        return self.async_show_form(step_id="servers", data_schema=schema)
+
+    async def async_step_reconfigure(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Change the credentials and connection settings of an entry."""
+        entry = self._get_reconfigure_entry()
+        if entry.data.get(CONF_ENTRY_TYPE) == ENTRY_TYPE_FLEET:
+            return self.async_abort(reason="fleet_not_reconfigurable")
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            data = {
+                key: value
+                for key, value in entry.data.items()
+                if key not in STEP_RECONFIGURE_DATA_SCHEMA.schema
+            }
+            data.update(user_input)
+            # Validate on the running session unless its TLS setup changes
+            running: TeamSpeakWebQueryClient | None = None
+            if entry.state is ConfigEntryState.LOADED and all(
+                data.get(key) == entry.data.get(key) for key in CONNECTION_KEYS
+            ):
+                coordinators = entry.runtime_data.coordinators
+                running = next(iter(coordinators.values())).client
+            try:
+                servers = await validate_input(self.hass, data, running)
+            except CannotConnect:
+                errors["base"] = "cannot_connect"
+            except InvalidAuth:
+                errors["base"] = "invalid_auth"
+            except InvalidCertificateConfig:
+                errors["base"] = "invalid_certificate"
+            except CannotConnectQuery:
+                errors["base"] = "cannot_connect_query"
+            except NoServers:
+                errors["base"] = "no_servers"
+            except Exception:
+                _LOGGER.exception("Unexpected exception")
+                errors["base"] = "unknown"
+            else:
+                if not set(data[CONF_SERVER_IDS]) <= servers.keys():
+                    errors["base"] = "missing_servers"
+                else:
+                    # The update listener applies what it can without a reload
+                    self.hass.config_entries.async_update_entry(entry, data=data)
+                    return self.async_abort(reason="reconfigure_successful")
+
+        return self.async_show_form(
+            step_id="reconfigure",
+            data_schema=self.add_suggested_values_to_schema(
+                STEP_RECONFIGURE_DATA_SCHEMA, user_input or entry.data
+            ),
+            errors=errors,
+        )
+
+
+class TeamSpeakOptionsFlow(OptionsFlow):
+    """Handle options for TeamSpeak Server Info."""
+
+    def __init__(self) -> None:
+        """Initialize the options flow."""
+        self._options: dict[str, Any] = {}
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Manage the attribute projection and polling behavior."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            if user_input[CONF_MIN_INTERVAL] > user_input[CONF_MAX_INTERVAL]:
+                errors["base"] = "invalid_interval_range"
+            else:
+                self._options.update(user_input)
+                return await self.async_step_entities()
+
+        options = self.config_entry.options
+        schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_CLIENT_ATTRIBUTES,
+                    default=options.get(
+                        CONF_CLIENT_ATTRIBUTES, DEFAULT_CLIENT_ATTRIBUTES
+                    ),
+                ): _fields_selector(CLIENT_FIELDS),
+                vol.Required(
+                    CONF_CHANNEL_ATTRIBUTES,
+                    default=options.get(
+                        CONF_CHANNEL_ATTRIBUTES, DEFAULT_CHANNEL_ATTRIBUTES
+                    ),
+                ): _fields_selector(CHANNEL_FIELDS),
+                vol.Required(
+                    CONF_MAX_LIST_LENGTH,
+                    default=options.get(CONF_MAX_LIST_LENGTH, DEFAULT_MAX_LIST_LENGTH),
+                ): vol.All(int, vol.Range(min=0)),
+                vol.Required(
+                    CONF_ADAPTIVE_POLLING,
+                    default=options.get(CONF_ADAPTIVE_POLLING, False),
+                ): bool,
+                vol.Required(
+                    CONF_MIN_INTERVAL,
+                    default=options.get(CONF_MIN_INTERVAL, MIN_SCAN_INTERVAL),
+                ): vol.All(int, vol.Range(min=MIN_SCAN_INTERVAL)),
+                vol.Required(
+                    CONF_MAX_INTERVAL,
+                    default=options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL),
+                ): vol.All(int, vol.Range(min=MIN_SCAN_INTERVAL)),
+                vol.Required(
+                    CONF_CLIENT_LIST_INTERVAL,
+                    default=options.get(
+                        CONF_CLIENT_LIST_INTERVAL, DEFAULT_CLIENT_LIST_INTERVAL
+                    ),
+                ): vol.All(int, vol.Range(min=MIN_SCAN_INTERVAL)),
+                vol.Required(
+                    CONF_CHANNEL_LIST_INTERVAL,
+                    default=options.get(
+                        CONF_CHANNEL_LIST_INTERVAL, DEFAULT_CHANNEL_LIST_INTERVAL
+                    ),
+                ): vol.All(int, vol.Range(min=MIN_SCAN_INTERVAL)),
+                vol.Required(
+                    CONF_REQUEST_TIMEOUT,
+                    default=options.get(CONF_REQUEST_TIMEOUT, 0),
+                ): vol.All(int, vol.Range(min=0, max=MAX_REQUEST_TIMEOUT)),
+                vol.Required(
+                    CONF_QUALITY_SAMPLES,
+                    default=options.get(CONF_QUALITY_SAMPLES, 0),
+                ): vol.All(int, vol.Range(min=0, max=MAX_QUALITY_SAMPLES)),
+            }
+        )
+        return self.async_show_form(step_id="init", data_schema=schema, errors=errors)
+
+    async def async_step_entities(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Manage the per-client and per-channel entities."""
+        if user_input is not None:
+            return self.async_create_entry(data={**self._options, **user_input})
+
+        # Offer the clients and channels currently seen on the servers
+        clients: dict[str, str] = {}
+        channels: set[str] = set()
+        if self.config_entry.state is ConfigEntryState.LOADED:
+            for coordinator in self.config_entry.runtime_data.coordinators.values():
+                for client in coordinator.data.clients.values():
+                    if uid := client.unique_identifier:
+                        clients[uid] = client.nickname or uid
+                channels.update(
+                    channel.name for channel in coordinator.data.channels.values()
+                )
+
+        options = self.config_entry.options
+        tracked_clients = options.get(CONF_TRACKED_CLIENTS, [])
+        tracked_channels = options.get(CONF_TRACKED_CHANNELS, [])
+        subtree_channels = options.get(CONF_SUBTREE_CHANNELS, [])
+        client_options = [
+            SelectOptionDict(value=uid, label=clients.get(uid, uid))
+            for uid in {*clients, *tracked_clients}
+        ]
+        channel_options = sorted(channels | {*tracked_channels, *subtree_channels})
+
+        schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_TRACKED_CLIENTS, default=tracked_clients
+                ): SelectSelector(
+                    SelectSelectorConfig(
+                        options=client_options,
+                        multiple=True,
+                        custom_value=True,
+                        mode=SelectSelectorMode.DROPDOWN,
+                    )
+                ),
+                vol.Required(
+                    CONF_MAX_TRACKED_CLIENTS,
+                    default=options.get(CONF_MAX_TRACKED_CLIENTS, 0),
+                ): vol.All(int, vol.Range(min=0)),
+                vol.Required(
+                    CONF_TRACKED_CHANNELS, default=tracked_channels
+                ): SelectSelector(
+                    SelectSelectorConfig(
+                        options=channel_options,
+                        multiple=True,
+                        custom_value=True,
+                        mode=SelectSelectorMode.DROPDOWN,
+                    )
+                ),
+                vol.Required(
+                    CONF_MAX_TRACKED_CHANNELS,
+                    default=options.get(CONF_MAX_TRACKED_CHANNELS, 0),
+                ): vol.All(int, vol.Range(min=0)),
+                vol.Required(
+                    CONF_ABSENCE_TIMEOUT,
+                    default=options.get(CONF_ABSENCE_TIMEOUT, DEFAULT_ABSENCE_TIMEOUT),
+                ): vol.All(int, vol.Range(min=1)),
+                vol.Required(
+                    CONF_SUBTREE_CHANNELS, default=subtree_channels
+                ): SelectSelector(
+                    SelectSelectorConfig(
+                        options=channel_options,
+                        multiple=True,
+                        custom_value=True,
+                        mode=SelectSelectorMode.DROPDOWN,
+                    )
+                ),
+            }
         )
+        return self.async_show_form(step_id="entities", data_schema=schema)
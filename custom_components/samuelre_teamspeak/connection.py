@@ -0,0 +1,85 @@
+"""Dedicated HTTP session for one WebQuery endpoint."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+import ssl
+from typing import Any
+
+from aiohttp import ClientSession, Fingerprint, TCPConnector, ThreadedResolver
+
+from homeassistant.const import CONF_SSL, CONF_VERIFY_SSL
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.aiohttp_client import SERVER_SOFTWARE
+from homeassistant.util.ssl import client_context, get_default_no_verify_context
+
+from .const import CONF_CA_CERT, CONF_CERT_FINGERPRINT
+
+# Idle connections are kept longer than the longest polling interval, so
+# every refresh reuses the connection and TLS session of the previous one
+KEEPALIVE_TIMEOUT = 600
+DNS_CACHE_TTL = 300
+
+
+class InvalidCertificateConfig(HomeAssistantError):
+    """Error to indicate the CA certificate or fingerprint is invalid."""
+
+
+def parse_fingerprint(value: str) -> bytes:
+    """Return the SHA-256 digest of a hex fingerprint, colons allowed."""
+    try:
+        digest = bytes.fromhex(value.replace(":", "").strip())
+    except ValueError as err:
+        raise InvalidCertificateConfig("Fingerprint is not hexadecimal") from err
+    if len(digest) != 32:
+        raise InvalidCertificateConfig("Fingerprint must be a SHA-256 digest")
+    return digest
+
+
+async def async_create_session(
+    hass: HomeAssistant, data: Mapping[str, Any]
+) -> ClientSession:
+    """Create a session with one kept-alive connection to the endpoint.
+
+    WebQuery serves one request at a time and the request queue serializes
+    them anyway, so a single pooled connection per host is enough. The
+    session must be closed by the caller.
+    """
+    connector = TCPConnector(
+        limit_per_host=1,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        use_dns_cache=True,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        # The system resolver honours /etc/hosts and local names; with the
+        # cache above it only runs a few times an hour
+        resolver=ThreadedResolver(),
+        ssl=await _async_ssl(hass, data),
+    )
+    return ClientSession(connector=connector, headers={"User-Agent": SERVER_SOFTWARE})
+
+
+async def _async_ssl(
+    hass: HomeAssistant, data: Mapping[str, Any]
+) -> ssl.SSLContext | Fingerprint | bool:
+    """Return the TLS settings of the connector."""
+    if not data.get(CONF_SSL):
+        return True
+    # A pinned certificate is checked by its fingerprint instead of a CA
+    if fingerprint := data.get(CONF_CERT_FINGERPRINT):
+        return Fingerprint(parse_fingerprint(fingerprint))
+    if ca_cert := data.get(CONF_CA_CERT):
+        return await hass.async_add_executor_job(_load_ca_cert, ca_cert)
+    if not data.get(CONF_VERIFY_SSL, True):
+        return get_default_no_verify_context()
+    return client_context()
+
+
+def _load_ca_cert(path: str) -> ssl.SSLContext:
+    """Return a verifying context trusting the CA certificates in a file."""
+    try:
+        return ssl.create_default_context(cafile=path)
+    except (OSError, ssl.SSLError) as err:
+        raise InvalidCertificateConfig(
+            f"Unable to load CA certificate {path}: {err}"
+        ) from err
@@ -1,13 +1,118 @@
 """Constants for the TeamSpeak Server Info integration."""
 
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from homeassistant.util.hass_dict import HassKey
+
+if TYPE_CHECKING:
+    from .api import TeamSpeakRequestQueue
+    from .fleet import TeamSpeakFleet
+    from .models import TeamSpeakSnapshot
+
 DOMAIN = "samuelre_teamspeak"
 
+# Request queues shared by all entries talking to the same WebQuery endpoint
+DATA_REQUEST_QUEUES: HassKey[dict[tuple[str, int], TeamSpeakRequestQueue]] = HassKey(
+    f"{DOMAIN}_request_queues"
+)
+# Snapshots of unloaded entries by entry ID, with the monotonic time they were
+# taken, so a reload starts from them instead of fetching everything again
+DATA_SNAPSHOTS: HassKey[dict[str, tuple[float, dict[int, TeamSpeakSnapshot]]]] = (
+    HassKey(f"{DOMAIN}_snapshots")
+)
+
+# Totals over the servers of every host entry
+DATA_FLEET: HassKey[TeamSpeakFleet] = HassKey(f"{DOMAIN}_fleet")
+
 # Configuration keys
-CONF_SERVER_ID = "server_id"
+CONF_SERVER_ID = "server_id"  # Version 1 entries only
+CONF_SERVER_IDS = "server_ids"
 CONF_API_KEY = "api_key"
 
+# The fleet entry has no host and only carries the fleet sensors
+CONF_ENTRY_TYPE = "entry_type"
+ENTRY_TYPE_FLEET = "fleet"
+FLEET_UNIQUE_ID = "fleet"
+
+# HTTPS: a CA certificate file to trust, or a pinned certificate fingerprint
+CONF_CA_CERT = "ca_cert"
+CONF_CERT_FINGERPRINT = "cert_fingerprint"
+
 # Default values
 DEFAULT_PORT = 10080
-DEFAULT_SERVER_ID = 1
 DEFAULT_SCAN_INTERVAL = 60
 MIN_SCAN_INTERVAL = 5
+DEFAULT_MAX_INTERVAL = 300
+
+# ServerQuery push mode
+CONF_QUERY_PORT = "query_port"
+CONF_QUERY_USERNAME = "query_username"
+CONF_QUERY_PASSWORD = "query_password"
+DEFAULT_QUERY_PORT = 10011
+# Full poll interval while the push channel is connected
+CONSISTENCY_CHECK_INTERVAL = 600
+
+# Attribute projection
+CONF_CLIENT_ATTRIBUTES = "client_attributes"
+CONF_CHANNEL_ATTRIBUTES = "channel_attributes"
+CONF_MAX_LIST_LENGTH = "max_list_length"
+DEFAULT_CLIENT_ATTRIBUTES = ["clid", "cid", "client_nickname"]
+DEFAULT_CHANNEL_ATTRIBUTES = ["cid", "pid", "channel_name", "total_clients"]
+DEFAULT_MAX_LIST_LENGTH = 100
+
+# Overrides the per-endpoint request timeouts; 0 keeps the defaults
+CONF_REQUEST_TIMEOUT = "request_timeout"
+MAX_REQUEST_TIMEOUT = 60
+
+# clientinfo requests per refresh sampling the connection of a few clients,
+# rotating through all of them; 0 disables the sampling
+CONF_QUALITY_SAMPLES = "quality_samples"
+MAX_QUALITY_SAMPLES = 20
+
+# Tiered refresh: the client and channel lists are fetched less often than
+# serverinfo, or as soon as their count in serverinfo changes
+CONF_CLIENT_LIST_INTERVAL = "client_list_interval"
+CONF_CHANNEL_LIST_INTERVAL = "channel_list_interval"
+DEFAULT_CLIENT_LIST_INTERVAL = 60
+DEFAULT_CHANNEL_LIST_INTERVAL = 300
+
+# Adaptive polling
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
+CONF_MIN_INTERVAL = "min_interval"
+CONF_MAX_INTERVAL = "max_interval"
+
+# Services
+SERVICE_GET_ROSTER = "get_roster"
+SERVICE_GET_SESSIONS = "get_sessions"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_SERVER_ID = "server_id"
+ATTR_DAYS = "days"
+ATTR_LIMIT = "limit"
+
+# Per-client and per-channel entities
+CONF_TRACKED_CLIENTS = "tracked_clients"
+CONF_TRACKED_CHANNELS = "tracked_channels"
+CONF_MAX_TRACKED_CLIENTS = "max_tracked_clients"
+CONF_MAX_TRACKED_CHANNELS = "max_tracked_channels"
+CONF_ABSENCE_TIMEOUT = "absence_timeout"
+DEFAULT_ABSENCE_TIMEOUT = 168  # hours
+
+# Channels whose occupancy including subchannels gets a sensor
+CONF_SUBTREE_CHANNELS = "subtree_channels"
+
+# Bus events fired for client changes, and the single event replacing them
+# on a mass reconnect
+EVENT_CLIENT_JOINED = f"{DOMAIN}_client_joined"
+EVENT_CLIENT_LEFT = f"{DOMAIN}_client_left"
+EVENT_CLIENT_MOVED = f"{DOMAIN}_client_moved"
+EVENT_CLIENTS_CHANGED = f"{DOMAIN}_clients_changed"
+# A mass reconnect is a server restart or this share of the clients leaving
+# at once, on servers with at least the minimum number of clients
+MASS_RECONNECT_SHARE = 0.5
+MASS_RECONNECT_MIN_CLIENTS = 10
+# Client events fired per event loop iteration, the rest follow in order
+EVENT_BATCH_SIZE = 20
+# Fired when the data rate of a direction jumps well above its average
+EVENT_TRAFFIC_SPIKE = f"{DOMAIN}_traffic_spike"
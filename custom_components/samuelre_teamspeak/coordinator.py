@@ -2,20 +2,62 @@
 
 from __future__ import annotations
 
-from datetime import timedelta
+from collections.abc import Mapping
+from dataclasses import replace
+from datetime import datetime, timedelta
 import logging
+import time
 from typing import Any
 
 from homeassistant.config_entries import ConfigEntry, ConfigEntryAuthFailed
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_SCAN_INTERVAL
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
 from .api import CannotConnect, InvalidAuth, TeamSpeakWebQueryClient
+from .adaptive import (
+    REASON_FIXED,
+    REASON_PUSH,
+    AdaptiveIntervalController,
+)
+from .const import (
+    CONF_ADAPTIVE_POLLING,
+    CONF_API_KEY,
+    CONF_CHANNEL_LIST_INTERVAL,
+    CONF_CLIENT_LIST_INTERVAL,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    CONF_REQUEST_TIMEOUT,
+    CONSISTENCY_CHECK_INTERVAL,
+    DEFAULT_CHANNEL_LIST_INTERVAL,
+    DEFAULT_CLIENT_LIST_INTERVAL,
+    DEFAULT_MAX_INTERVAL,
+    MIN_SCAN_INTERVAL,
+)
+from .diff import ListDelta, diff_records
+from .instrumentation import LatencyHistogram
+from .models import (
+    BandwidthRates,
+    Channel,
+    ChannelTree,
+    Client,
+    ClientEvents,
+    ClientIndex,
+    ClientSummary,
+    ServerInfo,
+    TeamSpeakSnapshot,
+)
+from .rates import BandwidthMeter
 
 _LOGGER = logging.getLogger(__name__)
 
+# Refreshes taking longer are logged when debug logging is enabled
+SLOW_REFRESH_THRESHOLD = 2.0
 
-class TeamSpeakDataUpdateCoordinator(DataUpdateCoordinator[dict[str, Any]]):
+
+class TeamSpeakDataUpdateCoordinator(DataUpdateCoordinator[TeamSpeakSnapshot]):
     """Class to manage fetching TeamSpeak data."""
 
     def __init__(
@@ -24,32 +66,546 @@ class TeamSpeakDataUpdateCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         client: TeamSpeakWebQueryClient,
         config_entry: ConfigEntry,
         update_interval: int,
+        server_info: dict[str, Any] | None = None,
     ) -> None:
-        """Initialize coordinator."""
+        """Initialize coordinator.
+
+        A server info response fetched during setup is used for the first refresh.
+        """
         super().__init__(
             hass,
             _LOGGER,
-            name="TeamSpeak Server Info",
+            name=f"TeamSpeak Server Info {client.server_id}",
             update_interval=timedelta(seconds=update_interval),
             config_entry=config_entry,
         )
         self.client = client
+        self._probe_server_info = server_info
+        self._poll_interval = timedelta(seconds=update_interval)
+        self._push_connected = False
+        self.interval_reason = REASON_FIXED
+        self._adaptive: AdaptiveIntervalController | None = None
+        self._fetched_at: dict[str, float] = {}
+        # ServerQuery clients are left out of the snapshot but still counted
+        self._query_clids: set[int] = set()
+        self._known_group_ids: set[int] = set()
+        self._bandwidth = BandwidthMeter()
+        self._configure(config_entry.options)
+        self._apply_interval()
+        # Bumped when options are applied in place so entities re-read them
+        self.options_revision = 0
+        # Bumped whenever the respective list changes so entities can skip writes
+        self.client_list_revision = 0
+        self.channel_list_revision = 0
+        self.refresh_count = 0
+        self.noop_refresh_count = 0
+        self.failed_refresh_count = 0
+        self.refresh_latency = LatencyHistogram()
+        # When the data was last fetched, or saved if it was restored
+        self.last_refresh_at: datetime | None = None
+        # Entity state writes, and writes skipped because nothing changed
+        self.entity_writes = 0
+        self.skipped_entity_writes = 0
 
-    async def _async_update_data(self) -> dict[str, Any]:
+    async def _async_update_data(self) -> TeamSpeakSnapshot:
         """Fetch data from TeamSpeak server."""
+        previous = self.data.server if self.data is not None else None
+        now = time.monotonic()
+        fetched: list[str] = []
+        # Only recorded once the whole refresh succeeded, so lists fetched
+        # before a failing request are fetched again on the next attempt
+        fetched_at: dict[str, float] = {}
         try:
             # TeamSpeak WebQuery requires sequential requests using the same session
             # The server crashes if we create new sessions or close connections
-            server_info = await self.client.get_server_info()
-            client_list = await self.client.get_client_list()
-            channel_list = await self.client.get_channel_list()
+            # One batch holds the host's queue slot, so the due requests go out
+            # back to back without spacing or other servers in between
+            async with self.client.batch():
+                if (server_info := self._probe_server_info) is not None:
+                    self._probe_server_info = None
+                else:
+                    server_info = await self.client.get_server_info()
+                    fetched.append("serverinfo")
+                # The counters are read when the response arrives, not when
+                # the refresh started waiting for the queue
+                sampled_at = time.monotonic()
+                server = ServerInfo.from_raw(server_info)
+
+                # The heavy lists are only fetched when due or when their count moved
+                clients = None
+                if self._is_due(
+                    "client_list",
+                    now,
+                    self._client_list_interval,
+                    server.clients_online,
+                    previous and previous.clients_online,
+                ):
+                    clients = self._parse_clients(await self.client.get_client_list())
+                    fetched.append("clientlist")
+                    fetched_at["client_list"] = now
+                channels = None
+                if self._is_due(
+                    "channel_list",
+                    now,
+                    self._channel_list_interval,
+                    server.channels_online,
+                    previous and previous.channels_online,
+                ):
+                    channels = {
+                        channel.cid: channel
+                        for channel in map(
+                            Channel.from_raw, await self.client.get_channel_list()
+                        )
+                    }
+                    fetched.append("channellist")
+                    fetched_at["channel_list"] = now
+
+                # Group names rarely change; new group IDs trigger a refetch
+                server_groups = None
+                if self._is_due(
+                    "server_groups", now, self._channel_list_interval, None, None
+                ) or (
+                    clients is not None
+                    and any(
+                        group not in self._known_group_ids
+                        for client in clients.values()
+                        for group in client.server_groups
+                    )
+                ):
+                    server_groups = await self._fetch_server_groups(clients)
+                    fetched.append("servergrouplist")
+                    fetched_at["server_groups"] = now
         except InvalidAuth as err:
+            self.failed_refresh_count += 1
             raise ConfigEntryAuthFailed("Invalid API key") from err
         except CannotConnect as err:
+            self.failed_refresh_count += 1
+            if self._adaptive is not None:
+                self._adaptive.record_failure()
+                self._apply_interval()
             raise UpdateFailed(f"Failed to connect to TeamSpeak server: {err}") from err
+
+        self._fetched_at.update(fetched_at)
+        rates = self._bandwidth.record(sampled_at, server)
+        data = self._build_snapshot(server, clients, channels, server_groups, rates)
+        duration = time.monotonic() - now
+        self.refresh_latency.record(duration)
+        if duration >= SLOW_REFRESH_THRESHOLD and _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "Slow refresh of %s took %.2f seconds: %s",
+                self.name,
+                duration,
+                {
+                    endpoint: self.client.stats[endpoint].latency.last
+                    for endpoint in fetched
+                },
+            )
+        self.refresh_count += 1
+        self.last_refresh_at = dt_util.utcnow()
+        if not (data.client_delta.changed or data.channel_delta.changed):
+            self.noop_refresh_count += 1
+        if self._adaptive is not None:
+            delta = data.client_delta
+            churn = len(delta.added) + len(delta.removed) + len(delta.modified)
+            bandwidth = (
+                server.bandwidth_received_last_minute
+                + server.bandwidth_sent_last_minute
+            )
+            self._adaptive.record_success(churn, bandwidth)
+            self._apply_interval()
+        return data
+
+    def _is_due(
+        self,
+        key: str,
+        now: float,
+        interval: float,
+        count: int | None,
+        previous_count: int | None,
+    ) -> bool:
+        """Return True if a list tier should be fetched on this refresh."""
+        if self.data is None or key not in self._fetched_at:
+            return True
+        if count != previous_count:
+            return True
+        return now - self._fetched_at[key] >= interval
+
+    def _parse_clients(self, records: list[dict[str, Any]]) -> dict[int, Client]:
+        """Parse clientlist records, leaving out ServerQuery clients."""
+        clients: dict[int, Client] = {}
+        self._query_clids = set()
+        for client in map(Client.from_raw, records):
+            if client.is_query:
+                self._query_clids.add(client.clid)
+            else:
+                clients[client.clid] = client
+        return clients
+
+    async def _fetch_server_groups(
+        self, clients: dict[int, Client] | None
+    ) -> dict[int, str] | None:
+        """Fetch the names of the regular server groups.
+
+        The group sensors are optional, so a failure keeps the previous names.
+        """
+        try:
+            records = await self.client.get_server_group_list()
+        except CannotConnect as err:
+            _LOGGER.debug("Could not fetch server groups: %s", err)
+            # Do not retry for the same unknown groups on every refresh
+            if clients is not None:
+                for client in clients.values():
+                    self._known_group_ids.update(client.server_groups)
+            return None
+        self._known_group_ids = {
+            int(record["sgid"]) for record in records if "sgid" in record
+        }
+        # Type 1 are regular groups; templates and query groups are skipped
+        return {
+            int(record["sgid"]): record.get("name", "")
+            for record in records
+            if "sgid" in record and record.get("type") == "1"
+        }
+
+    def _configure(self, options: Mapping[str, Any]) -> None:
+        """Read the list intervals and adaptive polling settings."""
+        self._client_list_interval = options.get(
+            CONF_CLIENT_LIST_INTERVAL, DEFAULT_CLIENT_LIST_INTERVAL
+        )
+        self._channel_list_interval = options.get(
+            CONF_CHANNEL_LIST_INTERVAL, DEFAULT_CHANNEL_LIST_INTERVAL
+        )
+        min_interval = options.get(CONF_MIN_INTERVAL, MIN_SCAN_INTERVAL)
+        max_interval = options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL)
+        if not options.get(CONF_ADAPTIVE_POLLING, False):
+            self._adaptive = None
+        elif self._adaptive is None:
+            self._adaptive = AdaptiveIntervalController(
+                min_interval=min_interval,
+                max_interval=max_interval,
+                initial=self._poll_interval.total_seconds(),
+            )
+        else:
+            # Keep what the controller learned, within the new bounds
+            self._adaptive.set_bounds(min_interval, max_interval)
+
+    @callback
+    def async_apply_config(
+        self, data: Mapping[str, Any], options: Mapping[str, Any]
+    ) -> None:
+        """Apply changed credentials, intervals and projections in place.
+
+        The snapshot, session and list fetch times are kept, so nothing is
+        fetched early; the next refresh is rescheduled with the new interval.
+        """
+        self.client.api_key = data[CONF_API_KEY]
+        self.client.timeout = options.get(CONF_REQUEST_TIMEOUT) or None
+        self._poll_interval = timedelta(seconds=data[CONF_SCAN_INTERVAL])
+        self._configure(options)
+        self._apply_interval()
+        self._schedule_refresh()
+        self.options_revision += 1
+        self.async_update_listeners()
+
+    @property
+    def data_available(self) -> bool:
+        """Return True if the data was fetched, or restored and not yet replaced."""
+        return self.last_update_success or self.data.restored_at is not None
+
+    @callback
+    def async_seed(self, data: TeamSpeakSnapshot) -> None:
+        """Start from the snapshot of a previous setup instead of fetching."""
+        self._probe_server_info = None
+        self._known_group_ids = set(data.server_groups)
+        if data.restored_at is not None:
+            self.last_refresh_at = data.restored_at
+        self.async_set_updated_data(data)
+
+    @callback
+    def async_restore(self, stored: dict[str, Any]) -> None:
+        """Start from a snapshot saved by an earlier run, marked as restored."""
+        channels = {
+            channel.cid: channel
+            for channel in map(Channel.from_raw, stored["channels"])
+        }
+        data = self._build_snapshot(
+            ServerInfo.from_raw(stored["server"]),
+            self._parse_clients(stored["clients"]),
+            channels,
+            {int(sgid): name for sgid, name in stored["server_groups"].items()},
+        )
+        self.async_seed(
+            replace(data, restored_at=dt_util.utc_from_timestamp(stored["saved_at"]))
+        )
+
+    def _apply_interval(self) -> None:
+        """Set the polling interval for the current mode."""
+        if self._push_connected:
+            interval = timedelta(seconds=CONSISTENCY_CHECK_INTERVAL)
+            self.interval_reason = REASON_PUSH
+        elif self._adaptive is not None:
+            interval = timedelta(seconds=self._adaptive.interval)
+            self.interval_reason = self._adaptive.reason
+        else:
+            interval = self._poll_interval
+            self.interval_reason = REASON_FIXED
+        self.update_interval = interval
+
+    def _build_snapshot(
+        self,
+        server: ServerInfo,
+        clients: dict[int, Client] | None,
+        channels: dict[int, Channel] | None,
+        server_groups: dict[int, str] | None = None,
+        rates: BandwidthRates | None = None,
+    ) -> TeamSpeakSnapshot:
+        """Diff the new lists against the previous snapshot and build the next one.
+
+        A list or rates of None means it was not fetched and is kept as is.
+        """
+        previous = self.data
+        updated: set[str] = set()
+        if previous is None or server != previous.server:
+            updated.add("server_info")
+
+        # Built from every fetch, since idle times and voice flags move without
+        # a list change
+        if clients is not None:
+            client_summary = ClientSummary.build(clients)
+        if previous is None or (
+            clients is not None and client_summary != previous.client_summary
+        ):
+            updated.add("client_summary")
+        else:
+            client_summary = previous.client_summary
+
+        if server_groups is None:
+            server_groups = previous.server_groups if previous is not None else {}
+        elif previous is None or server_groups != previous.server_groups:
+            updated.add("server_groups")
+
+        client_delta: ListDelta[Client] = ListDelta()
+        if clients is not None:
+            client_delta = diff_records(
+                previous.clients if previous is not None else {}, clients
+            )
+        if previous is None or client_delta.changed:
+            assert clients is not None
+            client_index = ClientIndex.build(clients)
+            # Changes since a restored snapshot happened while not running
+            client_events = (
+                ClientEvents.build(previous.clients, client_delta)
+                if previous is not None and previous.restored_at is None
+                else ClientEvents()
+            )
+            self.client_list_revision += 1
+            updated.add("client_list")
+        else:
+            # Keep the previous objects so unchanged data stays identical
+            clients = previous.clients
+            client_index = previous.client_index
+            client_events = ClientEvents()
+
+        channel_delta: ListDelta[Channel] = ListDelta()
+        if channels is not None:
+            channel_delta = diff_records(
+                previous.channels if previous is not None else {}, channels
+            )
+        if previous is None or channel_delta.changed:
+            assert channels is not None
+            self.channel_list_revision += 1
+            updated.add("channel_list")
+        else:
+            channels = previous.channels
+
+        # The tree only depends on parents, order and names, not on occupancy
+        if previous is None or _structure_changed(previous.channels, channel_delta):
+            channel_tree = ChannelTree.build(channels)
+            subtree_clients = channel_tree.count_clients(clients)
         else:
-            return {
-                "server_info": server_info,
-                "client_list": client_list,
-                "channel_list": channel_list,
+            channel_tree = previous.channel_tree
+            subtree_clients = previous.subtree_clients
+            if client_delta.changed:
+                subtree_clients = _apply_subtree_delta(
+                    channel_tree, subtree_clients, previous.clients, client_delta
+                )
+
+        if rates is None:
+            rates = previous.rates if previous is not None else BandwidthRates()
+
+        return TeamSpeakSnapshot(
+            server=server,
+            clients=clients,
+            channels=channels,
+            client_index=client_index,
+            client_summary=client_summary,
+            channel_tree=channel_tree,
+            subtree_clients=subtree_clients,
+            server_groups=server_groups,
+            client_delta=client_delta,
+            channel_delta=channel_delta,
+            client_events=client_events,
+            updated=frozenset(updated),
+            rates=rates,
+        )
+
+    @callback
+    def async_set_phase(self, delay: float) -> None:
+        """Shift the polling schedule by refreshing once after a delay."""
+        self.config_entry.async_on_unload(
+            async_call_later(self.hass, delay, self._async_phase_refresh)
+        )
+
+    async def _async_phase_refresh(self, _now: datetime) -> None:
+        """Refresh now, which restarts the interval from this point."""
+        await self.async_refresh()
+
+    @callback
+    def async_set_push_connected(self, connected: bool) -> None:
+        """Switch between regular polling and slow consistency checks."""
+        self._push_connected = connected
+        self._apply_interval()
+        if not connected:
+            # Catch up on anything missed while the push channel was down
+            self.hass.async_create_task(self.async_request_refresh())
+
+    @callback
+    def async_handle_notification(self, event: str, params: dict[str, str]) -> None:
+        """Apply a ServerQuery notification to the cached data."""
+        # A restored snapshot is replaced as a whole by the next refresh
+        if self.data is None or self.data.restored_at is not None:
+            return
+
+        server = self.data.server
+        clients = dict(self.data.clients)
+        channels = dict(self.data.channels)
+        existing = clients.get(int(params.get("clid", -1)))
+
+        if event == "notifycliententerview":
+            if existing is not None:
+                return
+            client = Client.from_raw(
+                {
+                    "clid": params["clid"],
+                    "cid": params["ctid"],
+                    **{
+                        key: value
+                        for key, value in params.items()
+                        if key.startswith("client_")
+                    },
+                }
+            )
+            if client.is_query:
+                if client.clid in self._query_clids:
+                    return
+                self._query_clids.add(client.clid)
+            else:
+                clients[client.clid] = client
+                _adjust_channel_clients(channels, client.cid, 1)
+            server = _adjust_clients_online(server, client.is_query, 1)
+        elif event == "notifyclientleftview":
+            if existing is not None:
+                del clients[existing.clid]
+                _adjust_channel_clients(channels, existing.cid, -1)
+                server = _adjust_clients_online(server, False, -1)
+            elif (clid := int(params["clid"])) in self._query_clids:
+                self._query_clids.discard(clid)
+                server = _adjust_clients_online(server, True, -1)
+            else:
+                return
+        elif event == "notifyclientmoved":
+            if existing is None:
+                return
+            target = int(params["ctid"])
+            clients[existing.clid] = existing.moved_to(target)
+            _adjust_channel_clients(channels, existing.cid, -1)
+            _adjust_channel_clients(channels, target, 1)
+        elif event == "notifychannelcreated":
+            channel = Channel.from_raw(
+                {
+                    "cid": params["cid"],
+                    "pid": params.get("cpid", "0"),
+                    "channel_order": params.get("channel_order", "0"),
+                    "channel_name": params.get("channel_name", ""),
+                    "total_clients": "0",
+                }
+            )
+            channels[channel.cid] = channel
+            server = server.adjust_counter(
+                "channels_online", "virtualserver_channelsonline", 1
+            )
+        elif event == "notifychanneldeleted":
+            if channels.pop(int(params["cid"]), None) is None:
+                return
+            server = server.adjust_counter(
+                "channels_online", "virtualserver_channelsonline", -1
+            )
+        elif event in ("notifychanneledited", "notifychannelmoved"):
+            if (channel := channels.get(int(params["cid"]))) is None:
+                return
+            changes = {
+                key: value
+                for key, value in params.items()
+                if key.startswith("channel_")
             }
+            if "cpid" in params:
+                changes["pid"] = params["cpid"]
+            if "order" in params:
+                changes["channel_order"] = params["order"]
+            channels[channel.cid] = channel.with_changes(changes)
+        else:
+            return
+
+        # Update listeners without rescheduling the consistency check
+        self.data = self._build_snapshot(server, clients, channels)
+        self.async_update_listeners()
+
+
+def _adjust_clients_online(
+    server: ServerInfo, is_query: bool, delta: int
+) -> ServerInfo:
+    """Adjust the online client counters for a joining or leaving client."""
+    server = server.adjust_counter(
+        "clients_online", "virtualserver_clientsonline", delta
+    )
+    if is_query:
+        server = server.adjust_counter(
+            "query_clients_online", "virtualserver_queryclientsonline", delta
+        )
+    return server
+
+
+def _adjust_channel_clients(channels: dict[int, Channel], cid: int, delta: int) -> None:
+    """Adjust the client count of one channel in place."""
+    if (channel := channels.get(cid)) is not None:
+        channels[cid] = channel.adjust_clients(delta)
+
+
+def _structure_changed(previous: dict[int, Channel], delta: ListDelta[Channel]) -> bool:
+    """Return True if channels were added, removed, renamed or moved."""
+    if delta.added or delta.removed:
+        return True
+    for cid, channel in delta.modified.items():
+        old = previous[cid]
+        if (channel.pid, channel.order, channel.name) != (old.pid, old.order, old.name):
+            return True
+    return False
+
+
+def _apply_subtree_delta(
+    tree: ChannelTree,
+    counts: dict[int, int],
+    previous: dict[int, Client],
+    delta: ListDelta[Client],
+) -> dict[int, int]:
+    """Return subtree counts updated for the clients that joined, left or moved."""
+    counts = dict(counts)
+    for client in delta.removed.values():
+        tree.add_client(counts, client.cid, -1)
+    for clid, client in delta.modified.items():
+        if (old := previous[clid]).cid != client.cid:
+            tree.add_client(counts, old.cid, -1)
+            tree.add_client(counts, client.cid, 1)
+    for client in delta.added.values():
+        tree.add_client(counts, client.cid, 1)
+    return counts
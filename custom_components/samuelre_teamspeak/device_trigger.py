@@ -0,0 +1,80 @@
+"""Device triggers for TeamSpeak client and traffic events."""
+
+from __future__ import annotations
+
+import voluptuous as vol
+
+from homeassistant.components.device_automation import DEVICE_TRIGGER_BASE_SCHEMA
+from homeassistant.components.homeassistant.triggers import event as event_trigger
+from homeassistant.const import (
+    ATTR_DEVICE_ID,
+    CONF_DEVICE_ID,
+    CONF_DOMAIN,
+    CONF_EVENT,
+    CONF_PLATFORM,
+    CONF_TYPE,
+)
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.trigger import TriggerActionType, TriggerInfo
+from homeassistant.helpers.typing import ConfigType
+
+from .const import (
+    DOMAIN,
+    EVENT_CLIENT_JOINED,
+    EVENT_CLIENT_LEFT,
+    EVENT_CLIENT_MOVED,
+    EVENT_CLIENTS_CHANGED,
+    EVENT_TRAFFIC_SPIKE,
+    FLEET_UNIQUE_ID,
+)
+
+# Trigger types and the events behind them
+TRIGGER_TYPES = {
+    "client_joined": EVENT_CLIENT_JOINED,
+    "client_left": EVENT_CLIENT_LEFT,
+    "client_moved": EVENT_CLIENT_MOVED,
+    "clients_changed": EVENT_CLIENTS_CHANGED,
+    "traffic_spike": EVENT_TRAFFIC_SPIKE,
+}
+
+TRIGGER_SCHEMA = DEVICE_TRIGGER_BASE_SCHEMA.extend(
+    {vol.Required(CONF_TYPE): vol.In(TRIGGER_TYPES)}
+)
+
+
+async def async_get_triggers(
+    hass: HomeAssistant, device_id: str
+) -> list[dict[str, str]]:
+    """List the event triggers of a virtual server."""
+    device = dr.async_get(hass).async_get(device_id)
+    if device is None or (DOMAIN, FLEET_UNIQUE_ID) in device.identifiers:
+        return []
+    return [
+        {
+            CONF_PLATFORM: "device",
+            CONF_DOMAIN: DOMAIN,
+            CONF_DEVICE_ID: device_id,
+            CONF_TYPE: trigger_type,
+        }
+        for trigger_type in TRIGGER_TYPES
+    ]
+
+
+async def async_attach_trigger(
+    hass: HomeAssistant,
+    config: ConfigType,
+    action: TriggerActionType,
+    trigger_info: TriggerInfo,
+) -> CALLBACK_TYPE:
+    """Attach a trigger."""
+    event_config = event_trigger.TRIGGER_SCHEMA(
+        {
+            event_trigger.CONF_PLATFORM: CONF_EVENT,
+            event_trigger.CONF_EVENT_TYPE: TRIGGER_TYPES[config[CONF_TYPE]],
+            event_trigger.CONF_EVENT_DATA: {ATTR_DEVICE_ID: config[CONF_DEVICE_ID]},
+        }
+    )
+    return await event_trigger.async_attach_trigger(
+        hass, event_config, action, trigger_info, platform_type="device"
+    )
@@ -0,0 +1,94 @@
+"""Diagnostics support for TeamSpeak Server Info integration."""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.core import HomeAssistant
+
+from . import TeamSpeakConfigEntry
+from .const import CONF_API_KEY, CONF_QUERY_PASSWORD, CONF_TRACKED_CLIENTS
+
+TO_REDACT = {CONF_API_KEY, CONF_QUERY_PASSWORD, CONF_TRACKED_CLIENTS}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: TeamSpeakConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    servers: dict[int, dict[str, Any]] = {}
+    for server_id, coordinator in entry.runtime_data.coordinators.items():
+        data = coordinator.data
+        sessions = entry.runtime_data.sessions[server_id]
+        breaker = coordinator.client.queue.breaker
+        servers[server_id] = {
+            "server": {
+                "name": data.server.name,
+                "version": data.server.version,
+                "platform": data.server.platform,
+                "status": data.server.status,
+                "clients_online": data.server.clients_online,
+                "channels_online": data.server.channels_online,
+                "uptime": data.server.uptime,
+            },
+            "snapshot": {
+                "clients": len(data.clients),
+                "channels": len(data.channels),
+                "server_groups": len(data.server_groups),
+                "client_list_revision": coordinator.client_list_revision,
+                "channel_list_revision": coordinator.channel_list_revision,
+                "restored_at": data.restored_at.isoformat()
+                if data.restored_at is not None
+                else None,
+            },
+            "polling": {
+                "last_update_success": coordinator.last_update_success,
+                "last_refresh_at": coordinator.last_refresh_at.isoformat()
+                if coordinator.last_refresh_at is not None
+                else None,
+                "update_interval": coordinator.update_interval.total_seconds()
+                if coordinator.update_interval is not None
+                else None,
+                "interval_reason": coordinator.interval_reason,
+                "refreshes": coordinator.refresh_count,
+                "noop_refreshes": coordinator.noop_refresh_count,
+                "failed_refreshes": coordinator.failed_refresh_count,
+                "refresh_latency": coordinator.refresh_latency.as_dict(),
+            },
+            "rates": asdict(data.rates),
+            "entities": {
+                "writes": coordinator.entity_writes,
+                "skipped_writes": coordinator.skipped_entity_writes,
+            },
+            "sessions": {
+                "users_online": sessions.users_online,
+                "users_tracked": sessions.users_tracked,
+            },
+            "quality": {
+                "budget": sampler.budget,
+                "requests": sampler.requests,
+                "failed_requests": sampler.failed_requests,
+                "sampled_clients": len(sampler.samples),
+            }
+            if (sampler := entry.runtime_data.quality.get(server_id)) is not None
+            else None,
+            "circuit_breaker": {
+                "open": breaker.is_open,
+                "failures": breaker.failures,
+                "reset_timeout": breaker.reset_timeout,
+            },
+            "endpoints": {
+                endpoint: stats.as_dict()
+                for endpoint, stats in coordinator.client.stats.items()
+            },
+        }
+
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": async_redact_data(entry.options, TO_REDACT),
+        },
+        "servers": servers,
+    }
@@ -0,0 +1,33 @@
+"""Incremental diffing of TeamSpeak client and channel lists."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class ListDelta[T]:
+    """Records added, removed and modified between two snapshots."""
+
+    added: dict[int, T] = field(default_factory=dict)
+    removed: dict[int, T] = field(default_factory=dict)
+    modified: dict[int, T] = field(default_factory=dict)
+
+    @property
+    def changed(self) -> bool:
+        """Return True if anything changed."""
+        return bool(self.added or self.removed or self.modified)
+
+
+def diff_records[T](previous: dict[int, T], current: dict[int, T]) -> ListDelta[T]:
+    """Compute the delta between two snapshots keyed by ID."""
+    delta: ListDelta[T] = ListDelta()
+    for record_id, record in current.items():
+        old = previous.get(record_id)
+        if old is None:
+            delta.added[record_id] = record
+        elif old != record:
+            delta.modified[record_id] = record
+    for record_id in previous.keys() - current.keys():
+        delta.removed[record_id] = previous[record_id]
+    return delta
@@ -0,0 +1,199 @@
+"""Home Assistant bus events for client changes and traffic spikes."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+import logging
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import ATTR_DEVICE_ID
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+
+from .const import (
+    DOMAIN,
+    EVENT_BATCH_SIZE,
+    EVENT_CLIENT_JOINED,
+    EVENT_CLIENT_LEFT,
+    EVENT_CLIENT_MOVED,
+    EVENT_CLIENTS_CHANGED,
+    EVENT_TRAFFIC_SPIKE,
+    MASS_RECONNECT_MIN_CLIENTS,
+    MASS_RECONNECT_SHARE,
+)
+from .coordinator import TeamSpeakDataUpdateCoordinator
+from .models import Channel, Client, TeamSpeakSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TeamSpeakEventDispatcher:
+    """Fire the client events computed by the coordinator on the bus.
+
+    On a mass reconnect, after a server restart or when most clients drop
+    at once, a single clients_changed event with the counts is fired instead
+    of one event per client. Otherwise every event is fired, in batches
+    spread over event loop iterations so a raid does not block the loop.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_id: int,
+    ) -> None:
+        """Initialize the dispatcher."""
+        self.hass = hass
+        self.entry = entry
+        self.coordinator = coordinator
+        self.server_id = server_id
+        self._server_unique_id = coordinator.data.server.unique_identifier
+        self._device_id: str | None = None
+        self._last_data: TeamSpeakSnapshot | None = coordinator.data
+        self._pending: deque[tuple[str, dict[str, Any]]] = deque()
+        self._fire_handle: asyncio.Handle | None = None
+
+    @callback
+    def async_start(self) -> None:
+        """Start following the coordinator."""
+        self.entry.async_on_unload(
+            self.coordinator.async_add_listener(self._async_handle_update)
+        )
+        self.entry.async_on_unload(self._async_cancel_pending)
+
+    @callback
+    def _async_handle_update(self) -> None:
+        """Fire the events of the latest snapshot."""
+        data = self.coordinator.data
+        # Failed refreshes keep the previous data and events
+        if data is self._last_data:
+            return
+        previous, self._last_data = self._last_data, data
+        # Snapshots built from notifications carry the rates of the last poll
+        if data.rates.spikes and (previous is None or data.rates is not previous.rates):
+            self._fire_traffic_spikes(data)
+        if not (events := data.client_events):
+            return
+
+        base = self._base_data()
+        restarted = previous is not None and _is_restart(previous, data)
+        if restarted or (previous is not None and _is_mass_reconnect(previous, data)):
+            _LOGGER.debug(
+                "Coalescing %s client events of %s", len(events), self.coordinator.name
+            )
+            self._fire(
+                [
+                    (
+                        EVENT_CLIENTS_CHANGED,
+                        {
+                            **base,
+                            "joined": len(events.joined),
+                            "left": len(events.left),
+                            "moved": len(events.moved),
+                            "server_restarted": restarted,
+                        },
+                    )
+                ]
+            )
+            return
+
+        channels = data.channels
+        fired: list[tuple[str, dict[str, Any]]] = []
+        for client in events.joined:
+            fired.append((EVENT_CLIENT_JOINED, _client_data(base, client, channels)))
+        for client in events.left:
+            fired.append((EVENT_CLIENT_LEFT, _client_data(base, client, channels)))
+        for before, client in events.moved:
+            event_data = _client_data(base, client, channels)
+            event_data["from_channel_id"] = before.cid
+            channel = channels.get(before.cid)
+            event_data["from_channel_name"] = channel.name if channel else None
+            fired.append((EVENT_CLIENT_MOVED, event_data))
+        self._fire(fired)
+
+    def _fire(self, events: list[tuple[str, dict[str, Any]]]) -> None:
+        """Fire client events after the ones still pending."""
+        self._pending.extend(events)
+        if self._fire_handle is None:
+            self._async_fire_pending()
+
+    @callback
+    def _async_fire_pending(self) -> None:
+        """Fire a batch of pending events and schedule the rest."""
+        self._fire_handle = None
+        for _ in range(min(EVENT_BATCH_SIZE, len(self._pending))):
+            self.hass.bus.async_fire(*self._pending.popleft())
+        if self._pending:
+            self._fire_handle = self.hass.loop.call_soon(self._async_fire_pending)
+
+    @callback
+    def _async_cancel_pending(self) -> None:
+        """Drop the pending events when the entry unloads."""
+        if self._fire_handle is not None:
+            self._fire_handle.cancel()
+            self._fire_handle = None
+        self._pending.clear()
+
+    def _fire_traffic_spikes(self, data: TeamSpeakSnapshot) -> None:
+        """Fire an event for every direction whose rate just spiked."""
+        base = self._base_data()
+        for direction in data.rates.spikes:
+            rates = getattr(data.rates, direction)
+            self.hass.bus.async_fire(
+                EVENT_TRAFFIC_SPIKE,
+                {
+                    **base,
+                    "direction": direction,
+                    "rate": round(rates.rate, 2),
+                    "average": round(rates.average, 2),
+                },
+            )
+
+    def _base_data(self) -> dict[str, Any]:
+        """Return the data identifying the virtual server of an event."""
+        # The device is created with the first entity, after the dispatcher
+        if self._device_id is None and (
+            device := dr.async_get(self.hass).async_get_device(
+                identifiers={(DOMAIN, self._server_unique_id)}
+            )
+        ):
+            self._device_id = device.id
+        return {
+            ATTR_DEVICE_ID: self._device_id,
+            "config_entry_id": self.entry.entry_id,
+            "server_id": self.server_id,
+        }
+
+
+def _is_restart(previous: TeamSpeakSnapshot, data: TeamSpeakSnapshot) -> bool:
+    """Return True if the virtual server restarted between two snapshots."""
+    before, uptime = previous.server.uptime, data.server.uptime
+    return before is not None and uptime is not None and uptime < before
+
+
+def _is_mass_reconnect(previous: TeamSpeakSnapshot, data: TeamSpeakSnapshot) -> bool:
+    """Return True if most of the clients dropped off at once."""
+    roster = len(previous.clients)
+    return (
+        roster >= MASS_RECONNECT_MIN_CLIENTS
+        and len(data.client_delta.removed) >= MASS_RECONNECT_SHARE * roster
+    )
+
+
+def _client_data(
+    base: dict[str, Any], client: Client, channels: dict[int, Channel]
+) -> dict[str, Any]:
+    """Return the event data of a client."""
+    channel = channels.get(client.cid)
+    return {
+        **base,
+        "clid": client.clid,
+        "unique_identifier": client.unique_identifier,
+        "database_id": client.database_id,
+        "nickname": client.nickname,
+        "channel_id": client.cid,
+        "channel_name": channel.name if channel else None,
+    }
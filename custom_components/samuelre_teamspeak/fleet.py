@@ -0,0 +1,165 @@
+"""Totals over the virtual servers of every TeamSpeak host."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import partial
+import math
+from typing import Self
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .const import DATA_FLEET
+from .coordinator import TeamSpeakDataUpdateCoordinator
+
+# Hosts are offset by multiples of the golden ratio of their interval, which
+# spreads any number of them evenly without knowing how many there will be
+PHASE_STEP = (math.sqrt(5) - 1) / 2
+
+type ServerKey = tuple[str, int]
+
+
+@dataclass(slots=True, frozen=True)
+class FleetContribution:
+    """What one virtual server adds to the fleet totals."""
+
+    clients: int = 0
+    bandwidth_received: int = 0
+    bandwidth_sent: int = 0
+    up: bool = False
+
+    @classmethod
+    def from_coordinator(cls, coordinator: TeamSpeakDataUpdateCoordinator) -> Self:
+        """Return the contribution of the latest fetched data."""
+        data = coordinator.data
+        # Servers that failed or were only restored from storage count as down
+        if not coordinator.last_update_success or data.restored_at is not None:
+            return cls()
+        server, rates = data.server, data.rates
+        # The same rates as the bandwidth sensors of the server
+        return cls(
+            clients=server.clients_online or 0,
+            bandwidth_received=round(rates.received.rate)
+            if rates.received is not None
+            else server.bandwidth_received or 0,
+            bandwidth_sent=round(rates.sent.rate)
+            if rates.sent is not None
+            else server.bandwidth_sent or 0,
+            up=server.status == "online",
+        )
+
+
+class TeamSpeakFleet:
+    """Maintain fleet totals from the coordinators of all host entries.
+
+    An update of one coordinator replaces that server's contribution, so the
+    totals are adjusted in constant time however many servers there are, and
+    listeners are only called when a total changed.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the fleet."""
+        self._contributions: dict[ServerKey, FleetContribution] = {}
+        self._coordinators: dict[ServerKey, TeamSpeakDataUpdateCoordinator] = {}
+        # Phase slot of every host entry
+        self._slots: dict[str, int] = {}
+        self._listeners: dict[CALLBACK_TYPE, None] = {}
+        self.clients = 0
+        self.bandwidth_received = 0
+        self.bandwidth_sent = 0
+        self.servers_up = 0
+
+    @property
+    def servers(self) -> int:
+        """Return the number of virtual servers in the fleet."""
+        return len(self._contributions)
+
+    @property
+    def hosts(self) -> int:
+        """Return the number of host entries in the fleet."""
+        return len(self._slots)
+
+    @callback
+    def async_add_host(self, entry: ConfigEntry) -> float:
+        """Reserve a phase slot for a host until the entry unloads.
+
+        Returns the offset of the host's refreshes as a fraction of its
+        interval.
+        """
+        slot = 0
+        while slot in self._slots.values():
+            slot += 1
+        self._slots[entry.entry_id] = slot
+        entry.async_on_unload(partial(self._async_remove_host, entry.entry_id))
+        return (slot * PHASE_STEP) % 1
+
+    @callback
+    def async_add_servers(
+        self,
+        entry: ConfigEntry,
+        coordinators: dict[int, TeamSpeakDataUpdateCoordinator],
+    ) -> None:
+        """Follow the coordinators of a host entry."""
+        for server_id, coordinator in coordinators.items():
+            key = (entry.entry_id, server_id)
+            self._coordinators[key] = coordinator
+            self._contributions[key] = FleetContribution()
+            self._update(key)
+            entry.async_on_unload(
+                coordinator.async_add_listener(partial(self._async_handle_update, key))
+            )
+        self._async_notify()
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> Callable[[], None]:
+        """Call back whenever a total changes."""
+        self._listeners[update_callback] = None
+        return partial(self._listeners.pop, update_callback, None)
+
+    @callback
+    def _async_handle_update(self, key: ServerKey) -> None:
+        """Apply the new contribution of a server."""
+        if self._update(key):
+            self._async_notify()
+
+    def _update(self, key: ServerKey) -> bool:
+        """Replace the contribution of a server, returning True if it changed."""
+        new = FleetContribution.from_coordinator(self._coordinators[key])
+        if (old := self._contributions[key]) == new:
+            return False
+        self._contributions[key] = new
+        self._apply(old, -1)
+        self._apply(new, 1)
+        return True
+
+    def _apply(self, contribution: FleetContribution, sign: int) -> None:
+        """Add or subtract a contribution from the totals."""
+        self.clients += sign * contribution.clients
+        self.bandwidth_received += sign * contribution.bandwidth_received
+        self.bandwidth_sent += sign * contribution.bandwidth_sent
+        self.servers_up += sign * contribution.up
+
+    @callback
+    def _async_remove_host(self, entry_id: str) -> None:
+        """Drop the servers and phase slot of an unloaded host entry."""
+        del self._slots[entry_id]
+        for key in [key for key in self._contributions if key[0] == entry_id]:
+            self._apply(self._contributions.pop(key), -1)
+            del self._coordinators[key]
+        self._async_notify()
+
+    @callback
+    def _async_notify(self) -> None:
+        """Call the listeners."""
+        for update_callback in list(self._listeners):
+            update_callback()
+
+
+@callback
+def async_get_fleet(hass: HomeAssistant) -> TeamSpeakFleet:
+    """Return the fleet shared by all entries."""
+    if (fleet := hass.data.get(DATA_FLEET)) is None:
+        fleet = hass.data[DATA_FLEET] = TeamSpeakFleet()
+    return fleet
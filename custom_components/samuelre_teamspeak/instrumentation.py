@@ -0,0 +1,79 @@
+"""Request and refresh instrumentation for the TeamSpeak integration."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass(slots=True)
+class LatencyHistogram:
+    """Fixed-bucket histogram of durations."""
+
+    counts: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    total: float = 0.0
+    max: float = 0.0
+    last: float | None = None
+
+    @property
+    def count(self) -> int:
+        """Return the number of recorded durations."""
+        return sum(self.counts)
+
+    def record(self, seconds: float) -> None:
+        """Record one duration."""
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram for diagnostics and attributes."""
+        count = self.count
+        buckets = {
+            f"le_{bound}": n
+            for bound, n in zip(LATENCY_BUCKETS, self.counts, strict=False)
+        }
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": count,
+            "last": self.last,
+            "mean": self.total / count if count else None,
+            "max": self.max,
+            "buckets": buckets,
+        }
+
+
+@dataclass(slots=True)
+class EndpointStats:
+    """Counters of the requests made to one WebQuery endpoint."""
+
+    requests: int = 0
+    bytes_received: int = 0
+    last_size: int | None = None
+    errors: dict[str, int] = field(default_factory=dict)
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def record_response(self, seconds: float, size: int) -> None:
+        """Record a response that arrived after a number of seconds."""
+        self.latency.record(seconds)
+        self.bytes_received += size
+        self.last_size = size
+
+    def record_error(self, kind: str) -> None:
+        """Count a failed request by kind."""
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters for diagnostics and attributes."""
+        return {
+            "requests": self.requests,
+            "bytes_received": self.bytes_received,
+            "last_size": self.last_size,
+            "errors": dict(self.errors),
+            "latency": self.latency.as_dict(),
+        }
@@ -0,0 +1,483 @@
+"""Typed snapshot of the TeamSpeak server state."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Self
+
+from .diff import ListDelta
+
+# Clients away or idle for at least this long count as AFK
+AFK_IDLE_TIME = 30 * 60 * 1000
+
+
+def _flag(value: Any) -> bool:
+    """Convert a WebQuery 0/1 flag to bool."""
+    return value == "1" or value == 1
+
+
+def _float(value: Any) -> float | None:
+    """Convert a WebQuery value to float, keeping missing values as None."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(value: Any) -> int | None:
+    """Convert a WebQuery value to int, keeping missing values as None."""
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(slots=True, frozen=True)
+class ServerInfo:
+    """Parsed serverinfo response."""
+
+    unique_identifier: str
+    name: str
+    version: str
+    platform: str | None
+    port: int | None
+    status: str | None
+    clients_online: int | None
+    query_clients_online: int
+    channels_online: int | None
+    max_clients: int | None
+    uptime: int | None
+    bandwidth_received: int | None
+    bandwidth_sent: int | None
+    bandwidth_received_last_minute: int
+    bandwidth_sent_last_minute: int
+    bytes_received_total: int
+    bytes_sent_total: int
+    # Averages over all clients: packet loss as a fraction, ping in milliseconds
+    packet_loss: float | None
+    packet_loss_speech: float | None
+    packet_loss_keepalive: float | None
+    packet_loss_control: float | None
+    ping: float | None
+    raw: dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_raw(cls, raw: dict[str, Any]) -> Self:
+        """Parse a serverinfo record."""
+        return cls(
+            unique_identifier=raw.get("virtualserver_unique_identifier", ""),
+            name=raw.get("virtualserver_name", "TeamSpeak Server"),
+            version=raw.get("virtualserver_version", "Unknown"),
+            platform=raw.get("virtualserver_platform"),
+            port=_int(raw.get("virtualserver_port")),
+            status=raw.get("virtualserver_status"),
+            clients_online=_int(raw.get("virtualserver_clientsonline")),
+            query_clients_online=_int(raw.get("virtualserver_queryclientsonline")) or 0,
+            channels_online=_int(raw.get("virtualserver_channelsonline")),
+            max_clients=_int(raw.get("virtualserver_maxclients")),
+            uptime=_int(raw.get("virtualserver_uptime")),
+            bandwidth_received=_int(
+                raw.get("connection_bandwidth_received_last_second_total")
+            ),
+            bandwidth_sent=_int(raw.get("connection_bandwidth_sent_last_second_total")),
+            bandwidth_received_last_minute=_int(
+                raw.get("connection_bandwidth_received_last_minute_total")
+            )
+            or 0,
+            bandwidth_sent_last_minute=_int(
+                raw.get("connection_bandwidth_sent_last_minute_total")
+            )
+            or 0,
+            bytes_received_total=_int(raw.get("connection_bytes_received_total")) or 0,
+            bytes_sent_total=_int(raw.get("connection_bytes_sent_total")) or 0,
+            packet_loss=_float(raw.get("virtualserver_total_packetloss_total")),
+            packet_loss_speech=_float(raw.get("virtualserver_total_packetloss_speech")),
+            packet_loss_keepalive=_float(
+                raw.get("virtualserver_total_packetloss_keepalive")
+            ),
+            packet_loss_control=_float(
+                raw.get("virtualserver_total_packetloss_control")
+            ),
+            ping=_float(raw.get("virtualserver_total_ping")),
+            raw=raw,
+        )
+
+    def adjust_counter(self, name: str, raw_key: str, delta: int) -> Self:
+        """Return a copy with a client or channel counter adjusted."""
+        value = getattr(self, name)
+        if value is None:
+            return self
+        value = max(value + delta, 0)
+        return replace(self, **{name: value}, raw={**self.raw, raw_key: str(value)})
+
+
+@dataclass(slots=True, frozen=True)
+class Client:
+    """A client from clientlist.
+
+    The idle time, away state and voice flags change all the time and the raw
+    record carries them too, so none of them is compared when diffing
+    clients; the client summary is built from the fresh values instead.
+    """
+
+    clid: int
+    cid: int
+    database_id: int | None
+    nickname: str
+    client_type: int
+    unique_identifier: str
+    away: bool = field(compare=False)
+    away_message: str = field(compare=False)
+    talking: bool = field(compare=False)
+    input_muted: bool = field(compare=False)
+    output_muted: bool = field(compare=False)
+    server_groups: tuple[int, ...]
+    channel_group_id: int | None
+    country: str
+    idle_time: int = field(compare=False)
+    raw: dict[str, Any] = field(compare=False, repr=False)
+
+    @classmethod
+    def from_raw(cls, raw: dict[str, Any]) -> Self:
+        """Parse a clientlist record."""
+        groups = raw.get("client_servergroups") or ""
+        return cls(
+            clid=int(raw["clid"]),
+            cid=int(raw["cid"]),
+            database_id=_int(raw.get("client_database_id")),
+            nickname=raw.get("client_nickname", ""),
+            client_type=_int(raw.get("client_type")) or 0,
+            unique_identifier=raw.get("client_unique_identifier", ""),
+            away=_flag(raw.get("client_away")),
+            away_message=raw.get("client_away_message", ""),
+            talking=_flag(raw.get("client_flag_talking")),
+            input_muted=_flag(raw.get("client_input_muted")),
+            output_muted=_flag(raw.get("client_output_muted")),
+            server_groups=tuple(
+                int(group) for group in str(groups).split(",") if group.isdigit()
+            ),
+            channel_group_id=_int(raw.get("client_channel_group_id")),
+            country=raw.get("client_country", ""),
+            idle_time=_int(raw.get("client_idle_time")) or 0,
+            raw=raw,
+        )
+
+    @property
+    def is_query(self) -> bool:
+        """Return True for ServerQuery clients."""
+        return self.client_type == 1
+
+    @property
+    def is_afk(self) -> bool:
+        """Return True if the client is away or has been idle for long."""
+        return self.away or self.idle_time >= AFK_IDLE_TIME
+
+    def moved_to(self, cid: int) -> Self:
+        """Return a copy of the client in another channel."""
+        return replace(self, cid=cid, raw={**self.raw, "cid": str(cid)})
+
+
+@dataclass(slots=True, frozen=True)
+class Channel:
+    """A channel from channellist."""
+
+    cid: int
+    pid: int
+    order: int
+    name: str
+    total_clients: int
+    raw: dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_raw(cls, raw: dict[str, Any]) -> Self:
+        """Parse a channellist record."""
+        return cls(
+            cid=int(raw["cid"]),
+            pid=_int(raw.get("pid")) or 0,
+            order=_int(raw.get("channel_order")) or 0,
+            name=raw.get("channel_name", ""),
+            total_clients=_int(raw.get("total_clients")) or 0,
+            raw=raw,
+        )
+
+    def with_changes(self, changes: dict[str, str]) -> Self:
+        """Return a copy with raw channel fields changed."""
+        return type(self).from_raw({**self.raw, **changes})
+
+    def adjust_clients(self, delta: int) -> Self:
+        """Return a copy with the client count adjusted."""
+        total = max(self.total_clients + delta, 0)
+        return replace(
+            self, total_clients=total, raw={**self.raw, "total_clients": str(total)}
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class ClientQuality:
+    """Connection info of one client from clientinfo, when it was sampled.
+
+    Ping and packet loss are only present if the server reports them per
+    client; the bandwidth and connection time always are.
+    """
+
+    unique_identifier: str
+    ping: float | None
+    packet_loss: float | None
+    bandwidth_received_last_minute: int | None
+    bandwidth_sent_last_minute: int | None
+    connected_time: int | None
+    sampled_at: datetime
+
+    @classmethod
+    def from_raw(
+        cls, raw: dict[str, Any], unique_identifier: str, sampled_at: datetime
+    ) -> Self:
+        """Parse a clientinfo record of a client."""
+        return cls(
+            unique_identifier=unique_identifier,
+            ping=_float(raw.get("connection_ping")),
+            packet_loss=_float(raw.get("connection_packetloss_total")),
+            bandwidth_received_last_minute=_int(
+                raw.get("connection_bandwidth_received_last_minute_total")
+            ),
+            bandwidth_sent_last_minute=_int(
+                raw.get("connection_bandwidth_sent_last_minute_total")
+            ),
+            connected_time=_int(raw.get("connection_connected_time")),
+            sampled_at=sampled_at,
+        )
+
+
+@dataclass(slots=True)
+class ClientIndex:
+    """Lookups over the clients of a snapshot, built once per list change."""
+
+    by_database_id: dict[int, Client]
+    by_channel: dict[int, list[Client]]
+
+    @classmethod
+    def build(cls, clients: dict[int, Client]) -> Self:
+        """Index clients by database ID and channel."""
+        by_database_id: dict[int, Client] = {}
+        by_channel: dict[int, list[Client]] = {}
+        for client in clients.values():
+            if client.database_id is not None:
+                by_database_id[client.database_id] = client
+            by_channel.setdefault(client.cid, []).append(client)
+        return cls(by_database_id=by_database_id, by_channel=by_channel)
+
+
+@dataclass(slots=True)
+class ChannelTree:
+    """Parent/child index over the channels, built once per channel list change."""
+
+    # Children of each channel (0 for the top level) in display order
+    children: dict[int, list[int]]
+    # Ancestors of each channel from the top level down, excluding itself
+    ancestors: dict[int, tuple[int, ...]]
+    # First channel with a given name, for name-based configuration
+    by_name: dict[str, int]
+
+    @classmethod
+    def build(cls, channels: dict[int, Channel]) -> Self:
+        """Index channels by parent and resolve every channel's ancestors."""
+        siblings: dict[int, list[int]] = {}
+        for channel in channels.values():
+            siblings.setdefault(channel.pid, []).append(channel.cid)
+        children: dict[int, list[int]] = {}
+        for pid, cids in siblings.items():
+            # channel_order is the ID of the sibling above, 0 for the first one
+            after = {channels[cid].order: cid for cid in cids}
+            ordered: list[int] = []
+            seen: set[int] = set()
+            cid = after.get(0)
+            while cid is not None and cid not in seen:
+                ordered.append(cid)
+                seen.add(cid)
+                cid = after.get(cid)
+            # Keep channels of a broken order chain instead of dropping them
+            ordered.extend(cid for cid in cids if cid not in seen)
+            children[pid] = ordered
+        # Channels whose parent is missing are top level, with their subtrees
+        for pid in [pid for pid in children if pid and pid not in channels]:
+            children.setdefault(0, []).extend(children.pop(pid))
+
+        ancestors: dict[int, tuple[int, ...]] = {}
+        # Channels in a parent cycle never reach the top level and become
+        # roots themselves
+        for root in (0, *channels):
+            if root:
+                if root in ancestors:
+                    continue
+                ancestors[root] = ()
+            stack: list[tuple[int, tuple[int, ...]]] = [(root, (root,) if root else ())]
+            while stack:
+                pid, path = stack.pop()
+                for cid in children.get(pid, ()):
+                    if cid in ancestors:
+                        continue
+                    ancestors[cid] = path
+                    stack.append((cid, (*path, cid)))
+
+        by_name: dict[str, int] = {}
+        for channel in channels.values():
+            by_name.setdefault(channel.name, channel.cid)
+        return cls(children=children, ancestors=ancestors, by_name=by_name)
+
+    def resolve(self, key: str) -> int | None:
+        """Return the channel with an ID or name, preferring IDs."""
+        if key.isdigit() and int(key) in self.ancestors:
+            return int(key)
+        return self.by_name.get(key)
+
+    def subtree(self, cid: int) -> list[int]:
+        """Return a channel and all channels below it."""
+        result = [cid]
+        for child in result:
+            result.extend(self.children.get(child, ()))
+        return result
+
+    def count_clients(self, clients: dict[int, Client]) -> dict[int, int]:
+        """Count the clients in each channel including its subchannels."""
+        counts: dict[int, int] = {}
+        for client in clients.values():
+            self.add_client(counts, client.cid, 1)
+        return counts
+
+    def add_client(self, counts: dict[int, int], cid: int, delta: int) -> None:
+        """Adjust the subtree counts of a channel and its ancestors in place."""
+        for channel in (*self.ancestors.get(cid, ()), cid):
+            if count := counts.get(channel, 0) + delta:
+                counts[channel] = count
+            else:
+                del counts[channel]
+
+
+@dataclass(slots=True, frozen=True)
+class ClientSummary:
+    """Aggregates over the clients of a snapshot, built once per fetch."""
+
+    talking: int
+    afk: int
+    # Number of online clients per server group ID
+    server_groups: dict[int, int]
+
+    @classmethod
+    def build(cls, clients: dict[int, Client]) -> Self:
+        """Count talking, AFK and server group members in one pass."""
+        talking = afk = 0
+        server_groups: dict[int, int] = {}
+        for client in clients.values():
+            talking += client.talking
+            afk += client.is_afk
+            for group in client.server_groups:
+                server_groups[group] = server_groups.get(group, 0) + 1
+        return cls(talking=talking, afk=afk, server_groups=server_groups)
+
+
+@dataclass(slots=True, frozen=True)
+class ClientEvents:
+    """Clients that joined, left or moved between two snapshots."""
+
+    joined: list[Client] = field(default_factory=list)
+    left: list[Client] = field(default_factory=list)
+    # Pairs of the client before and after the move
+    moved: list[tuple[Client, Client]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        """Return the number of events."""
+        return len(self.joined) + len(self.left) + len(self.moved)
+
+    @classmethod
+    def build(cls, previous: dict[int, Client], delta: ListDelta[Client]) -> Self:
+        """Derive the events from a client delta.
+
+        A client that reconnects within one refresh gets a new clid but keeps
+        its unique identifier, so such pairs are matched up and reported as a
+        move, or not at all if the client is back in the same channel.
+        """
+        events = cls()
+        reconnecting: dict[str, list[Client]] = {}
+        for client in delta.removed.values():
+            if client.unique_identifier:
+                reconnecting.setdefault(client.unique_identifier, []).append(client)
+            else:
+                events.left.append(client)
+        for client in delta.added.values():
+            if old := reconnecting.get(client.unique_identifier):
+                before = old.pop()
+                if before.cid != client.cid:
+                    events.moved.append((before, client))
+            else:
+                events.joined.append(client)
+        for clients in reconnecting.values():
+            events.left.extend(clients)
+        for clid, client in delta.modified.items():
+            if (before := previous[clid]).cid != client.cid:
+                events.moved.append((before, client))
+        return events
+
+
+@dataclass(slots=True, frozen=True)
+class DirectionRates:
+    """Data rates of one direction in bytes per second."""
+
+    # Average over the last polling interval
+    rate: float
+    # Exponentially weighted average, and the average and peak of the window
+    average: float
+    window_average: float
+    window_peak: float
+
+
+@dataclass(slots=True, frozen=True)
+class BandwidthRates:
+    """Data rates derived from the byte counters of two polls."""
+
+    # None until two polls are apart, and after a counter reset
+    received: DirectionRates | None = None
+    sent: DirectionRates | None = None
+    # Directions whose rate just rose above the spike threshold
+    spikes: tuple[str, ...] = ()
+
+
+@dataclass(slots=True)
+class TeamSpeakSnapshot:
+    """State of one virtual server after a refresh."""
+
+    server: ServerInfo
+    # Clients keyed by clid and channels keyed by cid, in server order
+    clients: dict[int, Client]
+    channels: dict[int, Channel]
+    client_index: ClientIndex
+    client_summary: ClientSummary
+    channel_tree: ChannelTree
+    # Clients in each channel including its subchannels
+    subtree_clients: dict[int, int]
+    # Names of the regular server groups keyed by ID
+    server_groups: dict[int, str]
+    client_delta: ListDelta[Client]
+    channel_delta: ListDelta[Channel]
+    client_events: ClientEvents
+    # Which of the "server_info", "client_list", "channel_list",
+    # "client_summary" and "server_groups" tiers changed
+    updated: frozenset[str]
+    # When the snapshot was saved, if it was restored from storage instead
+    # of fetched; the first successful refresh replaces it
+    restored_at: datetime | None = None
+    rates: BandwidthRates = field(default_factory=BandwidthRates)
+
+    @property
+    def client_list(self) -> list[dict[str, Any]]:
+        """Return the raw client records."""
+        return [client.raw for client in self.clients.values()]
+
+    @property
+    def channel_list(self) -> list[dict[str, Any]]:
+        """Return the raw channel records."""
+        return [channel.raw for channel in self.channels.values()]
@@ -0,0 +1,204 @@
+"""Connection quality of clients, sampled a few at a time."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from functools import partial
+import heapq
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .api import CannotConnect, InvalidAuth
+from .coordinator import TeamSpeakDataUpdateCoordinator
+from .models import Client, ClientQuality, TeamSpeakSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+# A client with at least this ping in milliseconds or this fraction of
+# packets lost has a poor connection
+POOR_PING = 150.0
+POOR_PACKET_LOSS = 0.05
+# Clients and channels listed in the sensor attributes
+MAX_LISTED = 10
+
+_NEVER = datetime.min.replace(tzinfo=UTC)
+
+
+@dataclass(slots=True, frozen=True)
+class ChannelQuality:
+    """Average connection quality of the sampled clients in a channel."""
+
+    cid: int
+    sampled: int
+    ping: float | None
+    packet_loss: float | None
+
+
+class TeamSpeakQualitySampler:
+    """Sample the connection info of a rotating set of clients.
+
+    After every refresh up to the budget of clientinfo requests go out
+    through the host's request queue, for the clients sampled longest ago,
+    so every client is covered in turn while the load on WebQuery stays
+    bounded however many clients are online. The latest sample of every
+    online client is kept.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        budget: int,
+    ) -> None:
+        """Initialize the sampler."""
+        self.hass = hass
+        self.entry = entry
+        self.coordinator = coordinator
+        self.budget = budget
+        # Latest sample by clid
+        self.samples: dict[int, ClientQuality] = {}
+        self.requests = 0
+        self.failed_requests = 0
+        self._task: asyncio.Task[None] | None = None
+        self._listeners: dict[CALLBACK_TYPE, None] = {}
+        self._last_data: TeamSpeakSnapshot | None = None
+
+    @callback
+    def async_start(self) -> None:
+        """Start sampling after every refresh."""
+        self.entry.async_on_unload(
+            self.coordinator.async_add_listener(self._async_handle_update)
+        )
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> Callable[[], None]:
+        """Call back whenever the samples change."""
+        self._listeners[update_callback] = None
+        return partial(self._listeners.pop, update_callback, None)
+
+    @callback
+    def _async_handle_update(self) -> None:
+        """Drop departed clients and sample the next ones."""
+        data = self.coordinator.data
+        if data is self._last_data:
+            return
+        self._last_data = data
+        if data.restored_at is not None:
+            return
+
+        # A clid freed by a departed client can be reused by another one
+        clients = data.clients
+        if departed := [
+            clid
+            for clid, sample in self.samples.items()
+            if (client := clients.get(clid)) is None
+            or client.unique_identifier != sample.unique_identifier
+        ]:
+            for clid in departed:
+                del self.samples[clid]
+            self._async_notify()
+
+        # A cycle still waiting for the queue is not joined by another one
+        if self._task is None and clients:
+            self._task = self.entry.async_create_background_task(
+                self.hass,
+                self._async_sample(),
+                f"samuelre_teamspeak_quality_{self.coordinator.client.server_id}",
+            )
+
+    async def _async_sample(self) -> None:
+        """Fetch the connection info of the clients sampled longest ago."""
+        sampled = False
+        try:
+            for clid in heapq.nsmallest(
+                self.budget, self.coordinator.data.clients, key=self._sampled_at
+            ):
+                # Clients may leave while the earlier requests are waiting
+                if (client := self.coordinator.data.clients.get(clid)) is None:
+                    continue
+                self.requests += 1
+                try:
+                    raw = await self.coordinator.client.get_client_info(clid)
+                except (CannotConnect, InvalidAuth) as err:
+                    # The next refresh starts over; failures are not retried
+                    self.failed_requests += 1
+                    _LOGGER.debug("Sampling client %s failed: %s", clid, err)
+                    break
+                self.samples[clid] = ClientQuality.from_raw(
+                    raw, client.unique_identifier, dt_util.utcnow()
+                )
+                sampled = True
+        finally:
+            self._task = None
+        if sampled:
+            self._async_notify()
+
+    def _sampled_at(self, clid: int) -> datetime:
+        """Return when a client was last sampled, unsampled clients first."""
+        sample = self.samples.get(clid)
+        return sample.sampled_at if sample is not None else _NEVER
+
+    def poor_clients(self) -> list[tuple[Client, ClientQuality]]:
+        """Return the sampled clients with a poor connection, worst first."""
+        clients = self.coordinator.data.clients
+        return sorted(
+            (
+                (clients[clid], sample)
+                for clid, sample in self.samples.items()
+                if clid in clients and _is_poor(sample)
+            ),
+            key=lambda item: _badness(item[1]),
+            reverse=True,
+        )
+
+    def channel_quality(self) -> list[ChannelQuality]:
+        """Return the quality of the sampled clients per channel, worst first."""
+        clients = self.coordinator.data.clients
+        by_channel: dict[int, list[ClientQuality]] = {}
+        for clid, sample in self.samples.items():
+            if (client := clients.get(clid)) is not None:
+                by_channel.setdefault(client.cid, []).append(sample)
+        return sorted(
+            (
+                ChannelQuality(
+                    cid=cid,
+                    sampled=len(samples),
+                    ping=_mean(sample.ping for sample in samples),
+                    packet_loss=_mean(sample.packet_loss for sample in samples),
+                )
+                for cid, samples in by_channel.items()
+            ),
+            key=_badness,
+            reverse=True,
+        )
+
+    @callback
+    def _async_notify(self) -> None:
+        """Call the listeners."""
+        for update_callback in list(self._listeners):
+            update_callback()
+
+
+def _is_poor(sample: ClientQuality) -> bool:
+    """Return True if the sampled connection is poor."""
+    return (sample.ping is not None and sample.ping >= POOR_PING) or (
+        sample.packet_loss is not None and sample.packet_loss >= POOR_PACKET_LOSS
+    )
+
+
+def _badness(quality: ClientQuality | ChannelQuality) -> tuple[float, float]:
+    """Return a key ordering by packet loss, then ping."""
+    return (quality.packet_loss or 0, quality.ping or 0)
+
+
+def _mean(values: Iterable[float | None]) -> float | None:
+    """Return the mean of the values that are present."""
+    present = [value for value in values if value is not None]
+    return sum(present) / len(present) if present else None
@@ -0,0 +1,277 @@
+"""TeamSpeak ServerQuery notification listener."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import logging
+
+from .api import CannotConnect, InvalidAuth
+
+_LOGGER = logging.getLogger(__name__)
+
+# ServerQuery drops idle connections after 10 minutes
+KEEPALIVE_INTERVAL = 240
+RECONNECT_MIN_DELAY = 5
+RECONNECT_MAX_DELAY = 300
+
+# ServerQuery error code for invalid login credentials
+ERROR_INVALID_LOGIN = 520
+
+# Notifications that change the client or channel list
+NOTIFY_EVENTS = (
+    "notifycliententerview",
+    "notifyclientleftview",
+    "notifyclientmoved",
+    "notifychannelcreated",
+    "notifychanneledited",
+    "notifychanneldeleted",
+    "notifychannelmoved",
+)
+
+_ESCAPES = {
+    "\\": "\\\\",
+    "/": "\\/",
+    " ": "\\s",
+    "|": "\\p",
+    "\a": "\\a",
+    "\b": "\\b",
+    "\f": "\\f",
+    "\n": "\\n",
+    "\r": "\\r",
+    "\t": "\\t",
+    "\v": "\\v",
+}
+_UNESCAPES = {value[1]: key for key, value in _ESCAPES.items()}
+
+
+def escape(value: str) -> str:
+    """Escape a value for use in a ServerQuery command."""
+    return "".join(_ESCAPES.get(char, char) for char in value)
+
+
+def unescape(value: str) -> str:
+    """Unescape a value received from ServerQuery."""
+    if "\\" not in value:
+        return value
+    result: list[str] = []
+    chars = iter(value)
+    for char in chars:
+        if char == "\\":
+            char = next(chars, "")
+            result.append(_UNESCAPES.get(char, char))
+        else:
+            result.append(char)
+    return "".join(result)
+
+
+def parse_params(line: str) -> dict[str, str]:
+    """Parse a single ServerQuery record into a dict of strings."""
+    params: dict[str, str] = {}
+    for token in line.split(" "):
+        if not token:
+            continue
+        key, _, value = token.partition("=")
+        params[key] = unescape(value)
+    return params
+
+
+def parse_notification(params: str) -> list[dict[str, str]]:
+    """Parse the records of a notification about one or more clients.
+
+    The parameters shared by all records, like the target channel of a
+    move, are only sent with the first record.
+    """
+    first, *rest = params.split("|")
+    shared = parse_params(first)
+    return [shared, *({**shared, **parse_params(record)} for record in rest)]
+
+
+type NotificationCallback = Callable[[str, dict[str, str]], None]
+
+
+class TeamSpeakServerQueryClient:
+    """Minimal ServerQuery (raw TCP) client used for notifications."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        server_id: int | None,
+        username: str,
+        password: str,
+    ) -> None:
+        """Initialize the ServerQuery client."""
+        self.host = host
+        self.port = port
+        self.server_id = server_id
+        self.username = username
+        self.password = password
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._command_lock = asyncio.Lock()
+
+    async def connect(self) -> None:
+        """Open the connection, log in and select the virtual server."""
+        try:
+            async with asyncio.timeout(10):
+                self._reader, self._writer = await asyncio.open_connection(
+                    self.host, self.port
+                )
+                # Discard the two line welcome banner
+                await self._reader.readline()
+                await self._reader.readline()
+        except (TimeoutError, OSError) as err:
+            await self.close()
+            raise CannotConnect(f"Error connecting to ServerQuery: {err}") from err
+
+        try:
+            await self.command(
+                f"login client_login_name={escape(self.username)} "
+                f"client_login_password={escape(self.password)}"
+            )
+            if self.server_id is not None:
+                await self.command(f"use sid={self.server_id}")
+        except CannotConnect:
+            await self.close()
+            raise
+
+    async def close(self) -> None:
+        """Close the connection."""
+        writer, self._writer, self._reader = self._writer, None, None
+        if writer is None:
+            return
+        try:
+            writer.write(b"quit\n")
+            writer.close()
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+    async def command(self, command: str) -> list[dict[str, str]]:
+        """Send a command and return the parsed response records.
+
+        Only valid while no notification reader is running on the connection.
+        """
+        async with self._command_lock:
+            await self._send(command)
+            records: list[dict[str, str]] = []
+            while True:
+                line = await self._readline()
+                if line.startswith("error "):
+                    self._raise_for_error(parse_params(line[6:]))
+                    return records
+                if line.startswith("notify"):
+                    continue
+                records.extend(parse_params(record) for record in line.split("|"))
+
+    async def register_notifications(self) -> None:
+        """Subscribe to server and channel events."""
+        await self.command("servernotifyregister event=server")
+        await self.command("servernotifyregister event=channel id=0")
+
+    async def listen(self, callback: NotificationCallback) -> None:
+        """Dispatch notifications to the callback until the connection drops."""
+        keepalive_pending = False
+        while True:
+            try:
+                async with asyncio.timeout(KEEPALIVE_INTERVAL):
+                    line = await self._readline()
+            except TimeoutError:
+                # Responses to the keepalive are consumed below
+                await self._send("whoami")
+                keepalive_pending = True
+                continue
+
+            name, _, params = line.partition(" ")
+            if name in NOTIFY_EVENTS:
+                for record in parse_notification(params):
+                    callback(name, record)
+            elif name == "error" and keepalive_pending:
+                keepalive_pending = False
+                self._raise_for_error(parse_params(params))
+
+    async def _send(self, command: str) -> None:
+        """Write a single command line."""
+        if self._writer is None:
+            raise CannotConnect("ServerQuery connection is not open")
+        try:
+            self._writer.write(f"{command}\n".encode())
+            await self._writer.drain()
+        except OSError as err:
+            raise CannotConnect(f"Error writing to ServerQuery: {err}") from err
+
+    async def _readline(self) -> str:
+        """Read a single line from the connection."""
+        if self._reader is None:
+            raise CannotConnect("ServerQuery connection is not open")
+        try:
+            raw = await self._reader.readline()
+        except OSError as err:
+            raise CannotConnect(f"Error reading from ServerQuery: {err}") from err
+        if not raw:
+            raise CannotConnect("ServerQuery connection closed")
+        return raw.decode("utf-8", errors="replace").strip("\r\n")
+
+    @staticmethod
+    def _raise_for_error(error: dict[str, str]) -> None:
+        """Raise if a ServerQuery error line reports a failure."""
+        code = int(error.get("id", "0"))
+        if code == 0:
+            return
+        message = error.get("msg", "Unknown error")
+        if code == ERROR_INVALID_LOGIN:
+            raise InvalidAuth(f"Invalid ServerQuery login: {message}")
+        raise CannotConnect(f"ServerQuery error: {message}")
+
+
+class TeamSpeakNotificationListener:
+    """Keep a ServerQuery connection open and forward notifications."""
+
+    def __init__(
+        self,
+        client: TeamSpeakServerQueryClient,
+        callback: NotificationCallback,
+        on_connection_change: Callable[[bool], None],
+    ) -> None:
+        """Initialize the listener."""
+        self.client = client
+        self._callback = callback
+        self._on_connection_change = on_connection_change
+        self.connected = False
+
+    async def async_run(self) -> None:
+        """Run the listener, reconnecting with backoff until cancelled."""
+        delay = RECONNECT_MIN_DELAY
+        try:
+            while True:
+                try:
+                    await self.client.connect()
+                    await self.client.register_notifications()
+                    self._set_connected(True)
+                    delay = RECONNECT_MIN_DELAY
+                    await self.client.listen(self._callback)
+                except InvalidAuth as err:
+                    _LOGGER.error("ServerQuery push mode disabled: %s", err)
+                    self._set_connected(False)
+                    return
+                except CannotConnect as err:
+                    _LOGGER.debug("ServerQuery connection lost: %s", err)
+                except Exception:
+                    # Polling must not stay at the push mode interval
+                    _LOGGER.exception("Unexpected error in ServerQuery push mode")
+                finally:
+                    await self.client.close()
+
+                self._set_connected(False)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+        finally:
+            await self.client.close()
+
+    def _set_connected(self, connected: bool) -> None:
+        """Track connection state and notify on changes."""
+        if connected == self.connected:
+            return
+        self.connected = connected
+        self._on_connection_change(connected)
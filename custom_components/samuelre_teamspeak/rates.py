@@ -0,0 +1,134 @@
+"""Average data rates from the byte counters of serverinfo."""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+import math
+
+from .models import BandwidthRates, DirectionRates, ServerInfo
+
+# Intervals kept for the window average and peak
+RATE_WINDOW = 30
+# Time constant of the exponentially weighted average in seconds, so the
+# smoothing does not depend on the polling interval
+EWMA_TIME_CONSTANT = 600.0
+# A rate this many times the average, and at least the minimum in bytes per
+# second, is a spike once the average has seen enough intervals
+SPIKE_FACTOR = 3.0
+SPIKE_MIN_RATE = 125_000
+SPIKE_WARMUP = 5
+
+
+@dataclass(slots=True)
+class _Interval:
+    """Bytes transferred in one polling interval."""
+
+    seconds: float
+    received: int
+    sent: int
+
+
+class _DirectionMeter:
+    """Running averages of one direction."""
+
+    def __init__(self) -> None:
+        """Initialize the meter."""
+        self.average: float | None = None
+        self.samples = 0
+        self.spiking = False
+
+    def update(self, rate: float, seconds: float) -> bool:
+        """Add the rate of an interval, returning True if a spike starts."""
+        spike = False
+        if self.average is not None and self.samples >= SPIKE_WARMUP:
+            above = rate >= max(SPIKE_FACTOR * self.average, SPIKE_MIN_RATE)
+            spike = above and not self.spiking
+            self.spiking = above
+        if self.average is None:
+            self.average = rate
+        else:
+            alpha = 1 - math.exp(-seconds / EWMA_TIME_CONSTANT)
+            self.average += alpha * (rate - self.average)
+        self.samples += 1
+        return spike
+
+
+class BandwidthMeter:
+    """Derive data rates from the cumulative byte counters between polls.
+
+    The counters give the exact average over each interval however long it
+    is, unlike the last second rates of serverinfo. The counters and the
+    uptime start over when the virtual server restarts; that interval is
+    skipped. The last intervals are kept in a ring buffer with running sums,
+    so the window average is exact and updated in constant time.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the meter."""
+        self._last: tuple[float, ServerInfo] | None = None
+        self._window: deque[_Interval] = deque(maxlen=RATE_WINDOW)
+        self._window_seconds = 0.0
+        self._window_received = 0
+        self._window_sent = 0
+        self._received = _DirectionMeter()
+        self._sent = _DirectionMeter()
+
+    def record(self, now: float, server: ServerInfo) -> BandwidthRates:
+        """Add the counters of a poll at a monotonic time."""
+        last, self._last = self._last, (now, server)
+        if last is None:
+            return BandwidthRates()
+        last_time, last_server = last
+        seconds = now - last_time
+        received = server.bytes_received_total - last_server.bytes_received_total
+        sent = server.bytes_sent_total - last_server.bytes_sent_total
+        if (
+            seconds <= 0
+            or received < 0
+            or sent < 0
+            or (
+                server.uptime is not None
+                and last_server.uptime is not None
+                and server.uptime < last_server.uptime
+            )
+        ):
+            return BandwidthRates()
+
+        if len(self._window) == self._window.maxlen:
+            oldest = self._window[0]
+            self._window_seconds -= oldest.seconds
+            self._window_received -= oldest.received
+            self._window_sent -= oldest.sent
+        interval = _Interval(seconds, received, sent)
+        self._window.append(interval)
+        self._window_seconds += seconds
+        self._window_received += received
+        self._window_sent += sent
+
+        spikes: list[str] = []
+        if self._received.update(received / seconds, seconds):
+            spikes.append("received")
+        if self._sent.update(sent / seconds, seconds):
+            spikes.append("sent")
+        return BandwidthRates(
+            received=self._rates(self._received, "received", self._window_received),
+            sent=self._rates(self._sent, "sent", self._window_sent),
+            spikes=tuple(spikes),
+        )
+
+    def _rates(
+        self, meter: _DirectionMeter, direction: str, window_bytes: int
+    ) -> DirectionRates:
+        """Return the rates of one direction after the last interval."""
+        last = self._window[-1]
+        assert meter.average is not None
+        return DirectionRates(
+            rate=getattr(last, direction) / last.seconds,
+            average=meter.average,
+            window_average=window_bytes / self._window_seconds,
+            window_peak=max(
+                getattr(interval, direction) / interval.seconds
+                for interval in self._window
+            ),
+        )
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterable, Mapping
+from datetime import datetime
 from typing import Any
 
 from homeassistant.components.sensor import (
@@ -9,15 +11,37 @@ from homeassistant.components.sensor import (
     SensorEntity,
     SensorStateClass,
 )
-from homeassistant.const import UnitOfDataRate, UnitOfTime
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfDataRate,
+    UnitOfInformation,
+    UnitOfTime,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from . import TeamSpeakConfigEntry
-from .const import DOMAIN
+from .const import (
+    CONF_CHANNEL_ATTRIBUTES,
+    CONF_CLIENT_ATTRIBUTES,
+    CONF_ENTRY_TYPE,
+    CONF_MAX_LIST_LENGTH,
+    CONF_SUBTREE_CHANNELS,
+    DEFAULT_CHANNEL_ATTRIBUTES,
+    DEFAULT_CLIENT_ATTRIBUTES,
+    DEFAULT_MAX_LIST_LENGTH,
+    DOMAIN,
+    ENTRY_TYPE_FLEET,
+    FLEET_UNIQUE_ID,
+)
 from .coordinator import TeamSpeakDataUpdateCoordinator
+from .fleet import TeamSpeakFleet, async_get_fleet
+from .quality import MAX_LISTED, TeamSpeakQualitySampler
+from .sessions import TeamSpeakSessionTracker
+from .tracker import TeamSpeakPresenceTracker
 
 
 async def async_setup_entry(
@@ -26,25 +50,138 @@ async def async_setup_entry(
     async_add_entities: AddConfigEntryEntitiesCallback,
 ) -> None:
     """Set up TeamSpeak sensor platform."""
-    coordinator = entry.runtime_data
-
-    # Get server info for device creation
-    server_info = coordinator.data["server_info"]
-    server_unique_id = server_info.get("virtualserver_unique_identifier", "")
-
-    # Create all sensors
-    sensors = [
-        TeamSpeakClientsOnlineSensor(coordinator, server_unique_id),
-        TeamSpeakChannelsSensor(coordinator, server_unique_id),
-        TeamSpeakUptimeSensor(coordinator, server_unique_id),
-        TeamSpeakMaxClientsSensor(coordinator, server_unique_id),
-        TeamSpeakBandwidthReceivedSensor(coordinator, server_unique_id),
-        TeamSpeakBandwidthSentSensor(coordinator, server_unique_id),
-        TeamSpeakServerStatusSensor(coordinator, server_unique_id),
-    ]
+    if entry.data.get(CONF_ENTRY_TYPE) == ENTRY_TYPE_FLEET:
+        fleet = async_get_fleet(hass)
+        async_add_entities(
+            [
+                TeamSpeakFleetClientsSensor(fleet),
+                TeamSpeakFleetBandwidthSensor(fleet),
+                TeamSpeakFleetServersUpSensor(fleet),
+            ]
+        )
+        return
+
+    sensors: list[TeamSpeakBaseSensor] = []
+    for coordinator in entry.runtime_data.coordinators.values():
+        # Get server info for device creation
+        server_unique_id = coordinator.data.server.unique_identifier
+
+        # Create all sensors
+        sensors.extend(
+            [
+                TeamSpeakClientsOnlineSensor(coordinator, server_unique_id),
+                TeamSpeakChannelsSensor(coordinator, server_unique_id),
+                TeamSpeakUptimeSensor(coordinator, server_unique_id),
+                TeamSpeakMaxClientsSensor(coordinator, server_unique_id),
+                TeamSpeakBandwidthReceivedSensor(coordinator, server_unique_id),
+                TeamSpeakBandwidthSentSensor(coordinator, server_unique_id),
+                TeamSpeakPacketLossSensor(coordinator, server_unique_id),
+                TeamSpeakPingSensor(coordinator, server_unique_id),
+                TeamSpeakServerStatusSensor(coordinator, server_unique_id),
+                TeamSpeakNoopRefreshesSensor(coordinator, server_unique_id),
+                TeamSpeakUpdateIntervalSensor(coordinator, server_unique_id),
+                TeamSpeakActiveSpeakersSensor(coordinator, server_unique_id),
+                TeamSpeakAfkClientsSensor(coordinator, server_unique_id),
+                TeamSpeakRefreshDurationSensor(coordinator, server_unique_id),
+                TeamSpeakFailedRefreshesSensor(coordinator, server_unique_id),
+                TeamSpeakEntityWritesSensor(coordinator, server_unique_id),
+                TeamSpeakResponseBytesSensor(coordinator, server_unique_id),
+                TeamSpeakLastUpdateSensor(coordinator, server_unique_id),
+            ]
+        )
+
+    # Occupancy of configured channels including their subchannels
+    for coordinator in entry.runtime_data.coordinators.values():
+        tree = coordinator.data.channel_tree
+        sensors.extend(
+            TeamSpeakSubtreeOccupancySensor(
+                coordinator, coordinator.data.server.unique_identifier, key
+            )
+            for key in entry.options.get(CONF_SUBTREE_CHANNELS, [])
+            if tree.resolve(key) is not None
+        )
+
+    # Daily usage from the session trackers
+    for server_id, sessions in entry.runtime_data.sessions.items():
+        coordinator = entry.runtime_data.coordinators[server_id]
+        server_unique_id = coordinator.data.server.unique_identifier
+        sensors.extend(
+            [
+                TeamSpeakPeakUsersSensor(coordinator, server_unique_id, sessions),
+                TeamSpeakUsersTodaySensor(coordinator, server_unique_id, sessions),
+            ]
+        )
+
+    # Sampled client connection quality, when enabled
+    for server_id, sampler in entry.runtime_data.quality.items():
+        coordinator = entry.runtime_data.coordinators[server_id]
+        sensors.append(
+            TeamSpeakPoorConnectionsSensor(
+                coordinator, coordinator.data.server.unique_identifier, sampler
+            )
+        )
 
     async_add_entities(sensors)
 
+    # One sensor per server group, including groups created later on
+    for coordinator in entry.runtime_data.coordinators.values():
+        _async_track_server_groups(entry, coordinator, async_add_entities)
+
+    # Per-channel occupancy sensors are created as channels become occupied
+    for tracker in entry.runtime_data.trackers.values():
+
+        @callback
+        def _async_add_channels(
+            cids: Iterable[str], tracker: TeamSpeakPresenceTracker = tracker
+        ) -> None:
+            """Create occupancy sensors for newly tracked channels."""
+            async_add_entities(
+                [TeamSpeakChannelOccupancySensor(tracker, cid) for cid in cids]
+            )
+
+        tracker.async_set_channel_adder(_async_add_channels)
+
+
+@callback
+def _async_track_server_groups(
+    entry: TeamSpeakConfigEntry,
+    coordinator: TeamSpeakDataUpdateCoordinator,
+    async_add_entities: AddConfigEntryEntitiesCallback,
+) -> None:
+    """Add a sensor for every server group as it appears."""
+    server_unique_id = coordinator.data.server.unique_identifier
+    known: set[int] = set()
+
+    @callback
+    def _async_add_server_groups() -> None:
+        """Create sensors for server groups not seen before."""
+        if new := coordinator.data.server_groups.keys() - known:
+            known.update(new)
+            async_add_entities(
+                [
+                    TeamSpeakServerGroupSensor(coordinator, server_unique_id, sgid)
+                    for sgid in sorted(new)
+                ]
+            )
+
+    _async_add_server_groups()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_server_groups))
+
+
+def _percent(fraction: float | None) -> float | None:
+    """Convert a fraction to a rounded percentage."""
+    return round(fraction * 100, 2) if fraction is not None else None
+
+
+def _project(
+    records: list[dict[str, Any]], fields: list[str], max_length: int
+) -> list[dict[str, Any]]:
+    """Keep only the configured fields of the first max_length records."""
+    return [
+        {field: record[field] for field in fields if field in record}
+        for record in records[:max_length]
+    ]
+
 
 class TeamSpeakBaseSensor(
     CoordinatorEntity[TeamSpeakDataUpdateCoordinator], SensorEntity
@@ -52,6 +189,8 @@ class TeamSpeakBaseSensor(
     """Base class for TeamSpeak sensors."""
 
     _attr_has_entity_name = True
+    # Data tiers this sensor reads; None means it depends on every refresh
+    _tiers: frozenset[str] | None = frozenset({"server_info"})
 
     def __init__(
         self,
@@ -61,17 +200,56 @@ class TeamSpeakBaseSensor(
         """Initialize the sensor."""
         super().__init__(coordinator)
         self._server_unique_id = server_unique_id
-        server_info = coordinator.data["server_info"]
+        server = coordinator.data.server
 
         # Device info shared by all sensors
         self._attr_device_info = DeviceInfo(
             identifiers={(DOMAIN, server_unique_id)},
-            name=server_info.get("virtualserver_name", "TeamSpeak Server"),
+            name=server.name,
             manufacturer="TeamSpeak Systems GmbH",
             model="TeamSpeak Server",
-            sw_version=server_info.get("virtualserver_version", "Unknown"),
-            configuration_url=f"http://{coordinator.client.host}:{coordinator.client.port}",
+            sw_version=server.version,
+            configuration_url=coordinator.client.base_url,
         )
+        self._last_state_key: Any = None
+        self._options_revision = coordinator.options_revision
+
+    @property
+    def available(self) -> bool:
+        """Return True while there is fetched or restored data to show."""
+        return self.coordinator.data_available
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when the inputs of this sensor changed."""
+        if self._options_revision != self.coordinator.options_revision:
+            # Options were changed in place; re-read them and write once
+            self._options_revision = self.coordinator.options_revision
+            self._read_options(self.coordinator.config_entry.options)
+            self._last_state_key = None
+        available = self.available
+        if (
+            self._tiers is not None
+            and self._last_state_key is not None
+            and self._last_state_key[0] == available
+            and self._tiers.isdisjoint(self.coordinator.data.updated)
+        ):
+            self.coordinator.skipped_entity_writes += 1
+            return
+        state_key = (available, self._state_key())
+        if state_key == self._last_state_key:
+            self.coordinator.skipped_entity_writes += 1
+            return
+        self._last_state_key = state_key
+        self.coordinator.entity_writes += 1
+        super()._handle_coordinator_update()
+
+    def _state_key(self) -> Any:
+        """Return a value that changes whenever the written state would."""
+        return (self.native_value, self.extra_state_attributes)
+
+    def _read_options(self, options: Mapping[str, Any]) -> None:
+        """Read the options this sensor depends on."""
 
 
 class TeamSpeakClientsOnlineSensor(TeamSpeakBaseSensor):
@@ -79,6 +257,8 @@ class TeamSpeakClientsOnlineSensor(TeamSpeakBaseSensor):
 
     _attr_translation_key = "clients_online"
     _attr_icon = "mdi:account-multiple"
+    _unrecorded_attributes = frozenset({"client_list"})
+    _tiers = frozenset({"server_info", "client_list"})
 
     def __init__(
         self,
@@ -88,32 +268,43 @@ class TeamSpeakClientsOnlineSensor(TeamSpeakBaseSensor):
         """Initialize the sensor."""
         super().__init__(coordinator, server_unique_id)
         self._attr_unique_id = f"{server_unique_id}_clients_online"
+        self._read_options(coordinator.config_entry.options)
+
+    def _read_options(self, options: Mapping[str, Any]) -> None:
+        """Read the projected client fields."""
+        self._fields = options.get(CONF_CLIENT_ATTRIBUTES, DEFAULT_CLIENT_ATTRIBUTES)
+        self._max_length = options.get(CONF_MAX_LIST_LENGTH, DEFAULT_MAX_LIST_LENGTH)
 
     @property
     def native_value(self) -> int | None:
         """Return the number of clients online."""
-        server_info = self.coordinator.data["server_info"]
-        value = server_info.get("virtualserver_clientsonline")
-        return int(value) if value is not None else None
+        return self.coordinator.data.server.clients_online
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
         """Return additional attributes."""
-        client_list = self.coordinator.data["client_list"]
-        server_info = self.coordinator.data["server_info"]
+        data = self.coordinator.data
         return {
-            "client_list": client_list,
-            "query_clients": int(
-                server_info.get("virtualserver_queryclientsonline", 0)
-            ),
+            "client_list": _project(data.client_list, self._fields, self._max_length),
+            "query_clients": data.server.query_clients_online,
         }
 
+    def _state_key(self) -> Any:
+        """Compare the list revision instead of the full client list."""
+        return (
+            self.native_value,
+            self.coordinator.data.server.query_clients_online,
+            self.coordinator.client_list_revision,
+        )
+
 
 class TeamSpeakChannelsSensor(TeamSpeakBaseSensor):
     """Sensor for number of channels."""
 
     _attr_translation_key = "channels"
     _attr_icon = "mdi:pound"
+    _unrecorded_attributes = frozenset({"channel_list"})
+    _tiers = frozenset({"server_info", "channel_list"})
 
     def __init__(
         self,
@@ -123,21 +314,31 @@ class TeamSpeakChannelsSensor(TeamSpeakBaseSensor):
         """Initialize the sensor."""
         super().__init__(coordinator, server_unique_id)
         self._attr_unique_id = f"{server_unique_id}_channels"
+        self._read_options(coordinator.config_entry.options)
+
+    def _read_options(self, options: Mapping[str, Any]) -> None:
+        """Read the projected channel fields."""
+        self._fields = options.get(CONF_CHANNEL_ATTRIBUTES, DEFAULT_CHANNEL_ATTRIBUTES)
+        self._max_length = options.get(CONF_MAX_LIST_LENGTH, DEFAULT_MAX_LIST_LENGTH)
 
     @property
     def native_value(self) -> int | None:
         """Return the number of channels."""
-        server_info = self.coordinator.data["server_info"]
-        value = server_info.get("virtualserver_channelsonline")
-        return int(value) if value is not None else None
+        return self.coordinator.data.server.channels_online
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
         """Return additional attributes."""
         return {
-            "channel_list": self.coordinator.data["channel_list"],
+            "channel_list": _project(
+                self.coordinator.data.channel_list, self._fields, self._max_length
+            ),
         }
 
+    def _state_key(self) -> Any:
+        """Compare the list revision instead of the full channel list."""
+        return (self.native_value, self.coordinator.channel_list_revision)
+
 
 class TeamSpeakUptimeSensor(TeamSpeakBaseSensor):
     """Sensor for server uptime."""
@@ -159,9 +360,7 @@ class TeamSpeakUptimeSensor(TeamSpeakBaseSensor):
     @property
     def native_value(self) -> int | None:
         """Return the server uptime in seconds."""
-        server_info = self.coordinator.data["server_info"]
-        value = server_info.get("virtualserver_uptime")
-        return int(value) if value is not None else None
+        return self.coordinator.data.server.uptime
 
 
 class TeamSpeakMaxClientsSensor(TeamSpeakBaseSensor):
@@ -182,9 +381,7 @@ class TeamSpeakMaxClientsSensor(TeamSpeakBaseSensor):
     @property
     def native_value(self) -> int | None:
         """Return the maximum number of clients."""
-        server_info = self.coordinator.data["server_info"]
-        value = server_info.get("virtualserver_maxclients")
-        return int(value) if value is not None else None
+        return self.coordinator.data.server.max_clients
 
 
 class TeamSpeakBandwidthReceivedSensor(TeamSpeakBaseSensor):
@@ -206,21 +403,25 @@ class TeamSpeakBandwidthReceivedSensor(TeamSpeakBaseSensor):
         self._attr_unique_id = f"{server_unique_id}_bandwidth_received"
 
     @property
-    def native_value(self) -> int | None:
+    def native_value(self) -> float | None:
         """Return the bandwidth received in bytes per second."""
-        server_info = self.coordinator.data["server_info"]
-        value = server_info.get("connection_bandwidth_received_last_second_total")
-        return int(value) if value is not None else None
+        # The average since the last poll, or the last second until there is one
+        if (rates := self.coordinator.data.rates.received) is not None:
+            return rates.rate
+        return self.coordinator.data.server.bandwidth_received
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
         """Return additional attributes."""
-        server_info = self.coordinator.data["server_info"]
+        server = self.coordinator.data.server
+        rates = self.coordinator.data.rates.received
         return {
-            "total_bytes": int(server_info.get("connection_bytes_received_total", 0)),
-            "last_minute": int(
-                server_info.get("connection_bandwidth_received_last_minute_total", 0)
-            ),
+            "total_bytes": server.bytes_received_total,
+            "last_second": server.bandwidth_received,
+            "last_minute": server.bandwidth_received_last_minute,
+            "average": rates and round(rates.average, 2),
+            "window_average": rates and round(rates.window_average, 2),
+            "window_peak": rates and round(rates.window_peak, 2),
         }
 
 
@@ -243,24 +444,87 @@ class TeamSpeakBandwidthSentSensor(TeamSpeakBaseSensor):
         self._attr_unique_id = f"{server_unique_id}_bandwidth_sent"
 
     @property
-    def native_value(self) -> int | None:
+    def native_value(self) -> float | None:
         """Return the bandwidth sent in bytes per second."""
-        server_info = self.coordinator.data["server_info"]
-        value = server_info.get("connection_bandwidth_sent_last_second_total")
-        return int(value) if value is not None else None
+        # The average since the last poll, or the last second until there is one
+        if (rates := self.coordinator.data.rates.sent) is not None:
+            return rates.rate
+        return self.coordinator.data.server.bandwidth_sent
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
         """Return additional attributes."""
-        server_info = self.coordinator.data["server_info"]
+        server = self.coordinator.data.server
+        rates = self.coordinator.data.rates.sent
         return {
-            "total_bytes": int(server_info.get("connection_bytes_sent_total", 0)),
-            "last_minute": int(
-                server_info.get("connection_bandwidth_sent_last_minute_total", 0)
-            ),
+            "total_bytes": server.bytes_sent_total,
+            "last_second": server.bandwidth_sent,
+            "last_minute": server.bandwidth_sent_last_minute,
+            "average": rates and round(rates.average, 2),
+            "window_average": rates and round(rates.window_average, 2),
+            "window_peak": rates and round(rates.window_peak, 2),
         }
 
 
+class TeamSpeakPacketLossSensor(TeamSpeakBaseSensor):
+    """Sensor for the average packet loss of all clients."""
+
+    _attr_translation_key = "packet_loss"
+    _attr_icon = "mdi:lan-pending"
+    _attr_native_unit_of_measurement = PERCENTAGE
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_suggested_display_precision = 2
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, server_unique_id)
+        self._attr_unique_id = f"{server_unique_id}_packet_loss"
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the packet loss in percent."""
+        return _percent(self.coordinator.data.server.packet_loss)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the packet loss per kind of traffic."""
+        server = self.coordinator.data.server
+        return {
+            "speech": _percent(server.packet_loss_speech),
+            "keepalive": _percent(server.packet_loss_keepalive),
+            "control": _percent(server.packet_loss_control),
+        }
+
+
+class TeamSpeakPingSensor(TeamSpeakBaseSensor):
+    """Sensor for the average ping of all clients."""
+
+    _attr_translation_key = "ping"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_suggested_display_precision = 0
+    _attr_icon = "mdi:timer-outline"
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, server_unique_id)
+        self._attr_unique_id = f"{server_unique_id}_ping"
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the ping in milliseconds."""
+        return self.coordinator.data.server.ping
+
+
 class TeamSpeakServerStatusSensor(TeamSpeakBaseSensor):
     """Sensor for server status."""
 
@@ -279,16 +543,657 @@ class TeamSpeakServerStatusSensor(TeamSpeakBaseSensor):
     @property
     def native_value(self) -> str | None:
         """Return the server status."""
-        server_info = self.coordinator.data["server_info"]
-        return server_info.get("virtualserver_status")
+        return self.coordinator.data.server.status
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        server = self.coordinator.data.server
+        return {
+            "server_name": server.name,
+            "server_version": server.version,
+            "platform": server.platform,
+            "server_port": server.port,
+        }
+
+
+class TeamSpeakNoopRefreshesSensor(TeamSpeakBaseSensor):
+    """Diagnostic sensor counting refreshes that changed no client or channel."""
+
+    _attr_translation_key = "noop_refreshes"
+    _attr_icon = "mdi:sync-off"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _tiers = None
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, server_unique_id)
+        self._attr_unique_id = f"{server_unique_id}_noop_refreshes"
+
+    @property
+    def native_value(self) -> int:
+        """Return the number of refreshes without list changes."""
+        return self.coordinator.noop_refresh_count
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        return {
+            "total_refreshes": self.coordinator.refresh_count,
+            "requests": dict(self.coordinator.client.request_counts),
+        }
+
+
+class TeamSpeakUpdateIntervalSensor(TeamSpeakBaseSensor):
+    """Diagnostic sensor for the current polling interval."""
+
+    _attr_translation_key = "update_interval"
+    _attr_icon = "mdi:timer-sync-outline"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_suggested_display_precision = 0
+    _tiers = None
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, server_unique_id)
+        self._attr_unique_id = f"{server_unique_id}_update_interval"
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the current polling interval in seconds."""
+        if self.coordinator.update_interval is None:
+            return None
+        return self.coordinator.update_interval.total_seconds()
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        return {
+            "reason": self.coordinator.interval_reason,
+        }
+
+
+class TeamSpeakRefreshDurationSensor(TeamSpeakBaseSensor):
+    """Diagnostic sensor for the duration of the last refresh."""
+
+    _attr_translation_key = "refresh_duration"
+    _attr_icon = "mdi:timer-outline"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_suggested_display_precision = 3
+    _tiers = None
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, server_unique_id)
+        self._attr_unique_id = f"{server_unique_id}_refresh_duration"
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the duration of the last successful refresh in seconds."""
+        return self.coordinator.refresh_latency.last
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the refresh and per-endpoint latency histograms."""
+        return {
+            "refreshes": self.coordinator.refresh_latency.as_dict(),
+            "endpoints": {
+                endpoint: stats.latency.as_dict()
+                for endpoint, stats in self.coordinator.client.stats.items()
+            },
+        }
+
+
+class TeamSpeakFailedRefreshesSensor(TeamSpeakBaseSensor):
+    """Diagnostic sensor counting failed refreshes."""
+
+    _attr_translation_key = "failed_refreshes"
+    _attr_icon = "mdi:alert-circle-outline"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _tiers = None
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, server_unique_id)
+        self._attr_unique_id = f"{server_unique_id}_failed_refreshes"
+
+    @property
+    def available(self) -> bool:
+        """Stay available so failures are visible while they happen."""
+        return True
+
+    @property
+    def native_value(self) -> int:
+        """Return the number of failed refreshes."""
+        return self.coordinator.failed_refresh_count
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the request errors per endpoint."""
+        return {
+            "errors": {
+                endpoint: dict(stats.errors)
+                for endpoint, stats in self.coordinator.client.stats.items()
+                if stats.errors
+            },
+            "circuit_open": self.coordinator.client.queue.breaker.is_open,
+        }
+
+
+class TeamSpeakEntityWritesSensor(TeamSpeakBaseSensor):
+    """Diagnostic sensor counting entity state writes."""
+
+    _attr_translation_key = "entity_writes"
+    _attr_icon = "mdi:database-edit-outline"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _tiers = None
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, server_unique_id)
+        self._attr_unique_id = f"{server_unique_id}_entity_writes"
+
+    @property
+    def native_value(self) -> int:
+        """Return the number of entity state writes."""
+        return self.coordinator.entity_writes
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        return {
+            "skipped_writes": self.coordinator.skipped_entity_writes,
+        }
+
+
+class TeamSpeakResponseBytesSensor(TeamSpeakBaseSensor):
+    """Diagnostic sensor for the amount of data received from WebQuery."""
+
+    _attr_translation_key = "response_bytes"
+    _attr_device_class = SensorDeviceClass.DATA_SIZE
+    _attr_native_unit_of_measurement = UnitOfInformation.BYTES
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _tiers = None
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, server_unique_id)
+        self._attr_unique_id = f"{server_unique_id}_response_bytes"
+
+    @property
+    def native_value(self) -> int:
+        """Return the total size of all responses in bytes."""
+        return sum(
+            stats.bytes_received for stats in self.coordinator.client.stats.values()
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the size of the last response per endpoint."""
+        return {
+            "last_sizes": {
+                endpoint: stats.last_size
+                for endpoint, stats in self.coordinator.client.stats.items()
+            },
+        }
+
+
+class TeamSpeakLastUpdateSensor(TeamSpeakBaseSensor):
+    """Diagnostic sensor for when the data shown was fetched."""
+
+    _attr_translation_key = "last_update"
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _tiers = None
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, server_unique_id)
+        self._attr_unique_id = f"{server_unique_id}_last_update"
+
+    @property
+    def available(self) -> bool:
+        """Stay available so stale data can be recognized."""
+        return True
+
+    @property
+    def native_value(self) -> datetime | None:
+        """Return when the data was fetched, or saved if it was restored."""
+        return self.coordinator.last_refresh_at
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        return {
+            "restored": self.coordinator.data.restored_at is not None,
+        }
+
+
+class TeamSpeakActiveSpeakersSensor(TeamSpeakBaseSensor):
+    """Sensor for the number of clients talking."""
+
+    _attr_translation_key = "active_speakers"
+    _attr_icon = "mdi:account-voice"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _tiers = frozenset({"client_summary"})
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, server_unique_id)
+        self._attr_unique_id = f"{server_unique_id}_active_speakers"
+
+    @property
+    def native_value(self) -> int:
+        """Return the number of clients talking."""
+        return self.coordinator.data.client_summary.talking
+
+
+class TeamSpeakAfkClientsSensor(TeamSpeakBaseSensor):
+    """Sensor for the number of clients away or idle."""
+
+    _attr_translation_key = "afk_clients"
+    _attr_icon = "mdi:sleep"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _tiers = frozenset({"client_summary"})
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, server_unique_id)
+        self._attr_unique_id = f"{server_unique_id}_afk_clients"
+
+    @property
+    def native_value(self) -> int:
+        """Return the number of clients away or idle for 30 minutes."""
+        return self.coordinator.data.client_summary.afk
+
+
+class TeamSpeakServerGroupSensor(TeamSpeakBaseSensor):
+    """Sensor for the number of online clients in a server group."""
+
+    _attr_translation_key = "server_group"
+    _attr_icon = "mdi:account-group-outline"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _tiers = frozenset({"client_summary", "server_groups"})
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+        sgid: int,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, server_unique_id)
+        self._sgid = sgid
+        self._attr_unique_id = f"{server_unique_id}_server_group_{sgid}"
+        self._attr_translation_placeholders = {
+            "name": coordinator.data.server_groups.get(sgid, str(sgid))
+        }
+
+    @property
+    def native_value(self) -> int:
+        """Return the number of online clients in the group."""
+        return self.coordinator.data.client_summary.server_groups.get(self._sgid, 0)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        return {
+            "server_group_id": self._sgid,
+        }
+
+
+class TeamSpeakSubtreeOccupancySensor(TeamSpeakBaseSensor):
+    """Sensor for the clients in a channel and all its subchannels."""
+
+    _attr_translation_key = "subtree_clients"
+    _attr_icon = "mdi:file-tree"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _tiers = frozenset({"client_list", "channel_list"})
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+        key: str,
+    ) -> None:
+        """Initialize the sensor for a channel name or ID."""
+        super().__init__(coordinator, server_unique_id)
+        self._key = key
+        self._attr_unique_id = f"{server_unique_id}_subtree_{key}"
+        cid = coordinator.data.channel_tree.resolve(key)
+        channel = coordinator.data.channels.get(cid) if cid is not None else None
+        self._attr_translation_placeholders = {
+            "name": channel.name if channel is not None else key
+        }
+
+    @property
+    def native_value(self) -> int | None:
+        """Return the number of clients in the channel and its subchannels."""
+        data = self.coordinator.data
+        if (cid := data.channel_tree.resolve(self._key)) is None:
+            return None
+        return data.subtree_clients.get(cid, 0)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        data = self.coordinator.data
+        cid = data.channel_tree.resolve(self._key)
+        return {
+            "channel_id": cid,
+            "direct_clients": len(data.client_index.by_channel.get(cid, []))
+            if cid is not None
+            else None,
+        }
+
+
+class TeamSpeakPeakUsersSensor(TeamSpeakBaseSensor):
+    """Sensor for today's peak of concurrent users."""
+
+    _attr_translation_key = "peak_users_today"
+    _attr_icon = "mdi:chart-bell-curve"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    # The value starts over at midnight without a client list change
+    _tiers = None
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+        sessions: TeamSpeakSessionTracker,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, server_unique_id)
+        self._sessions = sessions
+        self._attr_unique_id = f"{server_unique_id}_peak_users_today"
+
+    @property
+    def native_value(self) -> int:
+        """Return the highest number of concurrent users today."""
+        return self._sessions.peak_today()[0]
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        time = self._sessions.peak_today()[1]
+        return {
+            "peak_time": time.isoformat() if time is not None else None,
+        }
+
+
+class TeamSpeakUsersTodaySensor(TeamSpeakBaseSensor):
+    """Sensor for the number of distinct users seen today."""
+
+    _attr_translation_key = "users_today"
+    _attr_icon = "mdi:account-clock"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    # The value starts over at midnight without a client list change
+    _tiers = None
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+        sessions: TeamSpeakSessionTracker,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, server_unique_id)
+        self._sessions = sessions
+        self._attr_unique_id = f"{server_unique_id}_users_today"
+
+    @property
+    def native_value(self) -> int:
+        """Return the number of distinct users seen today."""
+        return self._sessions.users_today()
+
+
+class TeamSpeakPoorConnectionsSensor(TeamSpeakBaseSensor):
+    """Sensor for the sampled clients with a poor connection."""
+
+    _attr_translation_key = "poor_connections"
+    _attr_icon = "mdi:lan-disconnect"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _unrecorded_attributes = frozenset({"clients", "channels"})
+    # Clients leaving change the value without a new sample
+    _tiers = None
+
+    def __init__(
+        self,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_unique_id: str,
+        sampler: TeamSpeakQualitySampler,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, server_unique_id)
+        self._sampler = sampler
+        self._attr_unique_id = f"{server_unique_id}_poor_connections"
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the samples, which arrive after the refresh."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._sampler.async_add_listener(self._handle_coordinator_update)
+        )
+
+    @property
+    def native_value(self) -> int:
+        """Return the number of sampled clients with a poor connection."""
+        return len(self._sampler.poor_clients())
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the worst clients and channels."""
+        channels = self.coordinator.data.channels
+        return {
+            "sampled": len(self._sampler.samples),
+            "clients": [
+                {
+                    "nickname": client.nickname,
+                    "unique_identifier": client.unique_identifier,
+                    "channel_id": client.cid,
+                    "channel_name": channel.name
+                    if (channel := channels.get(client.cid)) is not None
+                    else None,
+                    "ping": sample.ping,
+                    "packet_loss": _percent(sample.packet_loss),
+                    "sampled_at": sample.sampled_at.isoformat(),
+                }
+                for client, sample in self._sampler.poor_clients()[:MAX_LISTED]
+            ],
+            "channels": [
+                {
+                    "channel_id": quality.cid,
+                    "channel_name": channel.name
+                    if (channel := channels.get(quality.cid)) is not None
+                    else None,
+                    "sampled": quality.sampled,
+                    "ping": quality.ping and round(quality.ping, 2),
+                    "packet_loss": _percent(quality.packet_loss),
+                }
+                for quality in self._sampler.channel_quality()[:MAX_LISTED]
+            ],
+        }
+
+
+class TeamSpeakChannelOccupancySensor(SensorEntity):
+    """Sensor for the number of clients in a channel."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    _attr_icon = "mdi:account-voice"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, tracker: TeamSpeakPresenceTracker, cid: str) -> None:
+        """Initialize the sensor."""
+        self._tracker = tracker
+        self._cid = cid
+        self._attr_unique_id = f"{tracker.channel_prefix}{cid}"
+        self._attr_name = tracker.channel_name(cid)
+        self._attr_device_info = tracker.device_info
+
+    async def async_added_to_hass(self) -> None:
+        """Register with the tracker, which writes the state on changes."""
+        await super().async_added_to_hass()
+        self._tracker.channel_entities[self._cid] = self
+        self.async_on_remove(
+            lambda: self._tracker.channel_entities.pop(self._cid, None)
+        )
+
+    @property
+    def available(self) -> bool:
+        """Return if the server data is available."""
+        return self._tracker.coordinator.data_available
+
+    @property
+    def native_value(self) -> int:
+        """Return the number of clients in the channel."""
+        return len(self._tracker.channel_members(self._cid))
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        return {
+            "channel_id": self._cid,
+            "clients": self._tracker.channel_members(self._cid),
+        }
+
+
+class TeamSpeakFleetSensor(SensorEntity):
+    """Base class for the totals over all hosts."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
+    def __init__(self, fleet: TeamSpeakFleet) -> None:
+        """Initialize the sensor."""
+        self._fleet = fleet
+        self._attr_unique_id = f"{FLEET_UNIQUE_ID}_{self._attr_translation_key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, FLEET_UNIQUE_ID)},
+            name="TeamSpeak fleet",
+            manufacturer="TeamSpeak Systems GmbH",
+            model="Fleet",
+            entry_type=DeviceEntryType.SERVICE,
+        )
+        self._last_state_key: Any = None
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the fleet totals."""
+        await super().async_added_to_hass()
+        self.async_on_remove(self._fleet.async_add_listener(self._handle_update))
+
+    @callback
+    def _handle_update(self) -> None:
+        """Write state only when this sensor's total changed."""
+        state_key = (self.native_value, self.extra_state_attributes)
+        if state_key == self._last_state_key:
+            return
+        self._last_state_key = state_key
+        self.async_write_ha_state()
+
+
+class TeamSpeakFleetClientsSensor(TeamSpeakFleetSensor):
+    """Sensor for the clients online on all servers."""
+
+    _attr_translation_key = "fleet_clients"
+    _attr_icon = "mdi:account-group"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    @property
+    def native_value(self) -> int:
+        """Return the total number of clients online."""
+        return self._fleet.clients
+
+
+class TeamSpeakFleetBandwidthSensor(TeamSpeakFleetSensor):
+    """Sensor for the bandwidth of all servers."""
+
+    _attr_translation_key = "fleet_bandwidth"
+    _attr_device_class = SensorDeviceClass.DATA_RATE
+    _attr_native_unit_of_measurement = UnitOfDataRate.BYTES_PER_SECOND
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_suggested_display_precision = 2
+
+    @property
+    def native_value(self) -> int:
+        """Return the received and sent bytes per second."""
+        return self._fleet.bandwidth_received + self._fleet.bandwidth_sent
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        return {
+            "received": self._fleet.bandwidth_received,
+            "sent": self._fleet.bandwidth_sent,
+        }
+
+
+class TeamSpeakFleetServersUpSensor(TeamSpeakFleetSensor):
+    """Sensor for the number of servers online."""
+
+    _attr_translation_key = "fleet_servers_up"
+    _attr_icon = "mdi:server-network"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    @property
+    def native_value(self) -> int:
+        """Return the number of servers online."""
+        return self._fleet.servers_up
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
         """Return additional attributes."""
-        server_info = self.coordinator.data["server_info"]
         return {
-            "server_name": server_info.get("virtualserver_name"),
-            "server_version": server_info.get("virtualserver_version"),
-            "platform": server_info.get("virtualserver_platform"),
-            "server_port": server_info.get("virtualserver_port"),
+            "servers": self._fleet.servers,
+            "hosts": self._fleet.hosts,
         }
@@ -0,0 +1,110 @@
+"""Services for the TeamSpeak Server Info integration."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+
+from .const import (
+    ATTR_CONFIG_ENTRY_ID,
+    ATTR_DAYS,
+    ATTR_LIMIT,
+    ATTR_SERVER_ID,
+    DOMAIN,
+    SERVICE_GET_ROSTER,
+    SERVICE_GET_SESSIONS,
+)
+from .sessions import HISTORY_DAYS
+
+if TYPE_CHECKING:
+    from . import TeamSpeakConfigEntry
+
+GET_ROSTER_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_SERVER_ID): cv.positive_int,
+    }
+)
+
+GET_SESSIONS_SCHEMA = GET_ROSTER_SCHEMA.extend(
+    {
+        vol.Optional(ATTR_DAYS, default=7): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=HISTORY_DAYS)
+        ),
+        vol.Optional(ATTR_LIMIT, default=10): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=1000)
+        ),
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services."""
+
+    @callback
+    def _async_get_server(call: ServiceCall) -> tuple[TeamSpeakConfigEntry, int]:
+        """Return the loaded entry and virtual server a call refers to."""
+        entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+        entry = hass.config_entries.async_get_entry(entry_id)
+        if entry is None or entry.domain != DOMAIN:
+            raise ServiceValidationError(f"Unknown config entry: {entry_id}")
+        if entry.state is not ConfigEntryState.LOADED:
+            raise ServiceValidationError(f"Config entry not loaded: {entry_id}")
+
+        coordinators = entry.runtime_data.coordinators
+        if (server_id := call.data.get(ATTR_SERVER_ID)) is None:
+            if len(coordinators) != 1:
+                raise ServiceValidationError(
+                    "A server ID is required for entries with several servers"
+                )
+            server_id = next(iter(coordinators))
+        if server_id not in coordinators:
+            raise ServiceValidationError(f"Unknown virtual server: {server_id}")
+        return entry, server_id
+
+    async def async_get_roster(call: ServiceCall) -> ServiceResponse:
+        """Return the full, unprojected client and channel lists."""
+        entry, server_id = _async_get_server(call)
+        data = entry.runtime_data.coordinators[server_id].data
+        return {
+            "clients": data.client_list,
+            "channels": data.channel_list,
+        }
+
+    async def async_get_sessions(call: ServiceCall) -> ServiceResponse:
+        """Return the most active users and the daily peaks of a period."""
+        entry, server_id = _async_get_server(call)
+        sessions = entry.runtime_data.sessions[server_id]
+        days = call.data[ATTR_DAYS]
+        return {
+            "users": sessions.top_users(days, call.data[ATTR_LIMIT]),
+            "peaks": sessions.daily_peaks(days),
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_ROSTER,
+        async_get_roster,
+        schema=GET_ROSTER_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_SESSIONS,
+        async_get_sessions,
+        schema=GET_SESSIONS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,363 @@
+"""Per-user online time and daily peak concurrency for one virtual server."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+import heapq
+import logging
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .coordinator import TeamSpeakDataUpdateCoordinator
+from .models import Client, TeamSpeakSnapshot
+from .store import TeamSpeakStore
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# Changes are written this long after the first one, and on unload and shutdown
+SAVE_DELAY = 300
+
+# Daily online times and peaks are kept for this many days
+HISTORY_DAYS = 31
+# Users not seen for this long, or beyond the user limit, are forgotten
+USER_RETENTION = timedelta(days=90)
+MAX_USERS = 5000
+
+
+@dataclass(slots=True)
+class UserSessions:
+    """Accumulated online time of one user."""
+
+    nickname: str
+    # Online seconds in total and per local day (ISO date)
+    total: float = 0.0
+    days: dict[str, float] = field(default_factory=dict)
+    sessions: int = 0
+    # Timestamp of the last join, leave or checkpoint while online
+    last_seen: float = 0.0
+
+    def add_online(self, start: float, end: float) -> None:
+        """Add the time from start to end, split at local midnight."""
+        while start < end:
+            day = dt_util.as_local(dt_util.utc_from_timestamp(start)).date()
+            midnight = dt_util.start_of_local_day(day + timedelta(days=1)).timestamp()
+            segment_end = min(end, midnight)
+            key = day.isoformat()
+            self.days[key] = self.days.get(key, 0.0) + segment_end - start
+            self.total += segment_end - start
+            start = segment_end
+
+    def online_since(self, first_day: str) -> float:
+        """Return the online seconds from a local day on."""
+        return sum(seconds for day, seconds in self.days.items() if day >= first_day)
+
+
+class TeamSpeakSessionTracker:
+    """Turn client deltas into sessions keyed by client unique identifier.
+
+    A user joins with their first connection and leaves with their last one.
+    Online time is accounted when a session ends or a save checkpoints the
+    open sessions, so refreshes only touch the clients in the delta. Users
+    are kept in least recently seen order and the oldest absent ones are
+    evicted to bound memory and storage.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_id: int,
+    ) -> None:
+        """Initialize the tracker."""
+        self.hass = hass
+        self.entry = entry
+        self.coordinator = coordinator
+        self._store = TeamSpeakStore(
+            hass,
+            STORAGE_VERSION,
+            storage_key(entry.entry_id, server_id),
+            self._data_to_save,
+            SAVE_DELAY,
+        )
+
+        # Least recently seen first
+        self._users: dict[str, UserSessions] = {}
+        # uid of every connected clid, and the open sessions by uid
+        self._clids: dict[int, str] = {}
+        self._connections: dict[str, set[int]] = {}
+        self._online_since: dict[str, float] = {}
+
+        # Daily peak of concurrent users and when it was reached
+        self._peaks: dict[str, tuple[int, float]] = {}
+        self._today = ""
+        self._seen_today: set[str] = set()
+        self._last_data: TeamSpeakSnapshot | None = None
+
+    @property
+    def users_online(self) -> int:
+        """Return the number of users connected."""
+        return len(self._connections)
+
+    @property
+    def users_tracked(self) -> int:
+        """Return the number of users with stored sessions."""
+        return len(self._users)
+
+    async def async_start(self) -> None:
+        """Load the stored sessions and start following the coordinator."""
+        if (stored := await self._store.async_load()) is not None:
+            self._load(stored)
+
+        now = dt_util.utcnow().timestamp()
+        self._roll_day(now)
+        self._last_data = self.coordinator.data
+        # Clients online at startup open new sessions, once they are fetched
+        if self._last_data.restored_at is None:
+            for client in self._last_data.clients.values():
+                self._connect(client, now)
+        self._record_peak(now)
+
+        self.entry.async_on_unload(
+            self.coordinator.async_add_listener(self._async_handle_update)
+        )
+        self._store.async_start(self.entry)
+
+    def peak_today(self) -> tuple[int, datetime | None]:
+        """Return today's peak of concurrent users and when it was reached."""
+        today = _day_key(dt_util.utcnow().timestamp())
+        if (peak := self._peaks.get(today)) is None or today != self._today:
+            return self.users_online, None
+        return peak[0], dt_util.utc_from_timestamp(peak[1])
+
+    def users_today(self) -> int:
+        """Return the number of distinct users seen today."""
+        if _day_key(dt_util.utcnow().timestamp()) != self._today:
+            return self.users_online
+        return len(self._seen_today)
+
+    def top_users(self, days: int, limit: int) -> list[dict[str, Any]]:
+        """Return the users with the most online time in the last days."""
+        now = dt_util.utcnow().timestamp()
+        self._checkpoint(now)
+        first_day = _first_day(days)
+        top = heapq.nlargest(
+            limit,
+            (
+                (user.online_since(first_day), uid, user)
+                for uid, user in self._users.items()
+            ),
+            key=lambda item: item[0],
+        )
+        return [
+            {
+                "unique_identifier": uid,
+                "nickname": user.nickname,
+                "online_time": round(seconds),
+                "sessions": user.sessions,
+                "last_seen": dt_util.utc_from_timestamp(user.last_seen).isoformat(),
+                "online": uid in self._connections,
+            }
+            for seconds, uid, user in top
+            if seconds > 0
+        ]
+
+    def daily_peaks(self, days: int) -> dict[str, dict[str, Any]]:
+        """Return the daily peaks of concurrent users in the last days."""
+        first_day = _first_day(days)
+        return {
+            day: {
+                "users": peak,
+                "time": dt_util.utc_from_timestamp(time).isoformat(),
+            }
+            for day, (peak, time) in sorted(self._peaks.items())
+            if day >= first_day
+        }
+
+    @callback
+    def _async_handle_update(self) -> None:
+        """Open and close sessions from the latest client delta."""
+        data = self.coordinator.data
+        # Failed refreshes keep the previous data and delta
+        if data is self._last_data:
+            return
+        previous, self._last_data = self._last_data, data
+        now = dt_util.utcnow().timestamp()
+        if previous is not None and previous.restored_at is not None:
+            # The first fetched clients open sessions, as they would at startup
+            if data.restored_at is None:
+                self._roll_day(now)
+                for client in data.clients.values():
+                    self._connect(client, now)
+                self._record_peak(now)
+                self._store.async_schedule_save()
+            return
+        if "client_list" not in data.updated:
+            return
+
+        self._roll_day(now)
+        delta = data.client_delta
+        for clid in delta.removed:
+            self._disconnect(clid, now)
+        for clid, client in delta.modified.items():
+            if self._clids.get(clid) == client.unique_identifier:
+                if (user := self._users.get(client.unique_identifier)) is not None:
+                    user.nickname = client.nickname
+            else:
+                self._disconnect(clid, now)
+                self._connect(client, now)
+        for client in delta.added.values():
+            self._connect(client, now)
+
+        self._record_peak(now)
+        self._evict(now)
+        self._store.async_schedule_save()
+
+    def _connect(self, client: Client, now: float) -> None:
+        """Track a connection, opening a session for the user's first one."""
+        if not (uid := client.unique_identifier):
+            return
+        self._clids[client.clid] = uid
+        # Re-inserting moves the user to the most recently seen end
+        user = self._users.pop(uid, None) or UserSessions(client.nickname)
+        self._users[uid] = user
+        user.nickname = client.nickname
+        user.last_seen = now
+        connections = self._connections.setdefault(uid, set())
+        connections.add(client.clid)
+        if len(connections) == 1:
+            user.sessions += 1
+            self._online_since[uid] = now
+            self._seen_today.add(uid)
+
+    def _disconnect(self, clid: int, now: float) -> None:
+        """Forget a connection, closing the session after the user's last one."""
+        if (uid := self._clids.pop(clid, None)) is None:
+            return
+        connections = self._connections[uid]
+        connections.discard(clid)
+        if connections:
+            return
+        del self._connections[uid]
+        user = self._users.pop(uid)
+        self._users[uid] = user
+        user.add_online(self._online_since.pop(uid), now)
+        user.last_seen = now
+
+    def _record_peak(self, now: float) -> None:
+        """Raise today's peak to the current number of users."""
+        online = self.users_online
+        peak = self._peaks.get(self._today)
+        if peak is None or online > peak[0]:
+            self._peaks[self._today] = (online, now)
+
+    def _roll_day(self, now: float) -> None:
+        """Start a new day of peaks and users, pruning old history."""
+        if (today := _day_key(now)) == self._today:
+            return
+        self._today = today
+        # Users online over midnight count towards the new day, and users
+        # stored earlier today towards it after a restart
+        self._seen_today = {
+            uid for uid, user in self._users.items() if today in user.days
+        }
+        self._seen_today.update(self._connections)
+        midnight = dt_util.start_of_local_day(date.fromisoformat(today))
+        self._record_peak(midnight.timestamp())
+        first_day = _first_day(HISTORY_DAYS)
+        for day in [day for day in self._peaks if day < first_day]:
+            del self._peaks[day]
+        for user in self._users.values():
+            for day in [day for day in user.days if day < first_day]:
+                del user.days[day]
+
+    def _evict(self, now: float) -> None:
+        """Drop the least recently seen absent users beyond the limits."""
+        cutoff = now - USER_RETENTION.total_seconds()
+        excess = len(self._users) - MAX_USERS
+        stale: list[str] = []
+        for uid, user in self._users.items():
+            if excess <= 0 and user.last_seen >= cutoff:
+                break
+            if uid in self._connections:
+                continue
+            stale.append(uid)
+            excess -= 1
+        for uid in stale:
+            del self._users[uid]
+
+    def _checkpoint(self, now: float) -> None:
+        """Account the open sessions up to now."""
+        for uid, since in self._online_since.items():
+            user = self._users[uid]
+            user.add_online(since, now)
+            user.last_seen = now
+            self._online_since[uid] = now
+
+    def _load(self, stored: dict[str, Any]) -> None:
+        """Restore the users and peaks from storage."""
+        self._users = {
+            uid: UserSessions(
+                nickname=user["n"],
+                total=user["t"],
+                days=user["d"],
+                sessions=user["s"],
+                last_seen=user["l"],
+            )
+            for uid, user in sorted(
+                stored.get("users", {}).items(), key=lambda item: item[1]["l"]
+            )
+        }
+        self._peaks = {
+            day: (peak, time) for day, (peak, time) in stored.get("peaks", {}).items()
+        }
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the compact storage representation."""
+        self._checkpoint(dt_util.utcnow().timestamp())
+        _LOGGER.debug("Saving sessions of %s users", len(self._users))
+        return {
+            "users": {
+                uid: {
+                    "n": user.nickname,
+                    "t": round(user.total),
+                    "d": {day: round(seconds) for day, seconds in user.days.items()},
+                    "s": user.sessions,
+                    "l": round(user.last_seen),
+                }
+                for uid, user in self._users.items()
+            },
+            "peaks": {
+                day: [peak, round(time)] for day, (peak, time) in self._peaks.items()
+            },
+        }
+
+
+def storage_key(entry_id: str, server_id: int) -> str:
+    """Return the storage key of the sessions of one virtual server."""
+    return f"{DOMAIN}.{entry_id}.{server_id}.sessions"
+
+
+async def async_remove_sessions(
+    hass: HomeAssistant, entry_id: str, server_id: int
+) -> None:
+    """Delete the stored sessions of one virtual server."""
+    await Store(hass, STORAGE_VERSION, storage_key(entry_id, server_id)).async_remove()
+
+
+def _day_key(timestamp: float) -> str:
+    """Return the local day of a timestamp as ISO date."""
+    return dt_util.as_local(dt_util.utc_from_timestamp(timestamp)).date().isoformat()
+
+
+def _first_day(days: int) -> str:
+    """Return the first local day of a period ending today."""
+    return (dt_util.now().date() - timedelta(days=days - 1)).isoformat()
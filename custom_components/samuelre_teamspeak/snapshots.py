@@ -0,0 +1,100 @@
+"""Last snapshot of each virtual server, persisted for an instant startup."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .coordinator import TeamSpeakDataUpdateCoordinator
+from .store import TeamSpeakStore
+
+STORAGE_VERSION = 1
+# Changes are written this long after the first one, and on unload and shutdown
+SAVE_DELAY = 600
+# Older snapshots are not restored
+MAX_AGE = timedelta(days=7)
+
+
+class TeamSpeakSnapshotStore:
+    """Save the last fetched snapshot of every virtual server of an entry.
+
+    The raw server, client and channel records are stored, so a restore
+    builds the snapshot, its indexes and its channel tree the same way a
+    refresh does. Restored snapshots are written back unchanged until a
+    refresh replaces them.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the snapshot store."""
+        self.hass = hass
+        self.entry = entry
+        self._store = TeamSpeakStore(
+            hass,
+            STORAGE_VERSION,
+            storage_key(entry.entry_id),
+            self._data_to_save,
+            SAVE_DELAY,
+        )
+        self._coordinators: dict[int, TeamSpeakDataUpdateCoordinator] = {}
+        self._stored: dict[str, dict[str, Any]] = {}
+
+    async def async_load(self) -> dict[int, dict[str, Any]]:
+        """Return the stored snapshots recent enough to restore."""
+        self._stored = await self._store.async_load() or {}
+        cutoff = dt_util.utcnow().timestamp() - MAX_AGE.total_seconds()
+        return {
+            int(server_id): stored
+            for server_id, stored in self._stored.items()
+            if stored["saved_at"] >= cutoff
+        }
+
+    @callback
+    def async_start(
+        self, coordinators: dict[int, TeamSpeakDataUpdateCoordinator]
+    ) -> None:
+        """Save the snapshots some time after they change."""
+        self._coordinators = coordinators
+        for coordinator in coordinators.values():
+            self.entry.async_on_unload(
+                coordinator.async_add_listener(self._store.async_schedule_save)
+            )
+        self._store.async_start(self.entry)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the raw records of the current snapshots."""
+        for server_id, coordinator in self._coordinators.items():
+            data = coordinator.data
+            if data.restored_at is not None:
+                continue
+            saved_at = coordinator.last_refresh_at or dt_util.utcnow()
+            self._stored[str(server_id)] = {
+                "saved_at": saved_at.timestamp(),
+                "server": data.server.raw,
+                "clients": data.client_list,
+                "channels": data.channel_list,
+                "server_groups": {
+                    str(sgid): name for sgid, name in data.server_groups.items()
+                },
+            }
+        return {
+            str(server_id): self._stored[str(server_id)]
+            for server_id in self._coordinators
+            if str(server_id) in self._stored
+        }
+
+
+def storage_key(entry_id: str) -> str:
+    """Return the storage key of the snapshots of an entry."""
+    return f"{DOMAIN}.{entry_id}.snapshots"
+
+
+async def async_remove_snapshots(hass: HomeAssistant, entry_id: str) -> None:
+    """Delete the stored snapshots of an entry."""
+    await Store(hass, STORAGE_VERSION, storage_key(entry_id)).async_remove()
@@ -0,0 +1,227 @@
+"""Hourly long-term statistics for the TeamSpeak integration."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import logging
+
+from homeassistant.components.recorder.models import (
+    StatisticData,
+    StatisticMeanType,
+    StatisticMetaData,
+)
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import UnitOfDataRate
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import DOMAIN
+from .coordinator import TeamSpeakDataUpdateCoordinator
+from .models import TeamSpeakSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+HOUR = timedelta(hours=1)
+
+# The last client count is carried over gaps up to this or two intervals
+MAX_CLIENT_HOLD = timedelta(minutes=15)
+
+
+@dataclass(slots=True)
+class _Sample:
+    """Values seen at one point in time."""
+
+    time: datetime
+    clients_online: int | None
+    bytes_received: int
+    bytes_sent: int
+
+
+@dataclass(slots=True)
+class _HourBucket:
+    """Time-weighted aggregate of one series over one hour."""
+
+    start: datetime
+    weighted_sum: float = 0.0
+    seconds: float = 0.0
+    min: float | None = None
+    max: float | None = None
+
+    def add(self, value: float, seconds: float) -> None:
+        """Add a value that was held for a number of seconds."""
+        self.weighted_sum += value * seconds
+        self.seconds += seconds
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def statistic(self) -> StatisticData:
+        """Return the aggregate as a statistics row."""
+        return StatisticData(
+            start=self.start,
+            mean=self.weighted_sum / self.seconds,
+            min=self.min,
+            max=self.max,
+        )
+
+
+class _HourlySeries:
+    """One external statistic aggregated per hour in memory."""
+
+    def __init__(self, metadata: StatisticMetaData) -> None:
+        """Initialize the series."""
+        self.metadata = metadata
+        self._buckets: dict[datetime, _HourBucket] = {}
+
+    def add(self, start: datetime, end: datetime, value: float) -> None:
+        """Add a value that was held from start to end, split at hour borders."""
+        while start < end:
+            hour = start.replace(minute=0, second=0, microsecond=0)
+            segment_end = min(end, hour + HOUR)
+            if (bucket := self._buckets.get(hour)) is None:
+                bucket = self._buckets[hour] = _HourBucket(hour)
+            bucket.add(value, (segment_end - start).total_seconds())
+            start = segment_end
+
+    def pop_completed(self, now: datetime) -> list[StatisticData]:
+        """Remove and return the hours that ended before now."""
+        current = now.replace(minute=0, second=0, microsecond=0)
+        completed = sorted(hour for hour in self._buckets if hour < current)
+        return [self._buckets.pop(hour).statistic() for hour in completed]
+
+
+class TeamSpeakStatistics:
+    """Import hourly client and bandwidth statistics for one virtual server.
+
+    Samples are aggregated in memory and each hour is written once it has
+    ended. Bandwidth is derived from the byte counters, so polls that are
+    missed or slowed down still account for all transferred data.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+        server_id: int,
+    ) -> None:
+        """Initialize the statistics."""
+        self.hass = hass
+        self.entry = entry
+        self.coordinator = coordinator
+        server = coordinator.data.server
+        prefix = _statistic_prefix(entry, server_id, server.unique_identifier)
+        self._clients = _HourlySeries(
+            _metadata(f"{prefix}_clients_online", f"{server.name} clients online", None)
+        )
+        self._received = _HourlySeries(
+            _metadata(
+                f"{prefix}_bandwidth_received",
+                f"{server.name} bandwidth received",
+                UnitOfDataRate.BYTES_PER_SECOND,
+            )
+        )
+        self._sent = _HourlySeries(
+            _metadata(
+                f"{prefix}_bandwidth_sent",
+                f"{server.name} bandwidth sent",
+                UnitOfDataRate.BYTES_PER_SECOND,
+            )
+        )
+        self._last: _Sample | None = None
+        self._last_counters: _Sample | None = None
+        self._last_data: TeamSpeakSnapshot | None = None
+        self._last_refresh_count = -1
+
+    @callback
+    def async_start(self) -> None:
+        """Start sampling the coordinator if the recorder is running."""
+        if "recorder" not in self.hass.config.components:
+            _LOGGER.debug("Recorder not loaded, not importing statistics")
+            return
+        self._async_handle_update()
+        self.entry.async_on_unload(
+            self.coordinator.async_add_listener(self._async_handle_update)
+        )
+
+    @callback
+    def _async_handle_update(self) -> None:
+        """Record a sample and write the hours that have ended."""
+        data = self.coordinator.data
+        if not self.coordinator.last_update_success or data is self._last_data:
+            return
+        # Restored data describes an earlier time
+        if data.restored_at is not None:
+            return
+        self._last_data = data
+        server = data.server
+        sample = _Sample(
+            time=dt_util.utcnow(),
+            clients_online=server.clients_online,
+            bytes_received=server.bytes_received_total,
+            bytes_sent=server.bytes_sent_total,
+        )
+
+        # The client count is a step function held until the next sample
+        last = self._last
+        hold = MAX_CLIENT_HOLD
+        if self.coordinator.update_interval is not None:
+            hold = max(hold, 2 * self.coordinator.update_interval)
+        if (
+            last is not None
+            and last.clients_online is not None
+            and sample.time - last.time <= hold
+        ):
+            self._clients.add(last.time, sample.time, last.clients_online)
+        self._last = sample
+
+        # Byte counters only move on polls; push updates copy the old values
+        if self.coordinator.refresh_count != self._last_refresh_count:
+            self._last_refresh_count = self.coordinator.refresh_count
+            self._add_rates(sample)
+
+        for series in (self._clients, self._received, self._sent):
+            if statistics := series.pop_completed(sample.time):
+                async_add_external_statistics(self.hass, series.metadata, statistics)
+
+    def _add_rates(self, sample: _Sample) -> None:
+        """Spread the bytes transferred since the last poll over its interval."""
+        last, self._last_counters = self._last_counters, sample
+        if last is None:
+            return
+        seconds = (sample.time - last.time).total_seconds()
+        received = sample.bytes_received - last.bytes_received
+        sent = sample.bytes_sent - last.bytes_sent
+        # Counters start over when the virtual server restarts
+        if seconds <= 0 or received < 0 or sent < 0:
+            return
+        self._received.add(last.time, sample.time, received / seconds)
+        self._sent.add(last.time, sample.time, sent / seconds)
+
+
+def _statistic_prefix(
+    entry: ConfigEntry, server_id: int, unique_identifier: str
+) -> str:
+    """Return the statistic ID prefix of a virtual server.
+
+    Servers that do not report a unique identifier, or one without any
+    letters or digits, fall back to the config entry and server ID.
+    """
+    if (slug := slugify(unique_identifier)) and slug != "unknown":
+        return f"{DOMAIN}:{slug}"
+    return f"{DOMAIN}:{slugify(entry.entry_id)}_{server_id}"
+
+
+def _metadata(statistic_id: str, name: str, unit: str | None) -> StatisticMetaData:
+    """Return the metadata of an external mean/min/max statistic."""
+    return StatisticMetaData(
+        mean_type=StatisticMeanType.ARITHMETIC,
+        has_sum=False,
+        name=name,
+        source=DOMAIN,
+        statistic_id=statistic_id,
+        unit_of_measurement=unit,
+    )
@@ -0,0 +1,77 @@
+"""Storage written at most once per delay, with the data built in the event loop."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+
+
+class TeamSpeakStore:
+    """Persist data that changes on many refreshes.
+
+    The delayed save of Store postpones the write on every call, so data
+    changing more often than the delay would only be written at shutdown,
+    and it builds the data in an executor thread. Here the first change
+    schedules the write, and the data is built in the event loop when it
+    is due.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        version: int,
+        key: str,
+        data_func: Callable[[], dict[str, Any]],
+        delay: float,
+    ) -> None:
+        """Initialize the store."""
+        self.hass = hass
+        self._store: Store[dict[str, Any]] = Store(hass, version, key)
+        self._data_func = data_func
+        self._delay = delay
+        self._unsub_save: CALLBACK_TYPE | None = None
+
+    async def async_load(self) -> dict[str, Any] | None:
+        """Return the stored data, if any."""
+        return await self._store.async_load()
+
+    @callback
+    def async_start(self, entry: ConfigEntry) -> None:
+        """Write the data on unload and when Home Assistant stops."""
+        entry.async_on_unload(self.async_save)
+        entry.async_on_unload(
+            self.hass.bus.async_listen_once(
+                EVENT_HOMEASSISTANT_FINAL_WRITE, self._async_handle_final_write
+            )
+        )
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Write the data once the delay has passed since the first change."""
+        if self._unsub_save is None:
+            self._unsub_save = async_call_later(
+                self.hass, self._delay, self._async_handle_delayed_save
+            )
+
+    async def async_save(self) -> None:
+        """Write the data right away."""
+        if self._unsub_save is not None:
+            self._unsub_save()
+            self._unsub_save = None
+        await self._store.async_save(self._data_func())
+
+    async def _async_handle_delayed_save(self, _now: datetime) -> None:
+        """Write the data when the delay has passed."""
+        self._unsub_save = None
+        await self.async_save()
+
+    async def _async_handle_final_write(self, _event: Event) -> None:
+        """Write the data before Home Assistant stops."""
+        await self.async_save()
@@ -0,0 +1,323 @@
+"""Presence tracking behind the per-client and per-channel entities."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_ABSENCE_TIMEOUT,
+    CONF_MAX_TRACKED_CHANNELS,
+    CONF_MAX_TRACKED_CLIENTS,
+    CONF_TRACKED_CHANNELS,
+    CONF_TRACKED_CLIENTS,
+    DEFAULT_ABSENCE_TIMEOUT,
+    DOMAIN,
+)
+from .coordinator import TeamSpeakDataUpdateCoordinator
+from .models import Channel, Client, TeamSpeakSnapshot
+
+if TYPE_CHECKING:
+    from homeassistant.helpers.entity import Entity
+
+CLEANUP_INTERVAL = timedelta(minutes=10)
+
+type EntityAdder = Callable[[Iterable[str]], None]
+
+
+class TeamSpeakPresenceTracker:
+    """Maintain client presence and channel occupancy from list deltas.
+
+    Entities are created the first time a tracked client or channel shows up.
+    Each refresh only touches the clients in the coordinator's client delta
+    and writes the entities affected by them.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        coordinator: TeamSpeakDataUpdateCoordinator,
+    ) -> None:
+        """Initialize the tracker."""
+        self.hass = hass
+        self.entry = entry
+        self.coordinator = coordinator
+        self.server_unique_id = coordinator.data.server.unique_identifier
+        self.device_info = DeviceInfo(identifiers={(DOMAIN, self.server_unique_id)})
+
+        options = entry.options
+        self._tracked_clients = set(options.get(CONF_TRACKED_CLIENTS, []))
+        self._tracked_channels = set(options.get(CONF_TRACKED_CHANNELS, []))
+        self._max_clients: int = options.get(CONF_MAX_TRACKED_CLIENTS, 0)
+        self._max_channels: int = options.get(CONF_MAX_TRACKED_CHANNELS, 0)
+        self._absence = timedelta(
+            hours=options.get(CONF_ABSENCE_TIMEOUT, DEFAULT_ABSENCE_TIMEOUT)
+        )
+
+        # clid -> (unique id, cid, nickname) of every client online
+        self._clients: dict[int, tuple[str, str, str]] = {}
+        self._online: dict[str, set[int]] = {}
+        self._members: dict[str, set[int]] = {}
+        self._nicknames: dict[str, str] = {}
+        self._channel_names: dict[str, str] = {}
+
+        # Clients and channels that have (or are about to get) an entity
+        self._known_clients: set[str] = set()
+        self._known_channels: set[str] = set()
+        self._client_last_seen: dict[str, datetime] = {}
+        self._channel_last_seen: dict[str, datetime] = {}
+        self.client_entities: dict[str, Entity] = {}
+        self.channel_entities: dict[str, Entity] = {}
+        self._add_clients: EntityAdder | None = None
+        self._add_channels: EntityAdder | None = None
+
+        self._last_data: TeamSpeakSnapshot | None = None
+        self._available = True
+
+    @property
+    def client_prefix(self) -> str:
+        """Return the unique ID prefix of client entities."""
+        return f"{self.server_unique_id}_client_"
+
+    @property
+    def channel_prefix(self) -> str:
+        """Return the unique ID prefix of channel entities."""
+        return f"{self.server_unique_id}_channel_"
+
+    @callback
+    def async_start(self) -> None:
+        """Load the current state and start following the coordinator."""
+        now = dt_util.utcnow()
+
+        # Entities created in earlier runs are restored so they can age out
+        registry = er.async_get(self.hass)
+        for entity in er.async_entries_for_config_entry(registry, self.entry.entry_id):
+            if entity.unique_id.startswith(self.client_prefix):
+                uid = entity.unique_id.removeprefix(self.client_prefix)
+                self._known_clients.add(uid)
+                self._client_last_seen[uid] = now
+            elif entity.unique_id.startswith(self.channel_prefix):
+                cid = entity.unique_id.removeprefix(self.channel_prefix)
+                self._known_channels.add(cid)
+                self._channel_last_seen[cid] = now
+
+        # Allow-listed clients get an entity right away, even while offline
+        self._known_clients.update(self._tracked_clients)
+
+        data = self.coordinator.data
+        self._last_data = data
+        self._update_channel_names(data.channels.values())
+        changed_uids: set[str] = set()
+        changed_cids: set[str] = set()
+        for client in data.clients.values():
+            self._add_client(client, changed_uids, changed_cids)
+        self._async_apply(changed_uids, changed_cids)
+
+        self.entry.async_on_unload(
+            self.coordinator.async_add_listener(self._async_handle_update)
+        )
+        self.entry.async_on_unload(
+            async_track_time_interval(self.hass, self._async_cleanup, CLEANUP_INTERVAL)
+        )
+
+    @callback
+    def async_set_client_adder(self, adder: EntityAdder) -> None:
+        """Register the callback creating client entities."""
+        self._add_clients = adder
+        adder(list(self._known_clients))
+
+    @callback
+    def async_set_channel_adder(self, adder: EntityAdder) -> None:
+        """Register the callback creating channel entities."""
+        self._add_channels = adder
+        adder(list(self._known_channels))
+
+    def is_online(self, uid: str) -> bool:
+        """Return True if a client is connected."""
+        return uid in self._online
+
+    def client_nickname(self, uid: str) -> str | None:
+        """Return the last known nickname of a client."""
+        return self._nicknames.get(uid)
+
+    def client_channels(self, uid: str) -> list[str]:
+        """Return the names of the channels a client is connected to."""
+        return [
+            self.channel_name(self._clients[clid][1])
+            for clid in self._online.get(uid, ())
+        ]
+
+    def channel_name(self, cid: str) -> str:
+        """Return the name of a channel."""
+        return self._channel_names.get(cid, cid)
+
+    def channel_members(self, cid: str) -> list[str]:
+        """Return the nicknames of the clients in a channel."""
+        return sorted(self._clients[clid][2] for clid in self._members.get(cid, ()))
+
+    @callback
+    def _async_handle_update(self) -> None:
+        """Apply the latest client delta."""
+        available = self.coordinator.data_available
+        if available != self._available:
+            self._available = available
+            for entity in (
+                *self.client_entities.values(),
+                *self.channel_entities.values(),
+            ):
+                entity.async_write_ha_state()
+                self.coordinator.entity_writes += 1
+
+        data = self.coordinator.data
+        # Failed refreshes keep the previous data and delta
+        if data is self._last_data:
+            return
+        self._last_data = data
+
+        if "channel_list" in data.updated:
+            self._update_channel_names(data.channels.values())
+        if "client_list" not in data.updated:
+            return
+
+        delta = data.client_delta
+        changed_uids: set[str] = set()
+        changed_cids: set[str] = set()
+        for clid in delta.removed:
+            self._remove_client(clid, changed_uids, changed_cids)
+        for clid, client in delta.modified.items():
+            self._remove_client(clid, changed_uids, changed_cids)
+            self._add_client(client, changed_uids, changed_cids)
+        for client in delta.added.values():
+            self._add_client(client, changed_uids, changed_cids)
+        self._async_apply(changed_uids, changed_cids)
+
+    def _update_channel_names(self, channels: Iterable[Channel]) -> None:
+        """Rebuild the channel name lookup."""
+        self._channel_names = {str(channel.cid): channel.name for channel in channels}
+
+    def _add_client(
+        self, client: Client, changed_uids: set[str], changed_cids: set[str]
+    ) -> None:
+        """Track a connected client."""
+        uid = client.unique_identifier
+        cid = str(client.cid)
+        nickname = client.nickname
+        self._clients[client.clid] = (uid, cid, nickname)
+        self._members.setdefault(cid, set()).add(client.clid)
+        changed_cids.add(cid)
+        if uid:
+            self._online.setdefault(uid, set()).add(client.clid)
+            self._nicknames[uid] = nickname
+            changed_uids.add(uid)
+
+    def _remove_client(
+        self, clid: int, changed_uids: set[str], changed_cids: set[str]
+    ) -> None:
+        """Forget a client that disconnected or changed."""
+        if (client := self._clients.pop(clid, None)) is None:
+            return
+        uid, cid, _ = client
+        if (members := self._members.get(cid)) is not None:
+            members.discard(clid)
+            if not members:
+                del self._members[cid]
+        changed_cids.add(cid)
+        if (clids := self._online.get(uid)) is not None:
+            clids.discard(clid)
+            if not clids:
+                del self._online[uid]
+            changed_uids.add(uid)
+
+    @callback
+    def _async_apply(self, changed_uids: set[str], changed_cids: set[str]) -> None:
+        """Write or create the entities affected by a change."""
+        now = dt_util.utcnow()
+
+        new_clients: list[str] = []
+        for uid in changed_uids:
+            self._client_last_seen[uid] = now
+            if (entity := self.client_entities.get(uid)) is not None:
+                entity.async_write_ha_state()
+                self.coordinator.entity_writes += 1
+            elif uid not in self._known_clients and self._should_track_client(uid):
+                self._known_clients.add(uid)
+                new_clients.append(uid)
+
+        new_channels: list[str] = []
+        for cid in changed_cids:
+            if cid in self._members:
+                self._channel_last_seen[cid] = now
+            if (entity := self.channel_entities.get(cid)) is not None:
+                entity.async_write_ha_state()
+                self.coordinator.entity_writes += 1
+            elif (
+                cid in self._members
+                and cid not in self._known_channels
+                and self._should_track_channel(cid)
+            ):
+                self._known_channels.add(cid)
+                new_channels.append(cid)
+
+        if new_clients and self._add_clients is not None:
+            self._add_clients(new_clients)
+        if new_channels and self._add_channels is not None:
+            self._add_channels(new_channels)
+
+    def _should_track_client(self, uid: str) -> bool:
+        """Return True if a client should get an entity."""
+        if self._tracked_clients:
+            return uid in self._tracked_clients
+        return len(self._known_clients) < self._max_clients
+
+    def _should_track_channel(self, cid: str) -> bool:
+        """Return True if a channel should get an entity."""
+        if self._tracked_channels:
+            return self._is_tracked_channel(cid)
+        return len(self._known_channels) < self._max_channels
+
+    @callback
+    def _async_cleanup(self, now: datetime) -> None:
+        """Remove entities of clients and channels absent for too long."""
+        registry = er.async_get(self.hass)
+
+        for uid in list(self._known_clients):
+            if uid in self._online or uid in self._tracked_clients:
+                continue
+            if now - self._client_last_seen.get(uid, now) < self._absence:
+                continue
+            self._known_clients.discard(uid)
+            self._client_last_seen.pop(uid, None)
+            self._nicknames.pop(uid, None)
+            if entity_id := registry.async_get_entity_id(
+                Platform.BINARY_SENSOR, DOMAIN, f"{self.client_prefix}{uid}"
+            ):
+                registry.async_remove(entity_id)
+
+        for cid in list(self._known_channels):
+            if cid in self._members or self._is_tracked_channel(cid):
+                continue
+            if now - self._channel_last_seen.get(cid, now) < self._absence:
+                continue
+            self._known_channels.discard(cid)
+            self._channel_last_seen.pop(cid, None)
+            if entity_id := registry.async_get_entity_id(
+                Platform.SENSOR, DOMAIN, f"{self.channel_prefix}{cid}"
+            ):
+                registry.async_remove(entity_id)
+
+    def _is_tracked_channel(self, cid: str) -> bool:
+        """Return True if a channel is on the allow-list."""
+        return (
+            cid in self._tracked_channels
+            or self.channel_name(cid) in self._tracked_channels
+        )
@@ -0,0 +1 @@
+"""Tests for the TeamSpeak Server Info integration."""
@@ -0,0 +1 @@
+"""Benchmarks of the refresh path against a fake WebQuery server."""
@@ -0,0 +1,31 @@
+"""Fixtures for the benchmarks."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from ..fake_webquery import Roster
+from ..harness import TeamSpeakHarness
+
+
+@pytest.fixture
+def harness(
+    tmp_path: Path, request: pytest.FixtureRequest
+) -> Iterator[TeamSpeakHarness]:
+    """Return a harness for a roster of the requested size.
+
+    The parameter is the number of clients, and the channel tree grows with
+    it, or a tuple of the number of clients and channels.
+    """
+    size = getattr(request, "param", 100)
+    clients, channels = size if isinstance(size, tuple) else (size, size // 5)
+    roster = Roster.generate(
+        clients=clients, channels=max(channels, 10), depth=6, server_groups=20
+    )
+    harness = TeamSpeakHarness(tmp_path, roster)
+    yield harness
+    harness.close()
+    assert harness.server.violations == []
@@ -0,0 +1,63 @@
+"""Benchmarks of reading the states of all entities between refreshes.
+
+The sensors read from the typed snapshot parsed once per refresh, so a read
+neither parses the raw records again nor copies the rosters.
+"""
+
+from __future__ import annotations
+
+import time
+import tracemalloc
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from homeassistant.helpers.entity_platform import async_get_platforms
+
+from custom_components.samuelre_teamspeak.const import DOMAIN
+
+from ..harness import TeamSpeakHarness
+
+READS = 100
+
+# Peak allocations of reading every state once, independent of the roster
+MAX_READ_ALLOCATION = 1024 * 1024
+
+
+@pytest.mark.parametrize("harness", [1000, 10_000], indirect=True)
+def test_state_reads(benchmark: BenchmarkFixture, harness: TeamSpeakHarness) -> None:
+    """Read the state and attributes of every entity."""
+    harness.setup()
+    entities = [
+        entity
+        for platform in async_get_platforms(harness.hass, DOMAIN)
+        for entity in platform.entities.values()
+    ]
+    reads = 0
+
+    def read() -> None:
+        nonlocal reads
+        reads += 1
+        for entity in entities:
+            _ = entity.state, entity.extra_state_attributes
+
+    started = time.process_time()
+    benchmark.pedantic(read, rounds=READS, iterations=1, warmup_rounds=1)
+    cpu_per_read = (time.process_time() - started) / reads
+
+    tracemalloc.start()
+    try:
+        read()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    benchmark.extra_info.update(
+        {
+            "clients": len(harness.roster.clients),
+            "entities": len(entities),
+            "cpu_seconds_per_read": cpu_per_read,
+            "peak_allocated_kib_per_read": round(peak / 1024, 1),
+        }
+    )
+    assert peak < MAX_READ_ALLOCATION
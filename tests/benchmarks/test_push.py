@@ -0,0 +1,129 @@
+"""Benchmark of push mode against polling for client joins.
+
+Each round waits a random part of the poll interval, lets a client join and
+measures the time until the coordinator data has it. Push mode sends the
+join as a ServerQuery notification; polling has to wait for the next
+refresh. The requests sent meanwhile, idle polls included, are counted per
+join.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from pathlib import Path
+import random
+import statistics
+import time
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from homeassistant.core import callback
+
+from ..fake_webquery import Roster
+from ..harness import TeamSpeakHarness
+
+ROUNDS = 5
+POLL_INTERVAL = 1
+
+
+def _harness(config_dir: Path, push: bool) -> TeamSpeakHarness:
+    """Return a harness polling every second, with or without push mode."""
+    config_dir.mkdir()
+    harness = TeamSpeakHarness(
+        config_dir,
+        Roster.generate(clients=100, channels=20),
+        scan_interval=POLL_INTERVAL,
+        push=push,
+    )
+    harness.setup()
+    return harness
+
+
+async def _async_join(harness: TeamSpeakHarness) -> float:
+    """Let a client join and return the seconds until the coordinator has it."""
+    coordinator = harness.coordinator
+    seen: asyncio.Future[float] = harness.loop.create_future()
+    clid = harness.roster.join()
+    started = time.perf_counter()
+
+    @callback
+    def _async_check() -> None:
+        if clid in coordinator.data.clients and not seen.done():
+            seen.set_result(time.perf_counter() - started)
+
+    unsub = coordinator.async_add_listener(_async_check)
+    try:
+        if harness.query is not None:
+            record = harness.roster.clients[clid]
+            await harness.query.notify(
+                "notifycliententerview", {"ctid": record["cid"], **record}
+            )
+        async with asyncio.timeout(POLL_INTERVAL * 5):
+            return await seen
+    finally:
+        unsub()
+
+
+def _run_joins(
+    harness: TeamSpeakHarness,
+    timer: Callable[[Callable[[], None], Callable[[], None]], None],
+) -> tuple[list[float], float]:
+    """Time client joins and return the latencies and requests per join."""
+    rng = random.Random(0)
+    latencies: list[float] = []
+
+    def setup() -> None:
+        harness.run(asyncio.sleep(rng.uniform(0, POLL_INTERVAL)))
+
+    def join() -> None:
+        latencies.append(harness.run(_async_join(harness)))
+
+    requests = len(harness.server.requests)
+    timer(join, setup)
+    return latencies, (len(harness.server.requests) - requests) / len(latencies)
+
+
+def _repeat(join: Callable[[], None], setup: Callable[[], None]) -> None:
+    """Run the rounds without pytest-benchmark."""
+    for _ in range(ROUNDS):
+        setup()
+        join()
+
+
+def test_push_versus_poll(benchmark: BenchmarkFixture, tmp_path: Path) -> None:
+    """Push mode shows a join sooner and with fewer requests than polling.
+
+    pytest-benchmark times the push mode joins; the polling joins, which
+    are dominated by the poll interval, are recorded in the extra info.
+    """
+    harness = _harness(tmp_path / "poll", push=False)
+    try:
+        poll_latencies, poll_requests = _run_joins(harness, _repeat)
+    finally:
+        harness.close()
+    assert harness.server.violations == []
+
+    harness = _harness(tmp_path / "push", push=True)
+    try:
+        push_latencies, push_requests = _run_joins(
+            harness,
+            lambda join, setup: benchmark.pedantic(
+                join, setup=setup, rounds=ROUNDS, iterations=1
+            ),
+        )
+    finally:
+        harness.close()
+    assert harness.server.violations == []
+
+    benchmark.extra_info.update(
+        {
+            "poll_interval": POLL_INTERVAL,
+            "poll_latency_mean": statistics.mean(poll_latencies),
+            "poll_requests_per_join": poll_requests,
+            "push_latency_mean": statistics.mean(push_latencies),
+            "push_requests_per_join": push_requests,
+        }
+    )
+    assert push_requests < poll_requests
+    assert max(push_latencies) < statistics.mean(poll_latencies)
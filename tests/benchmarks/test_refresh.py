@@ -0,0 +1,233 @@
+"""Benchmarks of one coordinator refresh and the state writes it causes.
+
+Besides the wall time measured by pytest-benchmark, the refresh benchmarks
+record the requests, CPU time, peak allocations and state payload per
+refresh in their extra info, so they end up in the saved benchmark JSON as
+well. The loop lag benchmark records how long the event loop was blocked.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import contextlib
+import statistics
+import time
+import tracemalloc
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from custom_components.samuelre_teamspeak.api import DEFAULT_REQUEST_SPACING
+from custom_components.samuelre_teamspeak.const import (
+    CONF_CHANNEL_LIST_INTERVAL,
+    CONF_CLIENT_LIST_INTERVAL,
+)
+
+from ..harness import TeamSpeakHarness
+
+ROUNDS = 5
+# Response delay of the fake server for a slow link to a hosted server
+LINK_LATENCY = 0.02
+# Sleep of the task probing how long the event loop is blocked
+PROBE_INTERVAL = 0.001
+ROSTER_SIZES = [10, 1000, 10_000]
+
+# Fetch the client and channel lists on every refresh
+ALWAYS_FETCH_LISTS = {CONF_CLIENT_LIST_INTERVAL: 0, CONF_CHANNEL_LIST_INTERVAL: 0}
+
+
+def _measure(
+    benchmark: BenchmarkFixture,
+    harness: TeamSpeakHarness,
+    change: Callable[[], None],
+) -> None:
+    """Benchmark refreshes after a roster change and record the extra metrics."""
+    refreshes = 0
+    wall = 0.0
+
+    def setup() -> None:
+        change()
+        harness.roster.tick(60)
+
+    def refresh() -> None:
+        nonlocal refreshes, wall
+        refreshes += 1
+        started = time.perf_counter()
+        harness.refresh()
+        wall += time.perf_counter() - started
+
+    harness.state_writes.clear()
+    requests = len(harness.server.requests)
+    noop_refreshes = harness.coordinator.noop_refresh_count
+    started = time.process_time()
+    # The warmup round also waits out the request spacing after the setup
+    benchmark.pedantic(
+        refresh, setup=setup, rounds=ROUNDS, iterations=1, warmup_rounds=1
+    )
+    cpu = time.process_time() - started
+    requests = len(harness.server.requests) - requests
+    noop_refreshes = harness.coordinator.noop_refresh_count - noop_refreshes
+    writes = [size for _, size in harness.state_writes]
+
+    # One more refresh under tracemalloc, which slows everything down
+    setup()
+    tracemalloc.start()
+    try:
+        harness.refresh()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    benchmark.extra_info.update(
+        {
+            "clients": len(harness.roster.clients),
+            "channels": len(harness.roster.channels),
+            "seconds_per_refresh": wall / refreshes,
+            "requests_per_refresh": requests / refreshes,
+            "noop_refreshes_per_refresh": noop_refreshes / refreshes,
+            # Includes the fake server, which runs in the same process
+            "cpu_seconds_per_refresh": cpu / refreshes,
+            "peak_allocated_kib": round(peak / 1024, 1),
+            "state_writes_per_refresh": len(writes) / refreshes,
+            "state_bytes_per_refresh": sum(writes) / refreshes,
+        }
+    )
+
+
+@pytest.mark.parametrize("harness", ROSTER_SIZES, indirect=True)
+def test_quiet_refresh(benchmark: BenchmarkFixture, harness: TeamSpeakHarness) -> None:
+    """Nothing but the counters changed, only serverinfo is fetched."""
+    harness.setup()
+    _measure(benchmark, harness, lambda: None)
+    assert benchmark.extra_info["requests_per_refresh"] == 1
+
+
+@pytest.mark.parametrize("harness", ROSTER_SIZES, indirect=True)
+def test_churn_refresh(benchmark: BenchmarkFixture, harness: TeamSpeakHarness) -> None:
+    """A few clients joined, left and moved, so the client list is fetched."""
+    harness.setup()
+    roster = harness.roster
+    # One more join than leave changes the count, which triggers the fetch
+    _measure(benchmark, harness, lambda: roster.churn(joins=3, leaves=2, moves=5))
+    assert benchmark.extra_info["requests_per_refresh"] == 2
+
+
+@pytest.mark.parametrize(
+    "harness", [pytest.param((500, 2000), id="500-2000")], indirect=True
+)
+def test_unchanged_lists_refresh(
+    benchmark: BenchmarkFixture, harness: TeamSpeakHarness
+) -> None:
+    """Both lists are fetched and diffed, but nothing in them changed.
+
+    The refreshes count as no-ops and the client and channel list sensors
+    skip their large state writes.
+    """
+    harness.setup(ALWAYS_FETCH_LISTS)
+    list_sensors = {harness.entity_id("clients_online"), harness.entity_id("channels")}
+    _measure(benchmark, harness, lambda: None)
+    assert benchmark.extra_info["noop_refreshes_per_refresh"] == 1
+    assert not list_sensors & {entity_id for entity_id, _ in harness.state_writes}
+
+
+@pytest.mark.parametrize("harness", ROSTER_SIZES, indirect=True)
+def test_full_refresh(benchmark: BenchmarkFixture, harness: TeamSpeakHarness) -> None:
+    """Every list is fetched and parsed on every refresh."""
+    harness.setup(ALWAYS_FETCH_LISTS)
+    roster = harness.roster
+    _measure(benchmark, harness, lambda: roster.churn(moves=5))
+
+
+@pytest.mark.parametrize("harness", [1000], indirect=True)
+def test_refresh_with_latency(
+    benchmark: BenchmarkFixture, harness: TeamSpeakHarness
+) -> None:
+    """Every request takes 20 ms, so the refresh time follows the requests."""
+    harness.server.latency = LINK_LATENCY
+    harness.setup(ALWAYS_FETCH_LISTS)
+    _measure(benchmark, harness, lambda: None)
+
+
+@pytest.mark.parametrize("batched", [True, False], ids=["batched", "per_request"])
+@pytest.mark.parametrize("harness", [1000], indirect=True)
+def test_refresh_round_trips(
+    monkeypatch: pytest.MonkeyPatch,
+    benchmark: BenchmarkFixture,
+    harness: TeamSpeakHarness,
+    batched: bool,
+) -> None:
+    """Refresh over a slow link with the request spacing of a real host.
+
+    A batch sends the requests of a refresh back to back; without it, every
+    request waits for its own slot and the spacing after the previous one.
+    """
+    harness.server.latency = LINK_LATENCY
+    harness.setup(ALWAYS_FETCH_LISTS)
+    client = harness.coordinator.client
+    client.queue.spacing = DEFAULT_REQUEST_SPACING
+    if not batched:
+        monkeypatch.setattr(client, "batch", contextlib.nullcontext)
+    _measure(benchmark, harness, lambda: None)
+
+    # Spacing between the requests of one refresh, paid only without a batch
+    info = benchmark.extra_info
+    spacing = (info["requests_per_refresh"] - 1) * DEFAULT_REQUEST_SPACING
+    assert (info["seconds_per_refresh"] < spacing) is batched
+
+
+async def _async_refresh_with_probe(harness: TeamSpeakHarness) -> list[float]:
+    """Refresh once and return how late each wakeup of a probe task was."""
+    loop = asyncio.get_running_loop()
+    lags: list[float] = []
+
+    async def probe() -> None:
+        while True:
+            started = loop.time()
+            await asyncio.sleep(PROBE_INTERVAL)
+            lags.append(loop.time() - started - PROBE_INTERVAL)
+
+    task = loop.create_task(probe())
+    await asyncio.sleep(0)
+    try:
+        await harness.async_refresh()
+    finally:
+        task.cancel()
+    return lags
+
+
+@pytest.mark.parametrize("harness", [1000, 10_000], indirect=True)
+def test_loop_lag(benchmark: BenchmarkFixture, harness: TeamSpeakHarness) -> None:
+    """Measure how long a refresh over a slow link blocks the event loop.
+
+    A probe task sleeps a millisecond at a time; how late it wakes up is the
+    time the loop was busy decoding, parsing, diffing and writing states.
+    """
+    harness.server.latency = LINK_LATENCY
+    harness.setup(ALWAYS_FETCH_LISTS)
+    roster = harness.roster
+    refreshes: list[list[float]] = []
+
+    def setup() -> None:
+        roster.churn(moves=5)
+        roster.tick(60)
+
+    def refresh() -> None:
+        refreshes.append(harness.run(_async_refresh_with_probe(harness)))
+
+    benchmark.pedantic(
+        refresh, setup=setup, rounds=ROUNDS, iterations=1, warmup_rounds=1
+    )
+
+    benchmark.extra_info.update(
+        {
+            "clients": len(roster.clients),
+            "channels": len(roster.channels),
+            "max_loop_lag_ms": round(max(map(max, refreshes)) * 1000, 1),
+            "blocked_ms_per_refresh": round(
+                statistics.mean(map(sum, refreshes)) * 1000, 1
+            ),
+        }
+    )
+    # The loop keeps running while the requests are in flight
+    assert all(len(lags) > 1 for lags in refreshes)
@@ -0,0 +1,95 @@
+"""Request count report of the tiered refresh.
+
+Five minutes of refreshes every five seconds are run on a simulated clock,
+once with list cadences and once fetching every list on every refresh.
+The extra info holds the requests and bytes received per endpoint.
+"""
+
+from __future__ import annotations
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from custom_components.samuelre_teamspeak import coordinator
+from custom_components.samuelre_teamspeak.const import (
+    CONF_CHANNEL_LIST_INTERVAL,
+    CONF_CLIENT_LIST_INTERVAL,
+)
+
+from ..harness import TeamSpeakHarness
+
+TICK = 5
+PERIOD = 300
+
+# Seconds between list fetches, where 0 fetches on every refresh
+CADENCES = {
+    "tiered": {CONF_CLIENT_LIST_INTERVAL: 30, CONF_CHANNEL_LIST_INTERVAL: 300},
+    "every_tick": {CONF_CLIENT_LIST_INTERVAL: 0, CONF_CHANNEL_LIST_INTERVAL: 0},
+}
+
+
+class _Clock:
+    """Monotonic clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.mark.parametrize("cadence", CADENCES)
+@pytest.mark.parametrize("harness", [1000], indirect=True)
+def test_request_report(
+    monkeypatch: pytest.MonkeyPatch,
+    benchmark: BenchmarkFixture,
+    harness: TeamSpeakHarness,
+    cadence: str,
+) -> None:
+    """Only serverinfo is fetched on every tick, the lists on their cadence."""
+    clock = _Clock()
+    monkeypatch.setattr(coordinator, "time", clock)
+    options = CADENCES[cadence]
+    harness.setup(options)
+    stats = harness.coordinator.client.stats
+    before = {
+        endpoint: (endpoint_stats.requests, endpoint_stats.bytes_received)
+        for endpoint, endpoint_stats in stats.items()
+    }
+
+    def run_period() -> None:
+        # A few moves keep the client count and so the cadence unchanged
+        for _ in range(PERIOD // TICK):
+            clock.now += TICK
+            harness.roster.tick(TICK)
+            harness.roster.churn(moves=2)
+            harness.refresh()
+
+    benchmark.pedantic(run_period, rounds=1, iterations=1)
+
+    requests = {
+        endpoint: endpoint_stats.requests - before.get(endpoint, (0, 0))[0]
+        for endpoint, endpoint_stats in stats.items()
+    }
+    received = {
+        endpoint: endpoint_stats.bytes_received - before.get(endpoint, (0, 0))[1]
+        for endpoint, endpoint_stats in stats.items()
+    }
+    benchmark.extra_info.update(
+        {
+            "period_seconds": PERIOD,
+            "requests": requests,
+            "bytes_received": received,
+            "total_requests": sum(requests.values()),
+            "total_bytes_received": sum(received.values()),
+        }
+    )
+
+    ticks = PERIOD // TICK
+    for endpoint, key in (
+        ("clientlist", CONF_CLIENT_LIST_INTERVAL),
+        ("channellist", CONF_CHANNEL_LIST_INTERVAL),
+    ):
+        interval = options[key]
+        assert requests[endpoint] == (PERIOD // interval if interval else ticks)
+    assert requests["serverinfo"] == ticks
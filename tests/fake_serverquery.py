@@ -0,0 +1,99 @@
+"""Local fake of the TeamSpeak ServerQuery interface."""
+
+from __future__ import annotations
+
+import asyncio
+
+from custom_components.samuelre_teamspeak.query import escape, parse_params
+
+
+class FakeServerQuery:
+    """Accept ServerQuery connections and push notifications to them.
+
+    Logins are checked against one username and password; every other
+    command succeeds. Notification lines are written to all connections
+    that registered for notifications.
+    """
+
+    def __init__(self, username: str = "serveradmin", password: str = "secret") -> None:
+        """Initialize the fake server."""
+        self.username = username
+        self.password = password
+        self.commands: list[str] = []
+        self.logins = 0
+        self._server: asyncio.Server | None = None
+        self._writers: list[asyncio.StreamWriter] = []
+        self._registered: asyncio.Event = asyncio.Event()
+
+    @property
+    def port(self) -> int:
+        """Return the port the server listens on."""
+        assert self._server is not None
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self) -> None:
+        """Listen on a free local port."""
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+
+    async def stop(self) -> None:
+        """Drop all connections and stop listening."""
+        self.drop_connections()
+        assert self._server is not None
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def wait_registered(self) -> None:
+        """Wait until a connection registered for notifications."""
+        await asyncio.wait_for(self._registered.wait(), 5)
+        self._registered.clear()
+
+    async def notify(self, name: str, *records: dict[str, str]) -> None:
+        """Send a notification with one or more records."""
+        line = "|".join(
+            " ".join(f"{key}={escape(value)}" for key, value in record.items())
+            for record in records
+        )
+        for writer in list(self._writers):
+            try:
+                writer.write(f"{name} {line}\n\r".encode())
+                await writer.drain()
+            except ConnectionError:
+                # The client went away before the server noticed
+                self._writers.remove(writer)
+
+    def drop_connections(self) -> None:
+        """Close every open connection."""
+        for writer in self._writers:
+            writer.close()
+        self._writers.clear()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve one connection."""
+        writer.write(b"TS3\n\rWelcome to the TeamSpeak 3 ServerQuery interface\n\r")
+        while line := (await reader.readline()).decode().strip():
+            self.commands.append(line)
+            command, _, params = line.partition(" ")
+            if command == "quit":
+                break
+            if command == "login":
+                login = parse_params(params)
+                if (
+                    login.get("client_login_name") != self.username
+                    or login.get("client_login_password") != self.password
+                ):
+                    writer.write(b"error id=520 msg=invalid\\slogin\n\r")
+                    await writer.drain()
+                    continue
+                self.logins += 1
+            elif command == "whoami":
+                writer.write(b"virtualserver_status=online virtualserver_id=1\n\r")
+            writer.write(b"error id=0 msg=ok\n\r")
+            await writer.drain()
+            if command == "servernotifyregister" and "event=channel" in params:
+                self._writers.append(writer)
+                self._registered.set()
+        if writer in self._writers:
+            self._writers.remove(writer)
+        writer.close()
@@ -0,0 +1,357 @@
+"""Local fake of the TeamSpeak WebQuery HTTP interface."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+import random
+from typing import Any
+
+from aiohttp import web
+
+API_KEY = "fake-api-key"
+
+# Status codes of failed commands, as checked by the client
+ERROR_INVALID_API_KEY = 3329
+ERROR_INVALID_SERVER_ID = 1024
+ERROR_INVALID_CLIENT_ID = 512
+
+# Faults that can be injected into the next matching requests
+FAULT_HANG = "hang"
+FAULT_RESET = "reset"
+FAULT_SERVER_ERROR = "server_error"
+
+
+@dataclass
+class Roster:
+    """Clients, channels and counters of one generated virtual server.
+
+    Records hold strings like the real WebQuery responses. Channels are
+    numbered from 1 and never removed.
+    """
+
+    server_id: int
+    server_info: dict[str, str]
+    clients: dict[int, dict[str, str]]
+    channels: dict[int, dict[str, str]]
+    server_groups: list[dict[str, str]]
+    rng: random.Random = field(repr=False)
+    next_clid: int = 1
+
+    @classmethod
+    def generate(
+        cls,
+        clients: int = 10,
+        channels: int = 10,
+        depth: int = 3,
+        server_groups: int = 5,
+        server_id: int = 1,
+        seed: int = 0,
+    ) -> Roster:
+        """Generate a server with a channel tree up to depth levels deep."""
+        rng = random.Random(seed)
+        levels: dict[int, int] = {}
+        last_child: dict[int, int] = {}
+        channel_records: dict[int, dict[str, str]] = {}
+        for cid in range(1, channels + 1):
+            parents = [other for other, level in levels.items() if level < depth - 1]
+            pid = rng.choice([0, *parents]) if parents else 0
+            levels[cid] = levels.get(pid, -1) + 1
+            channel_records[cid] = {
+                "cid": str(cid),
+                "pid": str(pid),
+                "channel_order": str(last_child.get(pid, 0)),
+                "channel_name": f"Channel {cid}",
+                "total_clients": "0",
+            }
+            last_child[pid] = cid
+        groups = [
+            {"sgid": str(sgid), "name": f"Group {sgid}", "type": "1"}
+            for sgid in range(6, 6 + server_groups)
+        ]
+        roster = cls(
+            server_id=server_id,
+            server_info={
+                "virtualserver_id": str(server_id),
+                "virtualserver_unique_identifier": f"fake{server_id}uid=",
+                "virtualserver_name": f"Fake Server {server_id}",
+                "virtualserver_version": "3.13.7 [Build: 1655727713]",
+                "virtualserver_platform": "Linux",
+                "virtualserver_port": str(9986 + server_id),
+                "virtualserver_status": "online",
+                "virtualserver_maxclients": str(max(clients * 2, 32)),
+                "virtualserver_uptime": "3600",
+                "connection_bytes_received_total": "0",
+                "connection_bytes_sent_total": "0",
+            },
+            clients={},
+            channels=channel_records,
+            server_groups=groups,
+            rng=rng,
+        )
+        # The ServerQuery client WebQuery requests are made as
+        roster.join(client_type=1)
+        for _ in range(clients):
+            roster.join()
+        return roster
+
+    def join(self, client_type: int = 0) -> int:
+        """Add a client to a random channel and return its clid."""
+        clid = self.next_clid
+        self.next_clid += 1
+        cid = self.rng.randint(1, len(self.channels))
+        groups = self.rng.sample(
+            [group["sgid"] for group in self.server_groups],
+            min(2, len(self.server_groups)),
+        )
+        self.clients[clid] = {
+            "clid": str(clid),
+            "cid": str(cid),
+            "client_database_id": str(clid + 100),
+            "client_nickname": f"Client {clid}",
+            "client_type": str(client_type),
+            "client_unique_identifier": f"client{clid}uid=",
+            "client_away": "0",
+            "client_away_message": "",
+            "client_flag_talking": "0",
+            "client_input_muted": "0",
+            "client_output_muted": "0",
+            "client_servergroups": ",".join(groups),
+            "client_channel_group_id": "8",
+            "client_country": "DE",
+            "client_idle_time": str(self.rng.randrange(600_000)),
+        }
+        self._adjust_channel(cid, 1)
+        return clid
+
+    def leave(self, clid: int) -> None:
+        """Remove a client."""
+        client = self.clients.pop(clid)
+        self._adjust_channel(int(client["cid"]), -1)
+
+    def move(self, clid: int, cid: int) -> None:
+        """Move a client to another channel."""
+        client = self.clients[clid]
+        self._adjust_channel(int(client["cid"]), -1)
+        client["cid"] = str(cid)
+        self._adjust_channel(cid, 1)
+
+    def churn(self, joins: int = 0, leaves: int = 0, moves: int = 0) -> None:
+        """Let random regular clients join, leave and switch channels."""
+        regular = [
+            clid
+            for clid, client in self.clients.items()
+            if client["client_type"] == "0"
+        ]
+        for clid in self.rng.sample(regular, min(leaves, len(regular))):
+            self.leave(clid)
+        regular = [clid for clid in regular if clid in self.clients]
+        for clid in self.rng.sample(regular, min(moves, len(regular))):
+            self.move(clid, self.rng.randint(1, len(self.channels)))
+        for _ in range(joins):
+            self.join()
+
+    def tick(self, seconds: int, rate: int = 20_000) -> None:
+        """Advance the uptime and the byte counters."""
+        info = self.server_info
+        info["virtualserver_uptime"] = str(int(info["virtualserver_uptime"]) + seconds)
+        for key in ("connection_bytes_received_total", "connection_bytes_sent_total"):
+            info[key] = str(int(info[key]) + rate * seconds)
+
+    def server_info_record(self) -> dict[str, str]:
+        """Return the serverinfo record with the current counts."""
+        query = sum(client["client_type"] == "1" for client in self.clients.values())
+        return {
+            **self.server_info,
+            "virtualserver_clientsonline": str(len(self.clients)),
+            "virtualserver_queryclientsonline": str(query),
+            "virtualserver_channelsonline": str(len(self.channels)),
+        }
+
+    def client_info_record(self, clid: int) -> dict[str, str]:
+        """Return the clientinfo record of a client."""
+        return {
+            **self.clients[clid],
+            "connection_ping": "23.5",
+            "connection_packetloss_total": "0.01",
+            "connection_bandwidth_received_last_minute_total": "4000",
+            "connection_bandwidth_sent_last_minute_total": "6000",
+            "connection_connected_time": "120000",
+        }
+
+    def _adjust_channel(self, cid: int, delta: int) -> None:
+        """Adjust the number of clients in a channel."""
+        channel = self.channels[cid]
+        channel["total_clients"] = str(int(channel["total_clients"]) + delta)
+
+
+@dataclass
+class _Fault:
+    """A fault for the next matching requests."""
+
+    kind: str
+    endpoint: str | None
+    remaining: int
+    status: int
+
+
+class FakeWebQuery:
+    """Serve WebQuery requests for generated rosters.
+
+    The real server only copes with one connection serving one request at a
+    time. A second open connection or a concurrent request is recorded as a
+    violation and the offending connection is reset.
+    """
+
+    def __init__(
+        self, *rosters: Roster, api_key: str = API_KEY, latency: float = 0.0
+    ) -> None:
+        """Initialize the fake server."""
+        self.rosters = {
+            roster.server_id: roster for roster in rosters or (Roster.generate(),)
+        }
+        self.api_key = api_key
+        # Delay of every response, and of single endpoints on top of it
+        self.latency = latency
+        self.endpoint_latency: dict[str, float] = {}
+        # Endpoints in the order they were requested
+        self.requests: list[str] = []
+        self.violations: list[str] = []
+        self.connections_opened = 0
+        self._faults: deque[_Fault] = deque()
+        self._connections: set[asyncio.BaseTransport] = set()
+        self._active: set[asyncio.BaseTransport] = set()
+        self._released = asyncio.Event()
+        self._runner: web.AppRunner | None = None
+        self._site: web.TCPSite | None = None
+
+    @property
+    def port(self) -> int:
+        """Return the port the server listens on."""
+        assert self._runner is not None
+        return self._runner.addresses[0][1]
+
+    async def start(self) -> None:
+        """Listen on a free local port."""
+        app = web.Application()
+        app.router.add_post("/{path:.*}", self._handle)
+        self._runner = web.AppRunner(app, handle_signals=False)
+        await self._runner.setup()
+        self._site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await self._site.start()
+
+    async def stop(self) -> None:
+        """Release hung requests and stop listening."""
+        self._released.set()
+        assert self._runner is not None
+        await self._runner.cleanup()
+
+    def add_fault(
+        self,
+        kind: str,
+        endpoint: str | None = None,
+        count: int = 1,
+        status: int = 503,
+    ) -> None:
+        """Fail the next requests, or those to one endpoint, count times."""
+        self._faults.append(_Fault(kind, endpoint, count, status))
+
+    def clear_faults(self) -> None:
+        """Let every request succeed again."""
+        self._faults.clear()
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        """Serve one request."""
+        transport = request.transport
+        assert transport is not None
+        endpoint, server_id = self._route(request.match_info["path"])
+        self.requests.append(endpoint)
+
+        self._connections = {
+            conn for conn in self._connections if not conn.is_closing()
+        }
+        if transport not in self._connections:
+            self.connections_opened += 1
+            if self._connections:
+                return self._violation(transport, f"second connection for {endpoint}")
+            self._connections.add(transport)
+        self._active = {conn for conn in self._active if not conn.is_closing()}
+        if self._active:
+            return self._violation(transport, f"concurrent request for {endpoint}")
+
+        self._active.add(transport)
+        try:
+            if delay := self.latency + self.endpoint_latency.get(endpoint, 0.0):
+                await asyncio.sleep(delay)
+            if (fault := self._next_fault(endpoint)) is not None:
+                if fault.kind == FAULT_HANG:
+                    await self._released.wait()
+                if fault.kind == FAULT_RESET:
+                    transport.abort()
+                    return web.Response()
+                return web.Response(status=fault.status, text="Service Unavailable")
+            return self._respond(request, endpoint, server_id)
+        finally:
+            self._active.discard(transport)
+
+    @staticmethod
+    def _route(path: str) -> tuple[str, int | None]:
+        """Return the endpoint and virtual server of a request path."""
+        server_id, _, endpoint = path.rpartition("/")
+        return endpoint, int(server_id) if server_id.isdigit() else None
+
+    def _violation(
+        self, transport: asyncio.BaseTransport, message: str
+    ) -> web.Response:
+        """Record a broken one session rule and reset the connection."""
+        self.violations.append(message)
+        transport.abort()
+        return web.Response()
+
+    def _next_fault(self, endpoint: str) -> _Fault | None:
+        """Return and use up the first fault matching the endpoint."""
+        for fault in self._faults:
+            if fault.endpoint in (None, endpoint):
+                fault.remaining -= 1
+                if not fault.remaining:
+                    self._faults.remove(fault)
+                return fault
+        return None
+
+    def _respond(
+        self, request: web.Request, endpoint: str, server_id: int | None
+    ) -> web.Response:
+        """Return the JSON response of a command."""
+        if request.query.get("api-key") != self.api_key:
+            return _error(ERROR_INVALID_API_KEY, "invalid apikey")
+        if endpoint == "serverlist":
+            return _ok(
+                [roster.server_info_record() for roster in self.rosters.values()]
+            )
+        if (roster := self.rosters.get(server_id or 0)) is None:
+            return _error(ERROR_INVALID_SERVER_ID, "invalid serverID")
+        if endpoint == "serverinfo":
+            return _ok([roster.server_info_record()])
+        if endpoint == "clientlist":
+            return _ok(list(roster.clients.values()))
+        if endpoint == "channellist":
+            return _ok(list(roster.channels.values()))
+        if endpoint == "servergrouplist":
+            return _ok(roster.server_groups)
+        if endpoint == "clientinfo":
+            clid = request.query.get("clid", "")
+            if not clid.isdigit() or int(clid) not in roster.clients:
+                return _error(ERROR_INVALID_CLIENT_ID, "invalid clientID")
+            return _ok([roster.client_info_record(int(clid))])
+        return _error(256, "command not found")
+
+
+def _ok(body: list[dict[str, Any]]) -> web.Response:
+    """Return a successful command response."""
+    return web.json_response({"body": body, "status": {"code": 0, "message": "ok"}})
+
+
+def _error(code: int, message: str) -> web.Response:
+    """Return a failed command response."""
+    return web.json_response({"status": {"code": code, "message": message}})
@@ -0,0 +1,168 @@
+"""Harness running the integration against the fake WebQuery server.
+
+With push mode set up, the fake ServerQuery server is started as well.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Coroutine
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any
+
+from homeassistant import loader
+from homeassistant.bootstrap import async_load_base_functionality
+from homeassistant.config_entries import ConfigEntries, ConfigEntry, ConfigEntryState
+from homeassistant.const import CONF_HOST, CONF_PORT, CONF_SCAN_INTERVAL
+from homeassistant.core import EVENT_STATE_CHANGED, Event, HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.json import json_bytes
+
+from custom_components.samuelre_teamspeak.adaptive import REASON_PUSH
+from custom_components.samuelre_teamspeak.config_flow import TeamSpeakConfigFlow
+from custom_components.samuelre_teamspeak.const import (
+    CONF_API_KEY,
+    CONF_QUERY_PASSWORD,
+    CONF_QUERY_PORT,
+    CONF_QUERY_USERNAME,
+    CONF_SERVER_IDS,
+    DOMAIN,
+)
+from custom_components.samuelre_teamspeak.coordinator import (
+    TeamSpeakDataUpdateCoordinator,
+)
+
+from .fake_serverquery import FakeServerQuery
+from .fake_webquery import API_KEY, FakeWebQuery, Roster
+
+ROOT = Path(__file__).parents[1]
+
+
+class TeamSpeakHarness:
+    """Home Assistant with one TeamSpeak host set up on its own event loop.
+
+    pytest-benchmark times synchronous calls, so every refresh is run to
+    completion on the harness loop, including the state writes it causes.
+    """
+
+    def __init__(
+        self,
+        config_dir: Path,
+        roster: Roster,
+        scan_interval: int = 60,
+        push: bool = False,
+    ) -> None:
+        """Initialize the harness."""
+        self.config_dir = config_dir
+        self.roster = roster
+        self.scan_interval = scan_interval
+        self.loop = asyncio.new_event_loop()
+        self.server = FakeWebQuery(roster)
+        # ServerQuery server of the push mode, if it is set up
+        self.query = FakeServerQuery() if push else None
+        self.hass: HomeAssistant
+        self.entry: ConfigEntry
+        self.coordinator: TeamSpeakDataUpdateCoordinator
+        # Entity IDs and sizes of the states written since the last reset
+        self.state_writes: list[tuple[str, int]] = []
+        self._started = False
+
+    def run[T](self, coro: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the harness loop."""
+        return self.loop.run_until_complete(coro)
+
+    def setup(self, options: dict[str, Any] | None = None) -> None:
+        """Start the fake server and set up the integration."""
+        self.run(self._async_setup(options or {}))
+
+    def refresh(self) -> None:
+        """Refresh the coordinator and wait for the entities to write."""
+        self.run(self.async_refresh())
+
+    def entity_id(self, key: str) -> str:
+        """Return the entity ID of a sensor of the virtual server."""
+        unique_id = f"{self.coordinator.data.server.unique_identifier}_{key}"
+        entity_id = er.async_get(self.hass).async_get_entity_id(
+            "sensor", DOMAIN, unique_id
+        )
+        assert entity_id is not None
+        return entity_id
+
+    def close(self) -> None:
+        """Unload the integration and stop everything that was started."""
+        if self._started:
+            self.run(self._async_close())
+        self.loop.close()
+
+    async def _async_setup(self, options: dict[str, Any]) -> None:
+        """Set up Home Assistant with the custom component and one entry."""
+        (self.config_dir / "custom_components").symlink_to(ROOT / "custom_components")
+        await self.server.start()
+        self._started = True
+        data: dict[str, Any] = {
+            CONF_HOST: "127.0.0.1",
+            CONF_PORT: self.server.port,
+            CONF_API_KEY: API_KEY,
+            CONF_SCAN_INTERVAL: self.scan_interval,
+            CONF_SERVER_IDS: [self.roster.server_id],
+        }
+        if self.query is not None:
+            await self.query.start()
+            data |= {
+                CONF_QUERY_PORT: self.query.port,
+                CONF_QUERY_USERNAME: self.query.username,
+                CONF_QUERY_PASSWORD: self.query.password,
+            }
+        self.hass = hass = HomeAssistant(str(self.config_dir))
+        hass.config.skip_pip = True
+        loader.async_setup(hass)
+        hass.config_entries = ConfigEntries(hass, {})
+        await async_load_base_functionality(hass)
+
+        self.entry = ConfigEntry(
+            domain=DOMAIN,
+            title="Fake TeamSpeak",
+            data=data,
+            options=options,
+            source="user",
+            version=TeamSpeakConfigFlow.VERSION,
+            minor_version=1,
+            unique_id=None,
+            discovery_keys=MappingProxyType({}),
+            subentries_data=None,
+        )
+        await hass.config_entries.async_add(self.entry)
+        await hass.async_block_till_done()
+        assert self.entry.state is ConfigEntryState.LOADED
+        self.coordinator = self.entry.runtime_data.coordinators[self.roster.server_id]
+        # Refreshes run back to back here, the request spacing would dominate
+        self.coordinator.client.queue.spacing = 0
+        hass.bus.async_listen(EVENT_STATE_CHANGED, self._async_record_write)
+        if self.query is not None:
+            await self.query.wait_registered()
+            # The listener switches to push mode once the register is answered
+            async with asyncio.timeout(5):
+                while self.coordinator.interval_reason != REASON_PUSH:
+                    await asyncio.sleep(0.01)
+
+    async def async_refresh(self) -> None:
+        """Refresh once and let every listener finish."""
+        await self.coordinator.async_refresh()
+        await self.hass.async_block_till_done()
+        assert self.coordinator.last_update_success
+
+    async def _async_close(self) -> None:
+        """Unload the entry, stop Home Assistant and the fake server."""
+        await self.hass.config_entries.async_unload(self.entry.entry_id)
+        await self.hass.async_stop(force=True)
+        await self.server.stop()
+        if self.query is not None:
+            await self.query.stop()
+
+    def _async_record_write(self, event: Event) -> None:
+        """Record the entity and serialized size of a written state."""
+        if (state := event.data["new_state"]) is not None:
+            self.state_writes.append(
+                (state.entity_id, len(json_bytes(state.as_dict())))
+            )
@@ -0,0 +1,179 @@
+"""Tests for the adaptive polling interval controller on a simulated clock."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from custom_components.samuelre_teamspeak.adaptive import (
+    REASON_ACTIVITY,
+    REASON_ERROR,
+    REASON_STABLE,
+    REASON_STARTUP,
+    AdaptiveIntervalController,
+)
+
+MIN_INTERVAL = 5
+MAX_INTERVAL = 300
+
+
+@dataclass
+class Poll:
+    """What the server looked like at one simulated refresh."""
+
+    churn: int = 0
+    bandwidth: int = 10_000
+    failed: bool = False
+
+
+def simulate(
+    controller: AdaptiveIntervalController,
+    server: Callable[[float], Poll],
+    duration: float,
+) -> list[tuple[float, float, str]]:
+    """Poll a simulated server until the clock passes the duration.
+
+    The clock only moves by the intervals the controller returns, so the
+    trace of (time, interval, reason) is fully deterministic.
+    """
+    trace: list[tuple[float, float, str]] = []
+    now = 0.0
+    while now < duration:
+        poll = server(now)
+        if poll.failed:
+            interval = controller.record_failure()
+        else:
+            interval = controller.record_success(poll.churn, poll.bandwidth)
+        trace.append((now, interval, controller.reason))
+        now += interval
+    return trace
+
+
+def _controller(initial: float = 60) -> AdaptiveIntervalController:
+    return AdaptiveIntervalController(MIN_INTERVAL, MAX_INTERVAL, initial)
+
+
+def test_starts_clamped_with_startup_reason() -> None:
+    """The initial interval is clamped to the bounds."""
+    controller = AdaptiveIntervalController(MIN_INTERVAL, MAX_INTERVAL, 1000)
+    assert controller.interval == MAX_INTERVAL
+    assert controller.reason == REASON_STARTUP
+
+
+def test_idle_server_backs_off_to_maximum() -> None:
+    """A quiet server is polled less and less often, up to the maximum."""
+    trace = simulate(_controller(), lambda now: Poll(), 3600)
+
+    intervals = [interval for _, interval, _ in trace]
+    assert intervals[:5] == [90, 135, 202.5, 300, 300]
+    assert all(reason == REASON_STABLE for _, _, reason in trace)
+    # An idle hour costs a fraction of the fixed 60 second polling
+    assert len(trace) < 3600 / 60 / 3
+
+
+def test_churn_halves_interval_and_burst_jumps_to_minimum() -> None:
+    """Single changes halve the interval, a burst drops to the minimum."""
+    controller = _controller(120)
+    assert controller.record_success(1, 10_000) == 60
+    assert controller.reason == REASON_ACTIVITY
+    assert controller.record_success(2, 10_000) == 30
+    assert controller.record_success(5, 10_000) == MIN_INTERVAL
+    assert controller.record_success(50, 10_000) == MIN_INTERVAL
+
+
+def test_raid_night_tracks_activity() -> None:
+    """Polling speeds up while clients pour in and relaxes afterwards."""
+
+    def server(now: float) -> Poll:
+        # Quiet, then ten minutes of heavy joining, then quiet again
+        if 1800 <= now < 2400:
+            return Poll(churn=8, bandwidth=500_000)
+        return Poll(bandwidth=500_000 if now >= 1800 else 10_000)
+
+    trace = simulate(_controller(), server, 4800)
+
+    raid = [interval for now, interval, _ in trace if 1800 <= now < 2400]
+    assert raid and all(interval == MIN_INTERVAL for interval in raid)
+    before = [interval for now, interval, _ in trace if now < 1800]
+    assert before[-1] == MAX_INTERVAL
+    # After the raid the interval grows back step by step, not in one jump
+    after = [interval for now, interval, _ in trace if now >= 2400]
+    assert after[:4] == [7.5, 11.25, 16.875, 25.3125]
+    assert after[-1] == MAX_INTERVAL
+
+
+def test_bandwidth_jitter_does_not_count_as_activity() -> None:
+    """Changes below both thresholds keep backing off."""
+    controller = _controller(60)
+    controller.record_success(0, 100_000)
+    # 20% up: relative change too small
+    assert controller.record_success(0, 120_000) == 135
+    # Dropping to almost idle is activity, but 1000 bytes/s more on an
+    # almost idle server is below the absolute threshold
+    controller.record_success(0, 100)
+    assert controller.reason == REASON_ACTIVITY
+    assert controller.record_success(0, 1_100) > controller.min_interval
+    assert controller.reason == REASON_STABLE
+
+
+def test_bandwidth_swing_counts_as_activity() -> None:
+    """A large relative and absolute change shortens the interval."""
+    controller = _controller(60)
+    controller.record_success(0, 100_000)
+    assert controller.record_success(0, 200_000) == 45
+    assert controller.reason == REASON_ACTIVITY
+    # Dropping back is a change as well
+    assert controller.record_success(0, 20_000) == 22.5
+
+
+def test_hysteresis_between_activity_and_stable() -> None:
+    """Alternating activity and quiet does not oscillate between the bounds.
+
+    Activity halves the interval while a quiet refresh only grows it by
+    half, so occasional changes keep the interval low instead of flipping
+    between the minimum and maximum.
+    """
+    controller = _controller(60)
+    intervals = []
+    for step in range(40):
+        controller.record_success(1 if step % 2 else 0, 10_000)
+        intervals.append(controller.interval)
+    assert max(intervals[-10:]) <= 7.5
+    assert min(intervals) == MIN_INTERVAL
+
+
+def test_errors_back_off_exponentially() -> None:
+    """Failures double the interval up to the maximum."""
+
+    def server(now: float) -> Poll:
+        return Poll(failed=now < 1200)
+
+    trace = simulate(_controller(10), server, 2000)
+
+    failures = [(interval, reason) for now, interval, reason in trace if now < 1200]
+    assert [interval for interval, _ in failures[:6]] == [20, 40, 80, 160, 300, 300]
+    assert {reason for _, reason in failures} == {REASON_ERROR}
+    # The first success after the outage starts backing off from the maximum
+    recovered = [(interval, reason) for now, interval, reason in trace if now >= 1200]
+    assert recovered[0] == (MAX_INTERVAL, REASON_STABLE)
+
+
+def test_recovery_after_errors_with_activity() -> None:
+    """Activity after an outage brings the interval down again."""
+    controller = _controller(60)
+    for _ in range(5):
+        controller.record_failure()
+    assert controller.interval == MAX_INTERVAL
+    # The reconnect wave after the outage is a burst
+    assert controller.record_success(20, 10_000) == MIN_INTERVAL
+    assert controller.reason == REASON_ACTIVITY
+
+
+def test_set_bounds_clamps_current_interval() -> None:
+    """Changed bounds apply to the current interval right away."""
+    controller = _controller(200)
+    controller.set_bounds(10, 100)
+    assert controller.interval == 100
+    controller.set_bounds(150, 600)
+    assert controller.interval == 150
+    assert controller.record_success(1, 10_000) == 150
@@ -0,0 +1,278 @@
+"""Tests for the WebQuery client against a fake WebQuery server."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+import time
+from typing import Any
+
+from aiohttp import ClientPayloadError, ClientSession, TCPConnector
+import pytest
+
+from custom_components.samuelre_teamspeak import api
+from custom_components.samuelre_teamspeak.api import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+    MAX_RETRIES,
+    CannotConnect,
+    InvalidAuth,
+    TeamSpeakRequestQueue,
+    TeamSpeakWebQueryClient,
+)
+
+from .fake_webquery import (
+    API_KEY,
+    FAULT_HANG,
+    FAULT_RESET,
+    FAULT_SERVER_ERROR,
+    FakeWebQuery,
+)
+
+
+class _Clock:
+    """Monotonic clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+async def server() -> AsyncIterator[FakeWebQuery]:
+    """Run a fake WebQuery server."""
+    fake = FakeWebQuery()
+    await fake.start()
+    yield fake
+    await fake.stop()
+    assert fake.violations == []
+
+
+@pytest.fixture
+async def session() -> AsyncIterator[ClientSession]:
+    """Return a session with a single kept-alive connection."""
+    async with ClientSession(connector=TCPConnector(limit_per_host=1)) as session:
+        yield session
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Retry without noticeable backoff and time out hung requests quickly."""
+    monkeypatch.setattr(api, "RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setitem(api.ENDPOINT_TIMEOUTS, "serverinfo", 0.2)
+
+
+def _client(
+    server: FakeWebQuery, session: ClientSession, api_key: str = API_KEY
+) -> TeamSpeakWebQueryClient:
+    """Return a client for the first virtual server of the fake server."""
+    return TeamSpeakWebQueryClient(
+        "127.0.0.1", server.port, 1, api_key, session, TeamSpeakRequestQueue(0)
+    )
+
+
+async def test_requests_share_one_connection(
+    server: FakeWebQuery, session: ClientSession
+) -> None:
+    """All requests of a refresh go out one by one over one connection."""
+    client = _client(server, session)
+    async with client.batch():
+        info = await client.get_server_info()
+        clients = await client.get_client_list()
+        await client.get_channel_list()
+    assert info["virtualserver_clientsonline"] == "11"
+    assert len(clients) == 11
+    assert server.requests == ["serverinfo", "clientlist", "channellist"]
+    assert server.connections_opened == 1
+
+
+async def test_virtual_servers_share_one_session(
+    server: FakeWebQuery, session: ClientSession
+) -> None:
+    """Concurrent refreshes of several virtual servers never overlap."""
+    server.latency = 0.01
+    client = _client(server, session)
+    await asyncio.gather(
+        *(client.for_server(1).get_server_info() for _ in range(5)),
+        client.get_client_list(),
+    )
+    assert len(server.requests) == 6
+    assert server.connections_opened == 1
+
+
+async def test_second_session_breaks_the_server(server: FakeWebQuery) -> None:
+    """The fake server resets a connection opened next to another one."""
+    server.latency = 0.05
+    async with ClientSession() as first, ClientSession() as second:
+        await asyncio.gather(
+            _client(server, first).get_server_info(),
+            _client(server, second).get_server_info(),
+            return_exceptions=True,
+        )
+    assert server.violations
+    server.violations.clear()
+
+
+async def test_invalid_api_key(server: FakeWebQuery, session: ClientSession) -> None:
+    """A rejected API key raises InvalidAuth without retrying."""
+    client = _client(server, session, api_key="wrong")
+    with pytest.raises(InvalidAuth):
+        await client.get_server_info()
+    assert server.requests == ["serverinfo"]
+    assert not client.queue.breaker.failures
+
+
+async def test_hung_request_times_out_and_is_retried(
+    server: FakeWebQuery, session: ClientSession
+) -> None:
+    """A request that never answers hits the endpoint timeout."""
+    server.add_fault(FAULT_HANG)
+    client = _client(server, session)
+    started = time.monotonic()
+    await client.get_server_info()
+    assert 0.2 <= time.monotonic() - started < 1
+    assert client.stats["serverinfo"].errors == {"timeout": 1}
+    assert server.requests == ["serverinfo", "serverinfo"]
+
+
+async def test_hung_requests_give_up_after_retries(
+    server: FakeWebQuery, session: ClientSession
+) -> None:
+    """A host that keeps hanging fails after the retries."""
+    server.add_fault(FAULT_HANG, count=10)
+    client = _client(server, session)
+    with pytest.raises(CannotConnect, match="Timeout"):
+        await client.get_server_info()
+    assert client.stats["serverinfo"].errors == {"timeout": MAX_RETRIES + 1}
+
+
+async def test_server_errors_use_up_retries(
+    server: FakeWebQuery, session: ClientSession
+) -> None:
+    """5xx responses are retried until the retries run out."""
+    server.add_fault(FAULT_SERVER_ERROR, count=10, status=502)
+    client = _client(server, session)
+    with pytest.raises(CannotConnect, match="502"):
+        await client.get_client_list()
+    assert server.requests == ["clientlist"] * (MAX_RETRIES + 1)
+    assert client.stats["clientlist"].errors == {"server_error": MAX_RETRIES + 1}
+
+
+async def test_server_errors_stop_at_retry_budget(
+    monkeypatch: pytest.MonkeyPatch, server: FakeWebQuery, session: ClientSession
+) -> None:
+    """No retry is started that could not finish within the budget."""
+    # Room for the first attempt, but not for a retry with its timeout
+    monkeypatch.setattr(api, "RETRY_BUDGET", 0.15)
+    server.add_fault(FAULT_SERVER_ERROR, count=10)
+    client = _client(server, session)
+    with pytest.raises(CannotConnect, match="503"):
+        await client.get_server_info()
+    assert server.requests == ["serverinfo"]
+
+
+async def test_connection_reset_is_retried(
+    server: FakeWebQuery, session: ClientSession
+) -> None:
+    """A reset connection is replaced by a new one and the request retried."""
+    server.add_fault(FAULT_RESET, endpoint="channellist")
+    client = _client(server, session)
+    await client.get_server_info()
+    assert len(await client.get_channel_list()) == 10
+    assert client.stats["channellist"].errors == {"connection": 1}
+    assert server.connections_opened == 2
+
+
+async def test_backoff_releases_the_batch(
+    monkeypatch: pytest.MonkeyPatch, server: FakeWebQuery, session: ClientSession
+) -> None:
+    """Other virtual servers are served while a batch waits for a retry."""
+    monkeypatch.setattr(api, "RETRY_BASE_DELAY", 0.2)
+    server.add_fault(FAULT_SERVER_ERROR, endpoint="clientlist")
+    client = _client(server, session)
+
+    async def refresh() -> None:
+        async with client.batch():
+            await client.get_client_list()
+            await client.get_channel_list()
+
+    retrying = asyncio.create_task(refresh())
+    await asyncio.sleep(0.05)
+    await client.for_server(1).get_server_info()
+    assert not retrying.done()
+    await retrying
+    assert server.requests == ["clientlist", "serverinfo", "clientlist", "channellist"]
+
+
+async def test_only_answers_close_the_circuit(
+    monkeypatch: pytest.MonkeyPatch, server: FakeWebQuery, session: ClientSession
+) -> None:
+    """A failure without an HTTP response leaves the failure count alone."""
+    client = _client(server, session)
+    breaker = client.queue.breaker
+    breaker.record_failure()
+
+    async def broken_post(*args: Any, **kwargs: Any) -> None:
+        raise ClientPayloadError("Response payload is not completed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ClientSession, "post", broken_post)
+        with pytest.raises(CannotConnect, match="payload"):
+            await client.get_server_info()
+    assert breaker.failures == 1
+
+    # A rejected request still proves that the endpoint is up
+    server.add_fault(FAULT_SERVER_ERROR, status=404)
+    with pytest.raises(CannotConnect, match="404"):
+        await client.get_server_info()
+    assert breaker.failures == 0
+
+
+async def test_circuit_breaker_opens_and_half_opens(
+    monkeypatch: pytest.MonkeyPatch, server: FakeWebQuery, session: ClientSession
+) -> None:
+    """A dead host is short-circuited and probed once per reset timeout."""
+    clock = _Clock()
+    monkeypatch.setattr(api, "time", clock)
+    server.add_fault(FAULT_SERVER_ERROR, count=100)
+    client = _client(server, session)
+    breaker = client.queue.breaker
+
+    # The retries of the first request open the circuit
+    with pytest.raises(CannotConnect):
+        await client.get_server_info()
+    assert breaker.is_open
+    assert len(server.requests) == BREAKER_FAILURE_THRESHOLD
+
+    # While open, requests fail without reaching the server
+    with pytest.raises(CannotConnect, match="unreachable"):
+        await client.get_server_info()
+    assert len(server.requests) == BREAKER_FAILURE_THRESHOLD
+    assert client.stats["serverinfo"].errors["circuit_open"] == 1
+
+    # Half open: one probe goes out, fails and reopens for twice as long
+    clock.now += BREAKER_RESET_TIMEOUT
+    with pytest.raises(CannotConnect):
+        await client.get_server_info()
+    assert len(server.requests) == BREAKER_FAILURE_THRESHOLD + 1
+    assert breaker.is_open
+    assert breaker.reset_timeout == 2 * BREAKER_RESET_TIMEOUT
+    clock.now += BREAKER_RESET_TIMEOUT
+    with pytest.raises(CannotConnect, match="unreachable"):
+        await client.get_server_info()
+
+    # The next probe succeeds and closes the circuit
+    server.clear_faults()
+    clock.now += BREAKER_RESET_TIMEOUT
+    await client.get_server_info()
+    assert not breaker.is_open
+    assert breaker.failures == 0
+    assert breaker.reset_timeout == BREAKER_RESET_TIMEOUT
+
+    # Requests go out normally again
+    requests = len(server.requests)
+    assert len(await client.get_client_list()) == 11
+    assert server.requests[requests:] == ["clientlist"]
+    assert "circuit_open" not in client.stats["clientlist"].errors
@@ -0,0 +1,86 @@
+"""Tests for the coordinator against a fake WebQuery server."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from custom_components.samuelre_teamspeak.adaptive import (
+    BURST_CHURN,
+    REASON_ACTIVITY,
+    REASON_STABLE,
+)
+from custom_components.samuelre_teamspeak.const import (
+    CONF_ADAPTIVE_POLLING,
+    CONF_CHANNEL_LIST_INTERVAL,
+    CONF_CLIENT_LIST_INTERVAL,
+)
+
+from .fake_webquery import Roster
+from .harness import TeamSpeakHarness
+
+# Poll adaptively and fetch every list on every refresh
+ADAPTIVE_OPTIONS = {
+    CONF_ADAPTIVE_POLLING: True,
+    CONF_CLIENT_LIST_INTERVAL: 0,
+    CONF_CHANNEL_LIST_INTERVAL: 0,
+}
+
+
+@pytest.fixture
+def harness(tmp_path: Path) -> Iterator[TeamSpeakHarness]:
+    """Return a harness for a small server polled adaptively."""
+    harness = TeamSpeakHarness(tmp_path, Roster.generate(clients=20))
+    harness.setup(ADAPTIVE_OPTIONS)
+    yield harness
+    harness.close()
+    assert harness.server.violations == []
+
+
+def test_talking_toggle_is_not_a_client_change(harness: TeamSpeakHarness) -> None:
+    """A client starting to talk updates the count but not the client list."""
+    coordinator = harness.coordinator
+    revision = coordinator.client_list_revision
+    noop_refreshes = coordinator.noop_refresh_count
+    interval = coordinator.update_interval
+    assert interval is not None
+
+    harness.roster.clients[2]["client_flag_talking"] = "1"
+    harness.refresh()
+
+    assert coordinator.data.client_summary.talking == 1
+    assert not coordinator.data.client_delta.changed
+    assert coordinator.client_list_revision == revision
+    assert coordinator.noop_refresh_count == noop_refreshes + 1
+    assert coordinator.update_interval > interval
+    assert coordinator.interval_reason == REASON_STABLE
+
+
+def test_volatile_flags_let_the_interval_back_off(
+    harness: TeamSpeakHarness,
+) -> None:
+    """Polls differing only in voice and away flags count as stable."""
+    coordinator = harness.coordinator
+    roster = harness.roster
+    speakers = [clid for clid in roster.clients if clid > 1][: 2 * BURST_CHURN]
+    intervals = []
+    for flag in ("1", "0"):
+        for clid in speakers:
+            client = roster.clients[clid]
+            client["client_flag_talking"] = flag
+            client["client_input_muted"] = flag
+            client["client_away"] = flag
+            client["client_away_message"] = "brb" if flag == "1" else ""
+        harness.refresh()
+        assert coordinator.interval_reason == REASON_STABLE
+        intervals.append(coordinator.update_interval)
+    assert intervals[0] < intervals[1]
+
+    # A client moving is activity and shortens the interval again
+    cid = int(roster.clients[speakers[0]]["cid"])
+    roster.move(speakers[0], cid % len(roster.channels) + 1)
+    harness.refresh()
+    assert coordinator.interval_reason == REASON_ACTIVITY
+    assert coordinator.update_interval < intervals[1]
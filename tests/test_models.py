@@ -0,0 +1,52 @@
+"""Tests for the channel tree of a snapshot."""
+
+from __future__ import annotations
+
+from custom_components.samuelre_teamspeak.models import (
+    Channel,
+    ChannelTree,
+    Client,
+)
+
+
+def _channels(*rows: tuple[int, int, int]) -> dict[int, Channel]:
+    """Return channels from (cid, pid, order) rows."""
+    return {
+        cid: Channel.from_raw(
+            {"cid": cid, "pid": pid, "channel_order": order, "channel_name": f"C{cid}"}
+        )
+        for cid, pid, order in rows
+    }
+
+
+def test_build_orders_children_and_resolves_ancestors() -> None:
+    """Siblings follow the order chain and ancestors run from the top down."""
+    tree = ChannelTree.build(_channels((1, 0, 0), (2, 0, 1), (3, 2, 0), (4, 3, 0)))
+    assert tree.children[0] == [1, 2]
+    assert tree.ancestors == {1: (), 2: (), 3: (2,), 4: (2, 3)}
+    assert tree.subtree(2) == [2, 3, 4]
+
+
+def test_orphaned_channel_is_a_root_with_its_subtree() -> None:
+    """A channel whose parent is missing keeps its own subchannels."""
+    # Channel 9 was deleted, but its children are still listed
+    tree = ChannelTree.build(_channels((1, 0, 0), (5, 9, 0), (6, 5, 0), (7, 6, 0)))
+    assert tree.children[0] == [1, 5]
+    assert 9 not in tree.children
+    assert tree.ancestors == {1: (), 5: (), 6: (5,), 7: (5, 6)}
+    assert tree.subtree(5) == [5, 6, 7]
+
+    clients = {
+        clid: Client.from_raw({"clid": clid, "cid": cid})
+        for clid, cid in ((1, 6), (2, 7), (3, 1))
+    }
+    assert tree.count_clients(clients) == {1: 1, 5: 2, 6: 2, 7: 1}
+
+
+def test_parent_cycle_does_not_lose_channels() -> None:
+    """Channels that are each other's parents still get ancestors."""
+    tree = ChannelTree.build(_channels((1, 0, 0), (2, 3, 0), (3, 2, 0), (4, 3, 0)))
+    assert tree.ancestors.keys() == {1, 2, 3, 4}
+    assert tree.ancestors[2] == ()
+    assert tree.ancestors[3] == (2,)
+    assert tree.ancestors[4] == (2, 3)
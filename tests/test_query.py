@@ -0,0 +1,173 @@
+"""Tests for the ServerQuery notification listener."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+
+from custom_components.samuelre_teamspeak import query
+from custom_components.samuelre_teamspeak.api import InvalidAuth
+from custom_components.samuelre_teamspeak.query import (
+    TeamSpeakNotificationListener,
+    TeamSpeakServerQueryClient,
+    parse_notification,
+)
+
+from .fake_serverquery import FakeServerQuery
+
+
+@pytest.fixture
+async def server() -> AsyncIterator[FakeServerQuery]:
+    """Run a fake ServerQuery server."""
+    fake = FakeServerQuery()
+    await fake.start()
+    yield fake
+    await fake.stop()
+
+
+@pytest.fixture(autouse=True)
+def fast_reconnect(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Reconnect without waiting."""
+    monkeypatch.setattr(query, "RECONNECT_MIN_DELAY", 0)
+
+
+def _client(
+    server: FakeServerQuery, password: str = "secret"
+) -> TeamSpeakServerQueryClient:
+    """Return a client for the fake server."""
+    return TeamSpeakServerQueryClient(
+        "127.0.0.1", server.port, 1, "serveradmin", password
+    )
+
+
+class _Recorder:
+    """Collect notifications and connection changes."""
+
+    def __init__(self) -> None:
+        self.notifications: list[tuple[str, dict[str, str]]] = []
+        self.connected: list[bool] = []
+        self.received = asyncio.Event()
+
+    def callback(self, name: str, params: dict[str, str]) -> None:
+        self.notifications.append((name, params))
+        self.received.set()
+
+    async def wait(self, count: int) -> None:
+        while len(self.notifications) < count:
+            self.received.clear()
+            await asyncio.wait_for(self.received.wait(), 5)
+
+
+def test_parse_notification_shares_first_record() -> None:
+    """Parameters of the first record apply to all records of a batch."""
+    assert parse_notification("ctid=5 reasonid=0 invokerid=1 clid=2|clid=3") == [
+        {"ctid": "5", "reasonid": "0", "invokerid": "1", "clid": "2"},
+        {"ctid": "5", "reasonid": "0", "invokerid": "1", "clid": "3"},
+    ]
+    assert parse_notification("cid=4 channel_name=A\\sB") == [
+        {"cid": "4", "channel_name": "A B"}
+    ]
+
+
+async def test_connect_logs_in_and_registers(server: FakeServerQuery) -> None:
+    """The client logs in, selects the server and registers for events."""
+    client = _client(server)
+    await client.connect()
+    await client.register_notifications()
+    await client.close()
+    assert server.commands[:4] == [
+        "login client_login_name=serveradmin client_login_password=secret",
+        "use sid=1",
+        "servernotifyregister event=server",
+        "servernotifyregister event=channel id=0",
+    ]
+
+
+async def test_invalid_login(server: FakeServerQuery) -> None:
+    """A rejected login raises InvalidAuth."""
+    with pytest.raises(InvalidAuth):
+        await _client(server, password="wrong").connect()
+
+
+async def test_batched_notification_dispatched_per_client(
+    server: FakeServerQuery,
+) -> None:
+    """A notification about several clients calls back once per client."""
+    recorder = _Recorder()
+    listener = TeamSpeakNotificationListener(
+        _client(server), recorder.callback, recorder.connected.append
+    )
+    task = asyncio.create_task(listener.async_run())
+    await server.wait_registered()
+
+    await server.notify(
+        "notifyclientmoved",
+        {"ctid": "5", "reasonid": "0", "clid": "2"},
+        {"clid": "3"},
+        {"clid": "4"},
+    )
+    await recorder.wait(3)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert [params["clid"] for _, params in recorder.notifications] == ["2", "3", "4"]
+    assert all(params["ctid"] == "5" for _, params in recorder.notifications)
+    assert recorder.connected == [True]
+
+
+async def test_unexpected_error_reconnects(server: FakeServerQuery) -> None:
+    """A failing callback drops push mode and the listener reconnects."""
+    recorder = _Recorder()
+
+    def callback(name: str, params: dict[str, str]) -> None:
+        recorder.callback(name, params)
+        if params["clid"] == "bad":
+            raise ValueError("broken notification")
+
+    listener = TeamSpeakNotificationListener(
+        _client(server), callback, recorder.connected.append
+    )
+    task = asyncio.create_task(listener.async_run())
+    await server.wait_registered()
+
+    await server.notify("notifyclientleftview", {"clid": "bad"})
+    await server.wait_registered()
+    await server.notify("notifyclientleftview", {"clid": "7"})
+    await recorder.wait(2)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert recorder.connected == [True, False, True]
+    assert server.logins == 2
+
+
+async def test_dropped_connection_reconnects(server: FakeServerQuery) -> None:
+    """The listener reports the disconnect and connects again."""
+    recorder = _Recorder()
+    listener = TeamSpeakNotificationListener(
+        _client(server), recorder.callback, recorder.connected.append
+    )
+    task = asyncio.create_task(listener.async_run())
+    await server.wait_registered()
+
+    server.drop_connections()
+    await server.wait_registered()
+    await server.notify("notifyclientleftview", {"clid": "9"})
+    await recorder.wait(1)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert recorder.connected == [True, False, True]
+    assert recorder.notifications == [("notifyclientleftview", {"clid": "9"})]
+
+
+async def test_invalid_login_stops_listener(server: FakeServerQuery) -> None:
+    """Wrong credentials end the listener instead of retrying forever."""
+    recorder = _Recorder()
+    listener = TeamSpeakNotificationListener(
+        _client(server, password="wrong"), recorder.callback, recorder.connected.append
+    )
+    await asyncio.wait_for(listener.async_run(), 5)
+    assert recorder.connected == []